@@ -1,14 +1,22 @@
 import os
+import sys
 from collections.abc import Iterator
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from py_app_dev.core.exceptions import UserNotificationException
 from py_app_dev.core.logging import logger
 from pypeline.domain.execution_context import ExecutionContext
 from pypeline.domain.pipeline import PipelineStep
 
+from pypeline_semantic_release.process_usage import ChildProcessMeter, ProcessResourceUsage, redact_command, write_report
+from pypeline_semantic_release.tracing import Span, Tracer
+
+# GitPython and semantic-release are imported by the steps which need them, when they run
+if TYPE_CHECKING:
+    from pypeline_semantic_release.git_repo_session import GitRepoSession
+
 
 @contextmanager
 def change_directory(path: Path) -> Iterator[None]:
@@ -27,6 +35,11 @@ class BaseStep(PipelineStep[ExecutionContext]):
     def __init__(self, execution_context: ExecutionContext, group_name: str | None = None, config: dict[str, Any] | None = None) -> None:
         super().__init__(execution_context, group_name, config)
         self.logger = logger.bind()
+        #: Repository session of the step itself instead of the one shared by the pipeline, e.g. when it runs in its own thread
+        self.repo_session: GitRepoSession | None = None
+        #: Process usages kept by the step instead of registering them, e.g. when it runs in its own thread.
+        #: The data registry is not thread-safe, the owner of the list registers them afterwards.
+        self.process_usages: list[ProcessResourceUsage] | None = None
 
     def run(self) -> None:
         pass
@@ -47,10 +60,81 @@ class BaseStep(PipelineStep[ExecutionContext]):
         """It shall always run, independent off any dependencies."""
         return False
 
-    def execute_process(self, command: list[str | Path], error_msg: str) -> None:
+    def get_repo_session(self, repo_dir: Path | None = None) -> "GitRepoSession":
+        """Return the git repository session shared by all steps of the pipeline, or the own session of the step if it has one."""
+        from pypeline_semantic_release.git_repo_session import GitRepoSession
+
+        if self.repo_session and self.repo_session.repo_dir == (repo_dir or self.execution_context.project_root_dir).resolve():
+            return self.repo_session
+        return GitRepoSession.from_execution_context(self.execution_context, self.get_name(), repo_dir)
+
+    @contextmanager
+    def repo_session_scope(self) -> Iterator[None]:
+        """Stop the git helper processes of the repository sessions when the step is done, also if it fails."""
+        try:
+            yield
+        finally:
+            # Without the module no session was created, importing it would import GitPython
+            git_repo_session = sys.modules.get("pypeline_semantic_release.git_repo_session")
+            if self.repo_session:
+                self.repo_session.stop_helpers()
+            elif git_repo_session:
+                for session in self.execution_context.data_registry.find_data(git_repo_session.GitRepoSession):
+                    session.stop_helpers()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Mark a phase of the step in the pipeline trace.
+
+        The spans of all steps are exported to a Chrome trace-event file, see :mod:`pypeline_semantic_release.tracing`.
+        """
+        with Tracer.from_execution_context(self.execution_context, self.get_name()).span(self.get_name(), name, **attributes) as span:
+            yield span
+
+    @contextmanager
+    def step_span(self) -> Iterator[Span]:
+        """
+        Mark the run of the step in the pipeline trace, the spans of its phases are nested into it.
+
+        The trace files are written when the step is done, also if it fails.
+        """
+        tracer = Tracer.from_execution_context(self.execution_context, self.get_name())
+        try:
+            with tracer.span(self.get_name(), "run") as span:
+                yield span
+        finally:
+            tracer.export()
+
+    def execute_process(self, command: list[str | Path], error_msg: str, env: dict[str, str] | None = None) -> None:
+        """Run the command. Secrets (e.g. credentials) must be passed with ``env``, the command line is visible to other processes."""
         proc_executor = self.execution_context.create_process_executor(command)
+        if env:
+            # The executor environment already has the variables and install directories of the pipeline
+            proc_executor.env = {**(proc_executor.env or os.environ), **env}
         # When started from a shell (e.g. cmd on Jenkins) the shell parameter must be set to True
         proc_executor.shell = True if os.name == "nt" else False
-        process = proc_executor.execute(handle_errors=False)
+        meter = ChildProcessMeter()
+        process = None
+        try:
+            with self.span("process", command=" ".join(redact_command(command))):
+                process = proc_executor.execute(handle_errors=False)
+        finally:
+            self.record_process_usage(meter.stop(self.get_name(), command, process.returncode if process else None))
         if process and process.returncode != 0:
             raise UserNotificationException(f"{error_msg} Return code: {process.returncode}")
+
+    def record_process_usage(self, usage: ProcessResourceUsage) -> None:
+        """Register the resource usage of a child process and update the report with all processes of the pipeline."""
+        if self.process_usages is not None:
+            # The children usage is shared by all threads, the CPU times and the peak could belong to the processes of other steps
+            usage.user_time = usage.system_time = usage.max_rss = None
+        self.logger.info(
+            f"Process '{' '.join(usage.command)}' took {usage.wall_time:.2f}s"
+            + (f" (user {usage.user_time:.2f}s, system {usage.system_time:.2f}s)" if usage.user_time is not None and usage.system_time is not None else "")
+        )
+        if self.process_usages is not None:
+            self.process_usages.append(usage)
+            return
+        self.execution_context.data_registry.insert(usage, self.get_name())
+        write_report(self.execution_context.project_root_dir, self.execution_context.data_registry.find_data(ProcessResourceUsage))
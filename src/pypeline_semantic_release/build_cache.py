@@ -0,0 +1,133 @@
+import hashlib
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.logging import logger
+
+from pypeline_semantic_release.cache import cache_key, get_cache_dir, read_json_cache, write_json_cache
+
+if TYPE_CHECKING:
+    from git import Repo
+
+
+@dataclass
+class BuildCacheEntry(DataClassDictMixin):
+    """Distributions built for a source tree and version."""
+
+    tree_sha: str
+    version: str
+    #: File name of every distribution and the SHA-256 of its content
+    files: dict[str, str] = field(default_factory=dict)
+
+
+class DistributionCache:
+    """
+    Content-addressed cache of built distributions.
+
+    The distributions are stored once per content (``objects/<sha256>``) and an entry per git tree SHA and version
+    lists their file names and hashes. The same tree and version always build the same package, so a retried
+    release or a release published to several repositories does not need to build again.
+    The content of every file is verified against its hash before it is restored.
+    """
+
+    #: Bump when the layout changes
+    FILE_VERSION = 1
+
+    def __init__(self, cache_dir: Path, max_entries: int = 10) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_repo(cls, repo: "Repo", max_entries: int = 10, cache_dir: Path | None = None) -> "DistributionCache":
+        """Cache of the repository, in the given directory or inside ``.git``."""
+        return cls((cache_dir or get_cache_dir(repo)) / f"dist_cache_v{cls.FILE_VERSION}", max_entries)
+
+    def _entry_file(self, tree_sha: str, version: str) -> Path:
+        return self.cache_dir / "entries" / f"{cache_key(tree_sha, version)}.json"
+
+    def _object_file(self, sha256: str) -> Path:
+        return self.cache_dir / "objects" / sha256[:2] / sha256
+
+    def restore(self, tree_sha: str, version: str, dist_dir: Path) -> list[Path] | None:
+        """Copy the cached distributions to the directory. Returns None if there are none or they are corrupted."""
+        entry_file = self._entry_file(tree_sha, version)
+        entry = read_json_cache(entry_file, BuildCacheEntry, lambda entry: entry.tree_sha == tree_sha and entry.version == version and bool(entry.files))
+        if not entry:
+            return None
+        for name, sha256 in entry.files.items():
+            object_file = self._object_file(sha256)
+            if not object_file.is_file() or _file_sha256(object_file) != sha256:
+                logger.warning(f"Cached distribution {name} is missing or corrupted. The package is built again.")
+                _remove(entry_file, object_file)
+                return None
+        restored = []
+        try:
+            dist_dir.mkdir(parents=True, exist_ok=True)
+            for name, sha256 in entry.files.items():
+                restored.append(_atomic_copy(self._object_file(sha256), dist_dir / name))
+            # Mark the entry as recently used
+            os.utime(entry_file)
+        except OSError as exc:
+            logger.warning(f"Could not restore the cached distributions: {exc}")
+            return None
+        return restored
+
+    def store(self, tree_sha: str, version: str, files: list[Path]) -> None:
+        """Add the distributions to the cache. Failing to write the cache is not an error."""
+        entry = BuildCacheEntry(tree_sha=tree_sha, version=version)
+        try:
+            for file in files:
+                sha256 = _file_sha256(file)
+                object_file = self._object_file(sha256)
+                if not object_file.is_file():
+                    object_file.parent.mkdir(parents=True, exist_ok=True)
+                    _atomic_copy(file, object_file)
+                entry.files[file.name] = sha256
+        except OSError as exc:
+            logger.warning(f"Could not store the distributions in the cache: {exc}")
+            return
+        write_json_cache(self._entry_file(tree_sha, version), entry)
+        self.prune()
+
+    def prune(self) -> None:
+        """Keep only the most recently used entries and the objects they refer to."""
+        entries = sorted((self.cache_dir / "entries").glob("*.json"), key=lambda file: file.stat().st_mtime, reverse=True)
+        if len(entries) <= self.max_entries:
+            return
+        for entry_file in entries[self.max_entries :]:
+            _remove(entry_file)
+        referenced: set[str] = set()
+        for entry_file in entries[: self.max_entries]:
+            entry = read_json_cache(entry_file, BuildCacheEntry)
+            referenced.update(entry.files.values() if entry else [])
+        for object_file in (self.cache_dir / "objects").glob("*/*"):
+            if object_file.name not in referenced:
+                _remove(object_file)
+
+
+def _file_sha256(file: Path) -> str:
+    sha256 = hashlib.sha256()
+    with file.open("rb") as stream:
+        while chunk := stream.read(1024 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _atomic_copy(source: Path, target: Path) -> Path:
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.copyfile(source, tmp_file)
+    os.replace(tmp_file, target)
+    return target
+
+
+def _remove(*files: Path) -> None:
+    for file in files:
+        try:
+            file.unlink(missing_ok=True)
+        except OSError as exc:
+            logger.warning(f"Could not remove cache file {file}: {exc}")
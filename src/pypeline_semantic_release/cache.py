@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+
+from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.logging import logger
+
+if TYPE_CHECKING:
+    from git import Repo
+
+#: Directory inside the git common directory where the step caches are stored
+CACHE_DIR_NAME = "pypeline_semantic_release"
+
+T = TypeVar("T", bound=DataClassDictMixin)
+
+
+def get_cache_dir(repo: "Repo") -> Path:
+    """Cache directory inside ``.git``. The common directory is used such that all worktrees share the cache."""
+    return Path(repo.common_dir) / CACHE_DIR_NAME
+
+
+def cache_key(*parts: str) -> str:
+    """Short, file name friendly key for the given parts."""
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]  # noqa: S324
+
+
+def read_json_cache(cache_file: Path, data_type: type[T], is_valid: Callable[[T], bool] = lambda _: True) -> T | None:
+    """Read a cache file. Invalid or unreadable files are ignored, the cache is then rebuilt by the caller."""
+    if not cache_file.is_file():
+        return None
+    try:
+        data = data_type.from_dict(json.loads(cache_file.read_text()))
+    except Exception as exc:
+        logger.warning(f"Ignoring invalid cache file {cache_file}: {exc}")
+        return None
+    return data if is_valid(data) else None
+
+
+def write_json_cache(cache_file: Path, data: DataClassDictMixin) -> None:
+    """Atomically write a cache file. Failing to write the cache is not an error."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_file.write_text(json.dumps(data.to_dict()))
+        os.replace(tmp_file, cache_file)
+    except OSError as exc:
+        logger.warning(f"Could not write cache file {cache_file}: {exc}")
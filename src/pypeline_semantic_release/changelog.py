@@ -0,0 +1,215 @@
+import os
+import shutil
+from collections import defaultdict
+from collections.abc import Collection
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from git import Repo
+from jinja2 import FileSystemBytecodeCache
+from py_app_dev.core.logging import logger
+from semantic_release.changelog.context import make_changelog_context
+from semantic_release.changelog.release_history import ReleaseHistory
+from semantic_release.cli.changelog_writer import write_changelog_files
+from semantic_release.cli.config import RuntimeContext
+from semantic_release.cli.const import JINJA2_EXTENSION
+from semantic_release.commit_parser import ParsedCommit, ParseError, ParseResult
+from semantic_release.enums import LevelBump
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.cache import get_cache_dir
+
+#: Directory inside the cache directory with the compiled changelog templates
+TEMPLATE_CACHE_DIR = "changelog_templates_v1"
+
+
+def _common_prefix_length(first: str, second: str) -> int:
+    length = min(len(first), len(second))
+    return next((index for index in range(length) if first[index] != second[index]), length)
+
+
+@dataclass
+class ChangelogSplice:
+    """Position and text of a new release section, derived from the template rendered without and with the new release."""
+
+    #: Text before the releases (e.g. the title), same for every history
+    header: str
+    #: Text rendered for the new release
+    section: str
+
+    @classmethod
+    def from_renders(cls, empty: str, single: str) -> "ChangelogSplice":
+        """Everything the two renders have in common at the start is the header, everything in common at the end the footer."""
+        prefix = _common_prefix_length(empty, single)
+        suffix = _common_prefix_length(empty[prefix:][::-1], single[prefix:][::-1])
+        return cls(header=single[:prefix], section=single[prefix : len(single) - suffix])
+
+    def insert_into(self, existing: str, marker: str | None = None) -> str | None:
+        """
+        Insert the section after the header of the existing changelog.
+
+        If the header was edited, the section is inserted after the marker (insertion flag), given it is part of the header.
+        None if neither the header nor the marker is found.
+        """
+        if existing.startswith(self.header):
+            position = len(self.header)
+        elif marker and marker in self.header and marker in existing:
+            after_marker = self.header[self.header.index(marker) + len(marker) :]
+            position = existing.index(marker) + len(marker)
+            if not existing.startswith(after_marker, position):
+                return None
+            position += len(after_marker)
+        else:
+            return None
+        return existing[:position] + self.section + existing[position:]
+
+
+class IncrementalChangelogWriter:
+    """
+    Update the changelog files rendered from the user templates (``changelog.template_dir``) with the section of a new release.
+
+    Only the commits since the previous release are parsed. Every template is rendered with an empty history
+    and with the new release only, the difference is the section of the new release. It is inserted
+    after the header of the existing file. Files which cannot be updated this way (missing file, edited header,
+    no user templates) are rendered with the whole history, like semantic-release does.
+
+    The templates are compiled once and the bytecode is cached under ``.git/``, such that
+    later releases do not compile them again.
+    """
+
+    def __init__(self, runtime: RuntimeContext, repo: Repo, cache_dir: Path | None = None) -> None:
+        self.runtime = runtime
+        self.repo = repo
+        self.environment = runtime.template_environment
+        template_cache_dir = cache_dir or get_cache_dir(repo) / TEMPLATE_CACHE_DIR
+        try:
+            template_cache_dir.mkdir(parents=True, exist_ok=True)
+            self.environment.bytecode_cache = FileSystemBytecodeCache(str(template_cache_dir))
+        except OSError as exc:
+            logger.warning(f"Could not create the changelog template cache {template_cache_dir}: {exc}")
+        self._full_history: ReleaseHistory | None = None
+
+    def write(self, version: Version, tagged_date: datetime, release_commits: Collection[str], consistency_check: bool = False) -> list[str]:
+        """
+        Write the changelog files for the new version and return their paths.
+
+        :param release_commits: commits tagged with a version (including prereleases), see :meth:`collect_unreleased`
+        :param consistency_check: render the files with the whole history as well and use this result if they differ
+        """
+        release_history = self.release_history(self.collect_unreleased(release_commits), version, tagged_date)
+        template_files = self.template_files()
+        if not any(template.endswith(JINJA2_EXTENSION) for template, _ in template_files):
+            logger.info(f"No changelog templates found in {self.runtime.template_dir}. Render the default changelog with the whole history.")
+            return write_changelog_files(runtime_ctx=self.runtime, release_history=self.full_history(version, tagged_date), hvcs_client=self.runtime.hvcs_client)
+        paths: list[str] = []
+        for template, output_file in template_files:
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            if not template.endswith(JINJA2_EXTENSION):
+                shutil.copyfile(Path(self.runtime.template_dir) / template, output_file)
+                paths.append(str(output_file))
+                continue
+            content = self.render_incremental(template, output_file, release_history)
+            if content is None:
+                logger.info(f"{output_file} cannot be updated incrementally. Render it with the whole history.")
+                content = self.render(template, self.full_history(version, tagged_date))
+            elif consistency_check:
+                full_content = self.render(template, self.full_history(version, tagged_date))
+                if content != full_content:
+                    logger.warning(f"Incremental update of {output_file} differs from rendering the whole history, using the latter. Check the template {template}.")
+                    content = full_content
+            self.write_file(output_file, content)
+            paths.append(str(output_file))
+        return paths
+
+    def render_incremental(self, template: str, output_file: Path, release_history: ReleaseHistory) -> str | None:
+        """Existing content of the output file with the section of the new release inserted. None if this is not possible."""
+        if not output_file.is_file():
+            return None
+        try:
+            splice = ChangelogSplice.from_renders(self.render(template, ReleaseHistory(unreleased={}, released={})), self.render(template, release_history))
+        except Exception as exc:
+            # E.g. the template expects at least one release
+            logger.info(f"Template {template} cannot be rendered without releases: {exc}")
+            return None
+        return splice.insert_into(output_file.read_text(encoding="utf-8"), self.runtime.changelog_insertion_flag)
+
+    def render(self, template: str, release_history: ReleaseHistory) -> str:
+        """Render a template like semantic-release does. The compiled template is reused for all renders."""
+        changelog_context = make_changelog_context(
+            hvcs_client=self.runtime.hvcs_client,
+            release_history=release_history,
+            mode=self.runtime.changelog_mode,
+            insertion_flag=self.runtime.changelog_insertion_flag,
+            prev_changelog_file=self.runtime.changelog_file,
+            mask_initial_release=self.runtime.changelog_mask_initial_release,
+        )
+        environment = changelog_context.bind_to_environment(self.environment)
+        return environment.get_template(template).render().rstrip() + "\n"
+
+    def template_files(self) -> list[tuple[str, Path]]:
+        """Template names (relative to the template directory) and their output files. Hidden files and directories are skipped."""
+        template_dir = Path(self.runtime.template_dir)
+        if not template_dir.is_dir():
+            return []
+        project_dir = Path(self.runtime.repo_dir)
+        files = []
+        for root, directories, names in os.walk(template_dir):
+            directories[:] = sorted(directory for directory in directories if not directory.startswith("."))
+            relative_root = Path(root).relative_to(template_dir)
+            for name in sorted(names):
+                if name.startswith("."):
+                    continue
+                output_name = name[: -len(JINJA2_EXTENSION)] if name.endswith(JINJA2_EXTENSION) else name
+                files.append(((relative_root / name).as_posix(), (project_dir / relative_root / output_name).resolve()))
+        return files
+
+    def collect_unreleased(self, release_commits: Collection[str]) -> dict[str, list[ParseResult]]:
+        """
+        Parse the unreleased commits and group them by type, with the same boundary and exclusions as ``ReleaseHistory.from_git_history``.
+
+        The history is walked in topological order until the first commit tagged with any version, prereleases included.
+        Starting from the latest full release instead would list the commits of the prereleases since then a second time.
+        """
+        commit_parser = self.runtime.commit_parser
+        ignore_merge_commits = bool(getattr(getattr(commit_parser, "options", None), "ignore_merge_commits", False))
+        unreleased: dict[str, list[ParseResult]] = defaultdict(list)
+        for commit in self.repo.iter_commits("HEAD", topo_order=True):
+            if commit.hexsha in release_commits:
+                break
+            result = commit_parser.parse(commit)
+            for item in result if isinstance(result, list) or type(result) is tuple else [result]:
+                if ignore_merge_commits and item.is_merge_commit():
+                    continue
+                bump = LevelBump.NO_RELEASE if isinstance(item, ParseError) else item.bump
+                message = str(item.commit.message)
+                # Excluded commits are kept if they bump the version, otherwise the reason for the release would be missing
+                if bump == LevelBump.NO_RELEASE and any(pattern.match(message) for pattern in self.runtime.changelog_excluded_commit_patterns):
+                    continue
+                if isinstance(item, ParsedCommit) and not item.include_in_changelog:
+                    continue
+                unreleased["unknown" if isinstance(item, ParseError) else item.type].append(item)
+        return unreleased
+
+    def release_history(self, unreleased: dict[str, list[ParseResult]], version: Version, tagged_date: datetime) -> ReleaseHistory:
+        author = self.runtime.commit_author
+        return ReleaseHistory(unreleased=unreleased, released={}).release(version, tagger=author, committer=author, tagged_date=tagged_date)
+
+    def full_history(self, version: Version, tagged_date: datetime) -> ReleaseHistory:
+        """Whole release history including the new release. Only computed if needed."""
+        if self._full_history is None:
+            author = self.runtime.commit_author
+            self._full_history = ReleaseHistory.from_git_history(
+                repo=self.repo,
+                translator=self.runtime.version_translator,
+                commit_parser=self.runtime.commit_parser,
+                exclude_commit_patterns=self.runtime.changelog_excluded_commit_patterns,
+            ).release(version, tagger=author, committer=author, tagged_date=tagged_date)
+        return self._full_history
+
+    @staticmethod
+    def write_file(output_file: Path, content: str) -> None:
+        """Write atomically, an interrupted release must not leave a truncated changelog behind."""
+        tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(content, encoding="utf-8")
+        os.replace(tmp_file, output_file)
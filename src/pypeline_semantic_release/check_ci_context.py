@@ -1,16 +1,51 @@
 import os
+import warnings
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from enum import Enum, auto
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import cache
 from typing import Any
 
+from py_app_dev.core.logging import logger
+
 from pypeline_semantic_release.base import BaseStep
 
+#: Entry point group for additional CI detection rules. An entry point refers to a :class:`CIDetectionRule` or a list of them.
+CI_DETECTORS_ENTRY_POINT_GROUP = "pypeline_semantic_release.ci_detectors"
+
+
+class CISystem(str, Enum):
+    """
+    Well-known CI systems.
+
+    The detection does not depend on this enum. Systems detected by a plugin rule which are not listed here
+    are identified by the name given in the rule.
+    """
+
+    UNKNOWN = "unknown"
+    JENKINS = "jenkins"
+    GITHUB_ACTIONS = "github_actions"
+    GITLAB_CI = "gitlab_ci"
+    AZURE_PIPELINES = "azure_pipelines"
+    BITBUCKET_PIPELINES = "bitbucket_pipelines"
+    TEAMCITY = "teamcity"
+
+    @property
+    def detector_class(self) -> "type[CIDetector] | None":
+        """Former detector of the CI system, only Jenkins and GitHub Actions had one. Deprecated, see :class:`CIDetector`."""
+        return {CISystem.JENKINS: JenkinsDetector, CISystem.GITHUB_ACTIONS: GitHubActionsDetector}.get(self)
+
+    def get_detector(self) -> "CIDetector | None":
+        """Former detector of the CI system, only Jenkins and GitHub Actions had one. Deprecated, see :class:`CIDetector`."""
+        detector_class = self.detector_class
+        return detector_class() if detector_class else None
+
 
 @dataclass
 class CIContext:
     #: CI system where the build is running
-    ci_system: "CISystem"
+    ci_system: CISystem | str
     #: Whether the build is for a pull request
     is_pull_request: bool
     #: The branch being build or the branch from the PR to merge into (e.g. main)
@@ -24,8 +59,128 @@ class CIContext:
         return self.ci_system != CISystem.UNKNOWN
 
 
+@dataclass(frozen=True)
+class CIDetectionRule:
+    """
+    Declarative description of how a CI system is detected from the environment variables.
+
+    The conditions map variable names to the expected value, ``None`` means that the variable only has to be set.
+    All conditions must hold. The branch names are read from the given variables.
+    """
+
+    #: Name of the CI system, the :class:`CISystem` value for the well-known systems
+    ci_system: str
+    #: Conditions identifying a build running on the CI system
+    detect: Mapping[str, str | None]
+    #: Conditions identifying a pull request build. No conditions: pull requests are not detected.
+    pull_request: Mapping[str, str | None] = field(default_factory=dict)
+    #: Variable with the branch being built
+    branch: str | None = None
+    #: Variable with the branch a pull request shall be merged into
+    pull_request_target_branch: str | None = None
+    #: Variable with the branch of the pull request
+    pull_request_branch: str | None = None
+    #: Prefix removed from the branch names, for CI systems providing the full ref (e.g. ``refs/heads/``)
+    branch_prefix: str | None = None
+
+    def evaluate(self, environ: Mapping[str, str]) -> CIContext | None:
+        """Return the CI context if the environment belongs to this CI system."""
+        if not _matches(environ, self.detect):
+            return None
+        is_pull_request = bool(self.pull_request) and _matches(environ, self.pull_request)
+        if is_pull_request:
+            target_branch = self._get_branch(environ, self.pull_request_target_branch)
+            current_branch = self._get_branch(environ, self.pull_request_branch)
+        else:
+            target_branch = current_branch = self._get_branch(environ, self.branch)
+        try:
+            ci_system: CISystem | str = CISystem(self.ci_system)
+        except ValueError:
+            ci_system = self.ci_system
+        return CIContext(ci_system=ci_system, is_pull_request=is_pull_request, target_branch=target_branch, current_branch=current_branch)
+
+    def _get_branch(self, environ: Mapping[str, str], name: str | None) -> str | None:
+        value = environ.get(name) if name else None
+        return value.removeprefix(self.branch_prefix) if value is not None and self.branch_prefix else value
+
+
+def _matches(environ: Mapping[str, str], conditions: Mapping[str, str | None]) -> bool:
+    return all(name in environ if expected is None else environ.get(name) == expected for name, expected in conditions.items())
+
+
+#: Rules of the CI systems supported without plugins. Further rules are registered through the :data:`CI_DETECTORS_ENTRY_POINT_GROUP` entry points.
+BUILTIN_DETECTION_RULES = (
+    CIDetectionRule(
+        ci_system=CISystem.JENKINS.value,
+        detect={"JENKINS_HOME": None},
+        pull_request={"CHANGE_ID": None},
+        branch="BRANCH_NAME",
+        pull_request_target_branch="CHANGE_TARGET",
+        pull_request_branch="CHANGE_BRANCH",
+    ),
+    CIDetectionRule(
+        ci_system=CISystem.GITHUB_ACTIONS.value,
+        detect={"GITHUB_ACTIONS": "true"},
+        pull_request={"GITHUB_EVENT_NAME": "pull_request"},
+        branch="GITHUB_REF_NAME",
+        pull_request_target_branch="GITHUB_BASE_REF",
+        pull_request_branch="GITHUB_HEAD_REF",
+    ),
+    CIDetectionRule(
+        ci_system=CISystem.GITLAB_CI.value,
+        detect={"GITLAB_CI": "true"},
+        pull_request={"CI_MERGE_REQUEST_IID": None},
+        branch="CI_COMMIT_BRANCH",
+        pull_request_target_branch="CI_MERGE_REQUEST_TARGET_BRANCH_NAME",
+        pull_request_branch="CI_MERGE_REQUEST_SOURCE_BRANCH_NAME",
+    ),
+    CIDetectionRule(
+        ci_system=CISystem.AZURE_PIPELINES.value,
+        detect={"TF_BUILD": "True"},
+        pull_request={"BUILD_REASON": "PullRequest"},
+        # BUILD_SOURCEBRANCHNAME only contains the last path segment (e.g. "x" for "feature/x")
+        branch="BUILD_SOURCEBRANCH",
+        pull_request_target_branch="SYSTEM_PULLREQUEST_TARGETBRANCH",
+        pull_request_branch="SYSTEM_PULLREQUEST_SOURCEBRANCH",
+        branch_prefix="refs/heads/",
+    ),
+    CIDetectionRule(
+        ci_system=CISystem.BITBUCKET_PIPELINES.value,
+        detect={"BITBUCKET_BUILD_NUMBER": None},
+        pull_request={"BITBUCKET_PR_ID": None},
+        branch="BITBUCKET_BRANCH",
+        pull_request_target_branch="BITBUCKET_PR_DESTINATION_BRANCH",
+        pull_request_branch="BITBUCKET_BRANCH",
+    ),
+    # TeamCity does not provide the branch as environment variable.
+    # Define the build parameter ``env.BRANCH_NAME`` with the value ``%teamcity.build.branch%``.
+    CIDetectionRule(
+        ci_system=CISystem.TEAMCITY.value,
+        detect={"TEAMCITY_VERSION": None},
+        branch="BRANCH_NAME",
+    ),
+)
+
+
 class CIDetector(ABC):
-    """Abstract base class for CI system detectors."""
+    """
+    Abstract base class for CI system detectors.
+
+    .. deprecated::
+        The CI systems are detected with :class:`CIDetectionRule` entries. The detectors are kept for compatibility only,
+        :class:`CheckCIContext` does not use them. Subclasses do not take part in the detection.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """Warn that the subclasses of other modules are not used for the detection."""
+        super().__init_subclass__(**kwargs)
+        if cls.__module__ != __name__:
+            warnings.warn(
+                f"{cls.__name__} is not used by CheckCIContext, CIDetector subclasses no longer take part in the CI detection. "
+                f"Register a CIDetectionRule for the '{CI_DETECTORS_ENTRY_POINT_GROUP}' entry point group instead.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
 
     @abstractmethod
     def detect(self) -> CIContext | None:
@@ -38,85 +193,88 @@ class CIDetector(ABC):
         return os.getenv(var_name, default)
 
 
-class JenkinsDetector(CIDetector):
-    """Detects Jenkins CI."""
+class _RuleDetector(CIDetector):
+    rule: CIDetectionRule
+
+    def __init__(self) -> None:
+        warnings.warn(f"{type(self).__name__} is deprecated, use the CIDetectionRule entries instead.", DeprecationWarning, stacklevel=2)
 
     def detect(self) -> CIContext | None:
-        if self.get_env_variable("JENKINS_HOME") is not None:
-            is_pull_request = self.get_env_variable("CHANGE_ID") is not None
-            if is_pull_request:
-                target_branch = self.get_env_variable("CHANGE_TARGET")
-                current_branch = self.get_env_variable("CHANGE_BRANCH")
-            else:
-                target_branch = self.get_env_variable("BRANCH_NAME")
-                current_branch = target_branch
-
-            return CIContext(
-                ci_system=CISystem.JENKINS,
-                is_pull_request=is_pull_request,
-                target_branch=target_branch,
-                current_branch=current_branch,
-            )
-        return None
+        return self.rule.evaluate(dict(os.environ))
 
 
-class GitHubActionsDetector(CIDetector):
-    """Detects GitHub Actions CI."""
+class JenkinsDetector(_RuleDetector):
+    """Detects Jenkins CI. Deprecated, see :class:`CIDetector`."""
 
-    def detect(self) -> CIContext | None:
-        if self.get_env_variable("GITHUB_ACTIONS") == "true":
-            is_pull_request = self.get_env_variable("GITHUB_EVENT_NAME") == "pull_request"
-            if is_pull_request:
-                target_branch = self.get_env_variable("GITHUB_BASE_REF")
-                current_branch = self.get_env_variable("GITHUB_HEAD_REF")
-            else:
-                target_branch = self.get_env_variable("GITHUB_REF_NAME")
-                current_branch = target_branch
-
-            return CIContext(
-                ci_system=CISystem.GITHUB_ACTIONS,
-                is_pull_request=is_pull_request,
-                target_branch=target_branch,
-                current_branch=current_branch,
-            )
+    rule = BUILTIN_DETECTION_RULES[0]
+
+
+class GitHubActionsDetector(_RuleDetector):
+    """Detects GitHub Actions CI. Deprecated, see :class:`CIDetector`."""
+
+    rule = BUILTIN_DETECTION_RULES[1]
+
+
+class CIDetectionTable:
+    """
+    Detection rules indexed by their first detection variable.
+
+    Only the rules whose first variable is set in the environment are evaluated, in the order of the table.
+    The detection time therefore depends on the size of the environment and not on the number of rules.
+    """
+
+    def __init__(self, rules: list[CIDetectionRule] | tuple[CIDetectionRule, ...]) -> None:
+        self.rules = tuple(rules)
+        self._positions: dict[str, list[int]] = {}
+        for position, rule in enumerate(self.rules):
+            self._positions.setdefault(next(iter(rule.detect), ""), []).append(position)
+        self._variables = frozenset(self._positions)
+
+    def detect(self, environ: Mapping[str, str]) -> CIContext | None:
+        """Evaluate the candidate rules. The first matching rule wins."""
+        # Rules without conditions are listed under the empty name, they always match
+        variables = self._variables.intersection(environ) | ({""} & self._variables)
+        for position in sorted(position for variable in variables for position in self._positions[variable]):
+            ci_context = self.rules[position].evaluate(environ)
+            if ci_context:
+                return ci_context
         return None
 
 
-class CISystem(Enum):
-    UNKNOWN = (auto(), None)  # Special case for unknown
-    JENKINS = (auto(), JenkinsDetector)
-    GITHUB_ACTIONS = (auto(), GitHubActionsDetector)
-    # Add new CI systems here:  MY_CI = (auto(), MyCIDetector)
+@cache
+def load_detection_rules() -> CIDetectionTable:
+    """
+    Return the built-in rules followed by the rules registered for the entry point group (sorted by entry point name).
+
+    The entry points are only discovered on the first call, afterwards the table is cached for the process.
+    """
+    from importlib.metadata import entry_points
 
-    def __init__(self, _: Any, detector_class: type[CIDetector] | None):
-        self._value_ = _  # Use auto() value, but ignore it in __init__
-        self.detector_class = detector_class
+    rules = list(BUILTIN_DETECTION_RULES)
+    for entry_point in sorted(entry_points(group=CI_DETECTORS_ENTRY_POINT_GROUP), key=lambda entry_point: entry_point.name):
+        try:
+            loaded = entry_point.load()
+        except Exception as exc:
+            logger.warning(f"Could not load CI detection rules '{entry_point.name}': {exc}")
+            continue
+        rules.extend(loaded if isinstance(loaded, list | tuple) else [loaded])
+    return CIDetectionTable(rules)
 
-    def get_detector(self) -> CIDetector | None:
-        return self.detector_class() if self.detector_class else None
+
+def detect_ci_context(environ: Mapping[str, str], table: CIDetectionTable | None = None) -> CIContext:
+    """Detect the CI system with the given rules (default: the built-in and the plugin rules). Unknown if no rule matches."""
+    ci_context = (table or load_detection_rules()).detect(environ)
+    if ci_context:
+        return ci_context
+    return CIContext(ci_system=CISystem.UNKNOWN, is_pull_request=False, target_branch=None, current_branch=None)
 
 
 class CheckCIContext(BaseStep):
     """Provide the CI context for the current build."""
 
     def update_execution_context(self) -> None:
-        ci_context: CIContext | None = None
-
-        # Iterate through the CISystem enum and use the first detected CI system
-        for ci_system in CISystem:
-            detector = ci_system.get_detector()
-            if detector:
-                ci_context = detector.detect()
-                if ci_context:
-                    break  # Stop at the first detected CI
-
-        if ci_context is None:
-            ci_context = CIContext(
-                ci_system=CISystem.UNKNOWN,
-                is_pull_request=False,
-                target_branch=None,
-                current_branch=None,
-            )
+        # All rules are evaluated against one snapshot of the environment
+        ci_context = detect_ci_context(dict(os.environ))
 
         if not ci_context.target_branch or not ci_context.current_branch:
             if ci_context.ci_system != CISystem.UNKNOWN:
@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import semantic_release
+from git import Repo
+from git.objects.commit import Commit
+from mashumaro.mixins.dict import DataClassDictMixin
+from semantic_release.commit_parser import CommitParser, ParseError, ParseResult, ParserOptions
+from semantic_release.commit_parser.token import ParsedCommit
+from semantic_release.enums import LevelBump
+
+from pypeline_semantic_release.cache import cache_key, get_cache_dir, read_json_cache, write_json_cache
+
+
+@dataclass
+class CachedParseResult(DataClassDictMixin):
+    #: Level bump value. None if the commit message could not be parsed.
+    bump: int | None = None
+    type: str = ""
+    scope: str = ""
+    breaking: bool = False
+    error: str = ""
+
+
+@dataclass
+class CommitParseCacheData(DataClassDictMixin):
+    #: Identifies the commit parser, its options and the semantic-release version
+    parser_key: str
+    #: Commit SHA mapped to the parse results of the commit
+    commits: dict[str, list[CachedParseResult]] = field(default_factory=dict)
+
+
+class CachingCommitParser(CommitParser[ParseResult, ParserOptions]):
+    """
+    Commit parser which remembers the results of the wrapped parser in a persistent cache under ``.git/``.
+
+    Commits are immutable, so the results are keyed by the commit SHA and the parser configuration.
+    Only commits which were never seen before are parsed. The cached results contain the level bump,
+    type, scope and the breaking flag, but no descriptions. Use it only to compute the next version,
+    not to render changelogs.
+    """
+
+    FILE_VERSION = 1
+
+    def __init__(self, parser: CommitParser[Any, Any], data: CommitParseCacheData | None = None, cache_file: Path | None = None) -> None:
+        super().__init__(parser.options)
+        self.parser = parser
+        self.data = data or CommitParseCacheData(parser_key=self.get_parser_key(parser))
+        self.cache_file = cache_file
+        self.new_entries = 0
+
+    @classmethod
+    def load(cls, repo: Repo, parser: CommitParser[Any, Any]) -> "CachingCommitParser":
+        parser_key = cls.get_parser_key(parser)
+        cache_file = get_cache_dir(repo) / f"commit_parse_cache_v{cls.FILE_VERSION}_{parser_key}.json"
+        data = read_json_cache(cache_file, CommitParseCacheData, lambda data: data.parser_key == parser_key)
+        return cls(parser, data, cache_file)
+
+    @staticmethod
+    def get_parser_key(parser: CommitParser[Any, Any]) -> str:
+        parser_type = type(parser)
+        return cache_key(f"{parser_type.__module__}.{parser_type.__qualname__}", repr(parser.options), semantic_release.__version__)
+
+    def get_default_options(self) -> ParserOptions:
+        return self.parser.get_default_options()
+
+    def parse(self, commit: Commit) -> ParseResult | list[ParseResult]:
+        cached_results = self.data.commits.get(commit.hexsha)
+        if cached_results is None:
+            result = self.parser.parse(commit)
+            # A single result is a named tuple, only plain lists and tuples hold several results
+            results: list[ParseResult] = list(result) if isinstance(result, list) or type(result) is tuple else [result]
+            self.data.commits[commit.hexsha] = [self._to_cached(item) for item in results]
+            self.new_entries += 1
+            return result
+        return [self._from_cached(commit, item) for item in cached_results]
+
+    @staticmethod
+    def _to_cached(result: ParseResult) -> CachedParseResult:
+        if isinstance(result, ParsedCommit):
+            return CachedParseResult(bump=int(result.bump), type=result.type, scope=result.scope, breaking=bool(result.breaking_descriptions))
+        return CachedParseResult(error=result.error)
+
+    @staticmethod
+    def _from_cached(commit: Commit, cached: CachedParseResult) -> ParseResult:
+        if cached.bump is None:
+            return ParseError(commit=commit, error=cached.error)
+        return ParsedCommit(
+            bump=LevelBump(cached.bump),
+            type=cached.type,
+            scope=cached.scope,
+            descriptions=[],
+            # The breaking change descriptions are not cached, only the fact that there are some
+            breaking_descriptions=[""] if cached.breaking else [],
+            commit=commit,
+        )
+
+    def save(self) -> None:
+        """Write the cache if new commits were parsed."""
+        if self.cache_file and self.new_entries:
+            write_json_cache(self.cache_file, self.data)
+            self.new_entries = 0
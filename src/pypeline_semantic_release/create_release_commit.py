@@ -1,30 +1,72 @@
 import os
-from dataclasses import dataclass
+import warnings
+from collections.abc import Collection
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
 from pathlib import Path
-from typing import Any
-from unittest.mock import Mock
+from typing import TYPE_CHECKING, Any
 from urllib.parse import quote_plus
 
-from git import Repo
 from mashumaro.mixins.dict import DataClassDictMixin
 from py_app_dev.core.exceptions import UserNotificationException
 from pypeline.domain.execution_context import ExecutionContext
-from semantic_release import VersionTranslator, tags_and_versions
-from semantic_release.cli.cli_context import CliContextObj
-from semantic_release.cli.commands.version import last_released
-from semantic_release.cli.config import BranchConfig, GlobalCommandLineOptions, HvcsClient, RemoteConfig, RuntimeContext
-from semantic_release.errors import NotAReleaseBranch
-from semantic_release.version.algorithm import next_version
-from semantic_release.version.version import Version
 
 from pypeline_semantic_release.base import BaseStep, change_directory
 from pypeline_semantic_release.check_ci_context import CIContext
+from pypeline_semantic_release.release_plan import RELEASE_PLAN_FILE, PlannedCIContext, ReleasePlan, is_plan_only
+
+# semantic-release is imported only when the step runs. Loading its CLI takes more than 100ms.
+if TYPE_CHECKING:
+    from semantic_release.cli.cli_context import CliContextObj
+    from semantic_release.cli.config import BranchConfig, RemoteConfig, RuntimeContext
+    from semantic_release.version.version import Version
+
+    from pypeline_semantic_release.git_repo_session import GitRepoSession
+    from pypeline_semantic_release.release_analysis import ReleaseAnalysis
 
 
 @dataclass
 class ReleaseCommit:
-    version: Version
-    previous_version: Version | None = None
+    version: "Version"
+    previous_version: "Version | None" = None
+    #: Name of the released package in the multi-package mode
+    package: str | None = None
+
+
+def find_release_commit(execution_context: ExecutionContext, package: str | None = None) -> ReleaseCommit | None:
+    """
+    Release commit of the given package of a monorepo, or of the project if no package is given. None if it was not released.
+
+    Fails if packages were released (multi-package mode) but no package is given, there is no release of the project to publish.
+    """
+    release_commits = execution_context.data_registry.find_data(ReleaseCommit)
+    if package is None:
+        released_packages = [release_commit.package for release_commit in release_commits if release_commit.package]
+        if released_packages:
+            raise UserNotificationException(f"The packages {', '.join(released_packages)} were released. Configure the package to be published.")
+    return next((release_commit for release_commit in release_commits if release_commit.package == package), None)
+
+
+class ChangelogRendering(Enum):
+    """How the changelog files are rendered by the in-process release."""
+
+    #: Render the templates with the whole release history, like semantic-release does
+    FULL = "full"
+    #: Parse only the commits since the last release and insert the section of the new release into the existing changelog files
+    INCREMENTAL = "incremental"
+
+
+@dataclass
+class PackageConfig(DataClassDictMixin):
+    """Package of a monorepo, released with its own version tags."""
+
+    #: Name of the package
+    name: str
+    #: Tag format of the package versions, e.g. ``my-package-v{version}``
+    tag_format: str
+    #: Directories or files relative to the repository root. Only commits changing them release the package. If empty, all commits do.
+    paths: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -33,6 +75,24 @@ class CreateReleaseCommitConfig(DataClassDictMixin):
 
     #: Whether or not to push the new commit and tag to the remote
     push: bool = True
+    #: Create the release commit in the current process, reusing the already computed runtime context and next version.
+    #: When disabled, ``python -m semantic_release version`` is spawned as a separate process.
+    in_process: bool = False
+    #: How the changelog files are rendered by the in-process release
+    changelog_rendering: ChangelogRendering = ChangelogRendering.FULL
+    #: Compare the incrementally updated changelog files with rendering the whole history and use the latter if they differ
+    changelog_consistency_check: bool = False
+    #: Multi-package mode: release the packages of a monorepo, each with its own tags. The history is walked once for all packages.
+    #: The released packages are tagged on the current commit; no release commit is created.
+    packages: list[PackageConfig] = field(default_factory=list)
+    #: Number of packages analyzed at the same time in the multi-package mode
+    max_workers: int = 4
+    #: Stamp the version in the ``version_variables`` and ``version_toml`` files of the in-process release with one read and one atomic write per file
+    #: and add them to the index without ``git add``. The duration per file is reported in the trace.
+    single_pass_stamping: bool = False
+    #: Write the release plan (``build/pypeline_semantic_release/release_plan.json``) for later jobs publishing with the LoadReleasePlan step.
+    #: The plan is always written in the plan-only mode.
+    release_plan: bool = False
 
 
 class CreateReleaseCommit(BaseStep):
@@ -41,9 +101,12 @@ class CreateReleaseCommit(BaseStep):
     def __init__(self, execution_context: ExecutionContext, group_name: str | None = None, config: dict[str, Any] | None = None) -> None:
         super().__init__(execution_context, group_name, config)
         self.release_commit: ReleaseCommit | None = None
+        #: Release commits of the packages released in the multi-package mode
+        self.package_releases: list[ReleaseCommit] = []
+        self.release_plan: ReleasePlan | None = None
 
     def run(self) -> None:
-        with change_directory(self.execution_context.project_root_dir):
+        with change_directory(self.execution_context.project_root_dir), self.repo_session_scope(), self.step_span():
             self.logger.info(f"Running {self.get_name()} step.")
             ci_contexts = self.execution_context.data_registry.find_data(CIContext)
             if len(ci_contexts) > 0:
@@ -54,18 +117,34 @@ class CreateReleaseCommit(BaseStep):
                 self.logger.info("CI context Unknown. Skip releasing the package.")
 
     def update_execution_context(self) -> None:
-        """Update the execution context with the release commit."""
+        """Update the execution context with the release commit (one per package in the multi-package mode) and the release plan."""
         if self.release_commit:
             self.execution_context.data_registry.insert(self.release_commit, self.get_name())
+        for package_release in self.package_releases:
+            self.execution_context.data_registry.insert(package_release, self.get_name())
+        if self.release_plan:
+            self.execution_context.data_registry.insert(self.release_plan, self.get_name())
 
     def run_semantic_release(self, ci_context: CIContext) -> None:
+        from unittest.mock import Mock
+
+        from semantic_release.cli.cli_context import CliContextObj
+        from semantic_release.cli.config import GlobalCommandLineOptions
+
         # (!) Using mocks for the ctx and logger objects is working as long as the semantic-release options are provided in the pyproject.toml file.
-        context = CliContextObj(Mock(), Mock(), GlobalCommandLineOptions())
-        config = context.raw_config
-        self.update_prerelease_token(config.branches)
-        last_release = self.last_released_version(config.repo_dir, tag_format=config.tag_format)
+        with self.span("load config"):
+            context = CliContextObj(Mock(), Mock(), GlobalCommandLineOptions())
+            config = context.raw_config
+            self.update_prerelease_token(config.branches)
+            runtime = self.create_runtime_context(context)
+        step_config = CreateReleaseCommitConfig.from_dict(self.config) if self.config else CreateReleaseCommitConfig()
+        if step_config.packages:
+            self.release_packages(ci_context, step_config, runtime)
+            return
+        analysis = self.analyze_release(config.repo_dir, config.tag_format, runtime)
+        last_release = analysis.last_release
         self.logger.info(f"Last released version: {last_release}")
-        next_version = self.next_version(context)
+        next_version = analysis.next_version
 
         if not next_version:
             if ci_context:
@@ -77,33 +156,133 @@ class CreateReleaseCommit(BaseStep):
         self.logger.info(f"Next version: {next_version}")
         self.logger.info(f"Next version tag: {next_version.as_tag()}")
 
-        if not ci_context.is_ci:
-            self.logger.info("No CI context, assuming local run. Skip releasing the package.")
+        with self.span("tag check", tag=next_version.as_tag()):
+            version_exists = analysis.version_exists(next_version)
+        if version_exists:
+            self.logger.info(f"Version {next_version} already exists. No release needed.")
             return
 
-        if ci_context.is_pull_request:
-            self.logger.info("Pull request detected. Skip releasing the package.")
+        base_commit_sha = self.get_repo_session(config.repo_dir).repo.head.commit.hexsha
+        if is_plan_only(self.execution_context):
+            # Without side effects the plan is also computed locally and for pull requests
+            skip_reason = self.get_skip_reason(ci_context, next_version)
+            self.logger.info(f"Plan-only mode. Skip releasing version {next_version}." + (f" A release run would skip it: {skip_reason}." if skip_reason else ""))
+            self.write_release_plan(ci_context, next_version, last_release, base_commit_sha, None)
             return
 
-        # Collect all tags and versions to check if the next version already exists
-        all_versions = self.collect_all_tags_and_versions(config.repo_dir, config.tag_format)
-        if self.does_version_exist(next_version, all_versions):
-            self.logger.info(f"Version {next_version} already exists. No release needed.")
+        skip_reason = self.get_skip_reason(ci_context, next_version)
+        if skip_reason:
+            self.logger.info(f"{skip_reason}. Skip releasing the package.")
             return
 
-        if next_version.is_prerelease:
-            self.logger.info(f"Detected pre-release version: {next_version}.")
-            do_prerelease = self.execution_context.get_input("do_prerelease")
-            if not do_prerelease:
-                self.logger.info("Pre-release version detected but 'do_prerelease' is not set. Skip releasing the package.")
-                return
-
         self.logger.info("Version doesn't exist yet. Running semantic release.")
-        self.do_release(config.remote)
+        try:
+            with self.span("release", version=next_version):
+                self.do_release(config.remote, runtime, next_version, analysis.tag_index.tagged_commits())
+        finally:
+            # The release commit and tag were created outside of the shared repository session
+            self.get_repo_session(config.repo_dir).invalidate()
         # Store the release commit to be updated in the data registry
         self.release_commit = ReleaseCommit(version=next_version, previous_version=last_release)
+        if step_config.release_plan:
+            self.write_release_plan(ci_context, next_version, last_release, base_commit_sha, self.get_repo_session(config.repo_dir).repo.head.commit.hexsha)
+
+    def get_skip_reason(self, ci_context: CIContext, next_version: "Version") -> str | None:
+        """Reason why the next version is not released, None if it is released."""
+        if not ci_context.is_ci:
+            return "No CI context, assuming local run"
+        if ci_context.is_pull_request:
+            return "Pull request detected"
+        if next_version.is_prerelease and not self.execution_context.get_input("do_prerelease"):
+            return "Pre-release version detected but 'do_prerelease' is not set"
+        return None
+
+    def release_packages(self, ci_context: CIContext, config: CreateReleaseCommitConfig, runtime: "RuntimeContext | None") -> None:
+        """Multi-package mode: compute the next versions of all packages with one pass over the history and tag the new versions."""
+        from pypeline_semantic_release.monorepo import MonorepoAnalyzer
+
+        names = [package.name for package in config.packages]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise UserNotificationException(f"Package names must be unique. Duplicates: {', '.join(duplicates)}")
+        if is_plan_only(self.execution_context):
+            # The release plan describes the release of one version
+            raise UserNotificationException("The plan-only mode is not supported in the multi-package mode.")
+        if not runtime:
+            self.logger.info(f"Current branch {ci_context.current_branch} is not configured to be released.")
+            return
+        session = self.get_repo_session(runtime.repo_dir)
+        with self.span("next versions", packages=len(config.packages)):
+            analyses = MonorepoAnalyzer(session, config.packages, config.max_workers).analyze(runtime)
+        releases = []
+        for name, analysis in analyses.items():
+            next_version = analysis.next_version
+            if not next_version:
+                continue
+            self.logger.info(f"{name}: last released version {analysis.last_release}, next version {next_version.as_tag()}")
+            if analysis.version_exists(next_version):
+                self.logger.info(f"{name}: version {next_version} already exists. No release needed.")
+            elif next_version.is_prerelease and not self.execution_context.get_input("do_prerelease"):
+                self.logger.info(f"{name}: pre-release version detected but 'do_prerelease' is not set. Skip releasing the package.")
+            else:
+                releases.append(ReleaseCommit(version=next_version, previous_version=analysis.last_release, package=name))
+
+        if not ci_context.is_ci:
+            self.logger.info("No CI context, assuming local run. Skip releasing the packages.")
+            return
+        if ci_context.is_pull_request:
+            self.logger.info("Pull request detected. Skip releasing the packages.")
+            return
+        if not releases:
+            self.logger.info("No package to be released.")
+            return
+        try:
+            with self.span("release", packages=len(releases)):
+                self.tag_packages(runtime, releases, config.push, session)
+        finally:
+            session.invalidate()
+        self.package_releases = releases
+
+    def tag_packages(self, runtime: "RuntimeContext", releases: list[ReleaseCommit], push: bool, session: "GitRepoSession") -> None:
+        """Tag the current commit with the new versions of the packages and push the tags."""
+        from semantic_release.errors import SemanticReleaseBaseError
+        from semantic_release.gitproject import GitProject
+
+        tags = [release.version.as_tag() for release in releases]
+        tagged_date = datetime.now(timezone.utc).astimezone()
+        try:
+            project = GitProject(directory=runtime.repo_dir, commit_author=runtime.commit_author, credential_masker=runtime.masker)
+            for tag in tags:
+                project.git_tag(tag_name=tag, message=tag, isotimestamp=tagged_date.isoformat())
+            if push:
+                self.quote_hvcs_token_for_url(runtime)
+                remote_url = runtime.hvcs_client.remote_url(use_token=not runtime.ignore_token_for_push)
+                for tag in tags:
+                    project.git_push_tag(remote_url=remote_url, tag=tag)
+        except (SemanticReleaseBaseError, ValueError) as exc:
+            raise UserNotificationException(f"Failed to tag the packages. Exception: {exc}") from exc
+        self.logger.info(f"[OK] Tagged {', '.join(tags)} on {session.repo.head.commit.hexsha}{' and pushed to remote' if push else ''}.")
+
+    def write_release_plan(self, ci_context: CIContext, version: "Version", previous_version: "Version | None", base_commit_sha: str, release_commit_sha: str | None) -> None:
+        """Persist the release such that later jobs can publish it without analyzing the history again."""
+        self.release_plan = ReleasePlan(
+            version=str(version),
+            previous_version=str(previous_version) if previous_version else None,
+            tag_format=version.tag_format,
+            tag=version.as_tag(),
+            base_commit_sha=base_commit_sha,
+            release_commit_sha=release_commit_sha,
+            ci_context=PlannedCIContext.from_ci_context(ci_context),
+        )
+        plan_file = self.execution_context.project_root_dir / RELEASE_PLAN_FILE
+        try:
+            self.release_plan.save(plan_file)
+        except OSError as exc:
+            self.logger.warning(f"Could not write the release plan {plan_file}: {exc}")
+            return
+        self.logger.info(f"Release plan written to {plan_file}.")
 
-    def update_prerelease_token(self, branches: dict[str, BranchConfig]) -> None:
+    def update_prerelease_token(self, branches: "dict[str, BranchConfig]") -> None:
         """Iterate over all branches and update the prerelease token."""
         prerelease_token = self.execution_context.get_input("prerelease_token")
         if prerelease_token:
@@ -112,23 +291,47 @@ class CreateReleaseCommit(BaseStep):
                     branch.prerelease_token = prerelease_token
                     self.logger.info(f"Updated prerelease token for branches matching {branch.match} to {prerelease_token}")
 
-    def last_released_version(self, repo_dir: Path, tag_format: str) -> Version | None:
-        last_release_str = last_released(repo_dir, tag_format)
-        return last_release_str[1] if last_release_str else None
+    def analyze_release(self, repo_dir: Path, tag_format: str, runtime: "RuntimeContext | None") -> "ReleaseAnalysis":
+        """Determine the last release, the next version and the existing versions with one pass over the tags and the new commits."""
+        from pypeline_semantic_release.release_analysis import ReleaseAnalyzer
 
-    def collect_all_tags_and_versions(self, repo_dir: Path, tag_format: str) -> list[Version]:
-        with Repo(str(repo_dir)) as git_repo:
-            ts_and_vs = tags_and_versions(git_repo.tags, VersionTranslator(tag_format=tag_format))
-        return [item[1] for item in ts_and_vs] if ts_and_vs else []
+        session = self.get_repo_session(repo_dir)
+        with self.span("last release"):
+            tag_index = session.tag_index(tag_format)
+        with self.span("next version"):
+            return ReleaseAnalyzer(session.repo, tag_index).analyze(runtime)
+
+    def last_released_version(self, repo_dir: Path, tag_format: str) -> "Version | None":
+        """Highest tagged version. Deprecated, use :meth:`analyze_release`."""
+        warnings.warn("CreateReleaseCommit.last_released_version is deprecated, use analyze_release instead.", DeprecationWarning, stacklevel=2)
+        return self.analyze_release(repo_dir, tag_format, None).last_release
+
+    def collect_all_tags_and_versions(self, repo_dir: Path, tag_format: str) -> "list[Version]":
+        """All tagged versions, from the highest to the lowest. Deprecated, use :meth:`analyze_release`."""
+        warnings.warn("CreateReleaseCommit.collect_all_tags_and_versions is deprecated, use analyze_release instead.", DeprecationWarning, stacklevel=2)
+        return self.analyze_release(repo_dir, tag_format, None).tag_index.versions()
 
     @staticmethod
-    def does_version_exist(version: Version, versions: list[Version]) -> bool:
-        """Check if a version exists in the list of versions."""
+    def does_version_exist(version: "Version", versions: "list[Version]") -> bool:
+        """Check if a version exists in the list of versions. Deprecated, use :meth:`ReleaseAnalysis.version_exists`."""
+        warnings.warn("CreateReleaseCommit.does_version_exist is deprecated, use ReleaseAnalysis.version_exists instead.", DeprecationWarning, stacklevel=2)
         return any(version == v for v in versions)
 
-    def next_version(self, context: CliContextObj) -> Version | None:
+    def next_version(self, context: "CliContextObj") -> "Version | None":
+        """Next version of the current branch, None if it is not configured to be released. Deprecated, use :meth:`analyze_release`."""
+        warnings.warn("CreateReleaseCommit.next_version is deprecated, use analyze_release instead.", DeprecationWarning, stacklevel=2)
+        runtime = self.create_runtime_context(context)
+        if not runtime:
+            return None
+        return self.analyze_release(runtime.repo_dir, context.raw_config.tag_format, runtime).next_version
+
+    @staticmethod
+    def create_runtime_context(context: "CliContextObj") -> "RuntimeContext | None":
+        from semantic_release.cli.config import RuntimeContext
+        from semantic_release.errors import NotAReleaseBranch
+
         try:
-            runtime = RuntimeContext.from_raw_config(
+            return RuntimeContext.from_raw_config(
                 context.raw_config,
                 global_cli_options=context.global_opts,
             )
@@ -139,19 +342,13 @@ class CreateReleaseCommit(BaseStep):
         except Exception as exc:
             raise UserNotificationException(f"Failed to determine next version. Exception: {exc}") from exc
 
-        with Repo(str(runtime.repo_dir)) as git_repo:
-            new_version = next_version(
-                repo=git_repo,
-                translator=runtime.version_translator,
-                commit_parser=runtime.commit_parser,
-                prerelease=runtime.prerelease,
-                major_on_zero=runtime.major_on_zero,
-                allow_zero_version=runtime.allow_zero_version,
-            )
-        return new_version
-
-    def do_release(self, remote_config: RemoteConfig) -> None:
+    def do_release(
+        self, remote_config: "RemoteConfig", runtime: "RuntimeContext | None" = None, new_version: "Version | None" = None, release_commits: "Collection[str]" = ()
+    ) -> None:
         config = CreateReleaseCommitConfig.from_dict(self.config) if self.config else CreateReleaseCommitConfig()
+        if config.in_process and runtime and new_version:
+            self.do_release_in_process(runtime, new_version, config.push, release_commits)
+            return
         self.quote_token_for_url(remote_config)
         semantic_release_args = ["--skip-build", "--no-vcs-release"]
         semantic_release_args.append("--push" if config.push else "--no-push")
@@ -169,12 +366,113 @@ class CreateReleaseCommit(BaseStep):
         )
         self.logger.info("[OK] New release commit created and pushed to remote.")
 
+    def do_release_in_process(self, runtime: "RuntimeContext", new_version: "Version", push: bool, release_commits: "Collection[str]" = ()) -> None:
+        """
+        Create the release commit and tag like the semantic-release ``version`` command does, but in the current process.
+
+        The runtime context and the next version are reused, so the configuration is not loaded again
+        and the version is not computed a second time. Building and VCS releases are skipped,
+        same as for the spawned command.
+        """
+        from semantic_release.cli.commands.version import apply_version_to_source_files
+        from semantic_release.errors import GitCommitEmptyIndexError, SemanticReleaseBaseError
+        from semantic_release.gitproject import GitProject
+
+        config = CreateReleaseCommitConfig.from_dict(self.config) if self.config else CreateReleaseCommitConfig()
+        git_repo = self.get_repo_session(runtime.repo_dir).repo
+        try:
+            active_branch = git_repo.active_branch.name
+            commit_date = datetime.now(timezone.utc).astimezone()
+            with self.span("changelog"):
+                paths_to_add = self.write_changelog(runtime, new_version, commit_date, release_commits)
+            if config.single_pass_stamping:
+                paths_to_add.extend(self.stamp_versions(runtime, new_version))
+            else:
+                paths_to_add.extend(apply_version_to_source_files(repo_dir=runtime.repo_dir, version_declarations=runtime.version_declarations, version=new_version))
+            paths_to_add.extend(runtime.assets or [])
+
+            project = GitProject(directory=runtime.repo_dir, commit_author=runtime.commit_author, credential_masker=runtime.masker)
+            project.git_add(paths=paths_to_add)
+            try:
+                project.git_commit(message=runtime.commit_message.format(version=new_version), date=int(commit_date.timestamp()), no_verify=runtime.no_git_verify)
+            except GitCommitEmptyIndexError:
+                self.logger.info("No local changes to add to any commit. Tagging the current HEAD commit.")
+            project.git_tag(tag_name=new_version.as_tag(), message=new_version.as_tag(), isotimestamp=commit_date.isoformat())
+
+            if push:
+                self.quote_hvcs_token_for_url(runtime)
+                remote_url = runtime.hvcs_client.remote_url(use_token=not runtime.ignore_token_for_push)
+                project.git_push_branch(remote_url=remote_url, branch=active_branch)
+                project.git_push_tag(remote_url=remote_url, tag=new_version.as_tag())
+        except (SemanticReleaseBaseError, ValueError) as exc:
+            raise UserNotificationException(f"Failed to create release commit. Exception: {exc}") from exc
+        self.logger.info(f"[OK] New release commit created{' and pushed to remote' if push else ''}.")
+
+    def write_changelog(self, runtime: "RuntimeContext", new_version: "Version", commit_date: datetime, release_commits: "Collection[str]") -> list[str]:
+        """Render the changelog files for the new version and return their paths. The release commits are the commits tagged with a version."""
+        config = CreateReleaseCommitConfig.from_dict(self.config) if self.config else CreateReleaseCommitConfig()
+        git_repo = self.get_repo_session(runtime.repo_dir).repo
+        if config.changelog_rendering == ChangelogRendering.INCREMENTAL:
+            from pypeline_semantic_release.changelog import IncrementalChangelogWriter
+
+            return IncrementalChangelogWriter(runtime, git_repo).write(new_version, commit_date, release_commits, config.changelog_consistency_check)
+
+        from semantic_release.changelog.release_history import ReleaseHistory
+        from semantic_release.cli.changelog_writer import write_changelog_files
+
+        release_history = ReleaseHistory.from_git_history(
+            repo=git_repo,
+            translator=runtime.version_translator,
+            commit_parser=runtime.commit_parser,
+            exclude_commit_patterns=runtime.changelog_excluded_commit_patterns,
+        )
+        release_history = release_history.release(new_version, tagger=runtime.commit_author, committer=runtime.commit_author, tagged_date=commit_date)
+        return write_changelog_files(runtime_ctx=runtime, release_history=release_history, hvcs_client=runtime.hvcs_client)
+
+    def stamp_versions(self, runtime: "RuntimeContext", new_version: "Version") -> list[str]:
+        """
+        Stamp the new version with one pass per file and add the stamped files to the index.
+
+        Returns the paths of the files stamped by declarations of other types, still to be added with ``git add``.
+        """
+        from semantic_release.cli.commands.version import apply_version_to_source_files
+
+        from pypeline_semantic_release.version_stamping import VersionStamper
+
+        stamper = VersionStamper.from_declarations(runtime.version_declarations)
+        stamped_files = []
+        for target in stamper.targets:
+            with self.span("stamp", file=str(target.path)) as span:
+                stamped_file = stamper.stamp(target, new_version)
+                span.attributes.update(changed=stamped_file.changed, size=stamped_file.size)
+            stamped_files.append(stamped_file)
+        changed_files = [stamped_file.path for stamped_file in stamped_files if stamped_file.changed]
+        if changed_files:
+            with self.span("stage", files=len(changed_files)):
+                stamper.stage(self.get_repo_session(runtime.repo_dir).repo, changed_files)
+        slowest = sorted(stamped_files, key=lambda stamped_file: stamped_file.duration, reverse=True)[:5]
+        self.logger.info(
+            f"Stamped version {new_version} in {len(changed_files)} of {len(stamped_files)} files. Slowest: "
+            + ", ".join(f"{stamped_file.path.name} ({stamped_file.duration * 1000:.1f}ms)" for stamped_file in slowest)
+        )
+        return apply_version_to_source_files(repo_dir=runtime.repo_dir, version_declarations=stamper.other_declarations, version=new_version)
+
     @staticmethod
     def get_semantic_release_command() -> list[str]:
         return ["python", "-m", "semantic_release"]
 
     @staticmethod
-    def quote_token_for_url(remote_config: RemoteConfig) -> None:
+    def quote_token_for_url(remote_config: "RemoteConfig") -> None:
         """Update the remote TOKEN environment variable because it will be used in the push URL and requires all special characters to be URL encoded."""
+        from semantic_release.cli.config import HvcsClient
+
         if remote_config.type == HvcsClient.BITBUCKET:
             os.environ["BITBUCKET_TOKEN"] = quote_plus(os.getenv("BITBUCKET_TOKEN", ""))
+
+    @staticmethod
+    def quote_hvcs_token_for_url(runtime: "RuntimeContext") -> None:
+        """Same as :meth:`quote_token_for_url`, but for the token already loaded into the runtime HVCS client."""
+        from semantic_release.hvcs import Bitbucket
+
+        if isinstance(runtime.hvcs_client, Bitbucket) and runtime.hvcs_client.token:
+            runtime.hvcs_client.token = quote_plus(runtime.hvcs_client.token)
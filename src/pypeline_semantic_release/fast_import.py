@@ -0,0 +1,154 @@
+import os
+import subprocess
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import IO, cast
+
+from git import Actor, Repo
+from py_app_dev.core.exceptions import UserNotificationException
+
+#: Number of files whose blobs are written with one ``git hash-object`` call
+HASH_BATCH_SIZE = 1000
+
+
+def iter_files(repo_dir: Path, paths: list[str]) -> Iterator[Path]:
+    """
+    Yield all files of the given paths (relative to the repository root), without collecting them in a list first.
+
+    The same entries as ``git add`` are yielded: symbolic links are files, also if they point to a directory.
+    """
+    for rel_path in paths:
+        abs_path = repo_dir / rel_path
+        if abs_path.is_dir() and not abs_path.is_symlink():
+            for dir_path, dir_names, file_names in os.walk(abs_path):
+                # Symbolic links to directories are listed as directories but are never descended into
+                linked_dirs = [name for name in dir_names if os.path.islink(os.path.join(dir_path, name))]
+                # Never descend into nested repositories
+                dir_names[:] = sorted(name for name in dir_names if name != ".git" and name not in linked_dirs)
+                for file_name in sorted([*file_names, *linked_dirs]):
+                    yield Path(dir_path) / file_name
+        elif abs_path.is_symlink() or abs_path.exists():
+            yield abs_path
+
+
+def quote_path(path: str) -> str:
+    """Quote a path for the fast-import stream if required (C-style quoting)."""
+    if not path.startswith('"') and "\n" not in path:
+        return path
+    escaped = path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+class FastImportCommitWriter:
+    """
+    Create a commit from files of the working tree with a single ``git fast-import`` process.
+
+    The blobs are written by ``git hash-object`` in batches of files, which applies the attributes, the line ending
+    conversion and the clean filters (e.g. LFS) like ``git add``. The tree and the commit are streamed to the process.
+    The files are never collected in memory and no index file is written.
+    ``git fast-import`` writes the commit to a scratch ref, the branch and the tag are only updated
+    after the tree of the commit was compared. An existing tag is never overwritten.
+    """
+
+    def __init__(self, repo: Repo) -> None:
+        self.repo = repo
+        self.repo_dir = Path(repo.working_dir)
+
+    def create_commit(self, branch: str, paths: list[str], message: str, parents: list[str], tag_name: str | None = None, unchanged_tree: str | None = None) -> str | None:
+        """
+        Create a commit with the given paths on the branch. Return the SHA of the new commit.
+
+        If the tree of the commit is ``unchanged_tree`` no ref is updated and None is returned.
+        """
+        if tag_name and self.repo.git.rev_parse("--verify", "--quiet", f"refs/tags/{tag_name}", with_exceptions=False):
+            raise UserNotificationException(f"Tag '{tag_name}' already exists. Failed to create commit on branch '{branch}' with git fast-import.")
+        scratch_ref = f"refs/pypeline/fast-import/{branch}"
+        try:
+            self._import_commit(branch, scratch_ref, paths, message, parents)
+            commit_sha = self.repo.git.rev_parse("--verify", scratch_ref)
+            if unchanged_tree and self.repo.git.rev_parse("--verify", f"{commit_sha}^{{tree}}") == unchanged_tree:
+                return None
+        finally:
+            self.repo.git.update_ref("-d", scratch_ref, with_exceptions=False)
+        self.repo.git.update_ref(f"refs/heads/{branch}", commit_sha)
+        if tag_name:
+            # Lightweight tag, same as ``git tag <name> <commit>``. The empty old value: only if the tag does not exist.
+            self.repo.git.update_ref(f"refs/tags/{tag_name}", commit_sha, "")
+        return commit_sha
+
+    def _import_commit(self, branch: str, ref: str, paths: list[str], message: str, parents: list[str]) -> None:
+        # --force: a scratch ref left by an aborted run is overwritten
+        process = subprocess.Popen(
+            ["git", "fast-import", "--quiet", "--force", "--done"],  # noqa: S607
+            cwd=self.repo_dir,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        stream = cast(IO[bytes], process.stdin)
+        try:
+            self._write_commit(stream, ref, paths, message, parents)
+            stream.write(b"done\n")
+        except BrokenPipeError:
+            # The process terminated early, the reason is reported on stderr
+            pass
+        except BaseException:
+            # Without the done command git fast-import does not update the ref
+            process.kill()
+            process.communicate()
+            raise
+        # Closes the stream and waits for git to write the objects and the ref
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise UserNotificationException(f"Failed to create commit on branch '{branch}' with git fast-import: {stderr.decode(errors='replace').strip()}")
+
+    def _write_commit(self, stream: IO[bytes], ref: str, paths: list[str], message: str, parents: list[str]) -> None:
+        config_reader = self.repo.config_reader()
+        author = Actor.author(config_reader)
+        committer = Actor.committer(config_reader)
+        timestamp = datetime.now().astimezone()
+        raw_date = f"{int(timestamp.timestamp())} {timestamp.strftime('%z')}"
+        message_bytes = message.encode()
+        stream.write(f"commit {ref}\nmark :1\n".encode())
+        stream.write(f"author {author.name} <{author.email}> {raw_date}\n".encode())
+        stream.write(f"committer {committer.name} <{committer.email}> {raw_date}\n".encode())
+        stream.write(f"data {len(message_bytes)}\n".encode() + message_bytes + b"\n")
+        if parents:
+            stream.write(f"from {parents[0]}\n".encode())
+            for parent in parents[1:]:
+                stream.write(f"merge {parent}\n".encode())
+        # Start from an empty tree, the parent content must not be inherited
+        stream.write(b"deleteall\n")
+        file_mode = bool(config_reader.get_value("core", "filemode", True))
+        files = iter_files(self.repo_dir, paths)
+        while batch := list(islice(files, HASH_BATCH_SIZE)):
+            self._write_files(stream, batch, file_mode)
+        stream.write(b"\n")
+
+    def _write_files(self, stream: IO[bytes], files: list[Path], file_mode: bool) -> None:
+        rel_paths = [quote_path(file.relative_to(self.repo_dir).as_posix()) for file in files]
+        links = [file.is_symlink() for file in files]
+        blobs = iter(self._hash_objects([rel_path for rel_path, link in zip(rel_paths, links, strict=True) if not link]))
+        for file, rel_path, link in zip(files, rel_paths, links, strict=True):
+            if link:
+                target = os.fsencode(os.readlink(file))
+                stream.write(f"M 120000 inline {rel_path}\ndata {len(target)}\n".encode() + target + b"\n")
+                continue
+            # Like git add: only the executable bit of the owner counts and only if core.fileMode is set
+            mode = "100755" if file_mode and file.stat().st_mode & 0o100 else "100644"
+            stream.write(f"M {mode} {next(blobs)} {rel_path}\n".encode())
+
+    def _hash_objects(self, rel_paths: list[str]) -> list[str]:
+        """Write the blobs of the files. The paths select the attributes, same as for git add."""
+        if not rel_paths:
+            return []
+        result = subprocess.run(
+            ["git", "hash-object", "-w", "--stdin-paths"],  # noqa: S607
+            input="".join(f"{rel_path}\n" for rel_path in rel_paths).encode(),
+            cwd=self.repo_dir,
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise UserNotificationException(f"Failed to write the blobs with git hash-object: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout.decode().split()
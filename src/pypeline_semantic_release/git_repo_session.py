@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from git import Repo
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.tag_index import TagVersionIndex
+
+
+class GitRepoSession:
+    """
+    Pipeline scoped access to the git repository shared by all steps.
+
+    The first step asking for the repository registers the session in the data registry,
+    all following steps reuse it. This way the repository discovery and the tag indexes are paid for
+    only once per pipeline run, the git helper processes (e.g. ``git cat-file``) once per step.
+
+    Lifecycle:
+
+    * the repository is opened lazily on first access of :attr:`repo`
+    * a step which writes refs (commits, tags, branches) must call :meth:`invalidate` afterwards
+    * the steps call :meth:`stop_helpers` when they are done, such that no git process outlives the pipeline
+    * :meth:`close` releases the repository; a later access opens it again
+    """
+
+    def __init__(self, repo_dir: Path) -> None:
+        self.repo_dir = repo_dir.resolve()
+        self._repo: Repo | None = None
+        self._tag_indexes: dict[str, TagVersionIndex] = {}
+
+    @classmethod
+    def from_execution_context(cls, execution_context: ExecutionContext, provider_name: str, repo_dir: Path | None = None) -> "GitRepoSession":
+        """Return the session registered for the repository or register a new one."""
+        repo_dir = (repo_dir or execution_context.project_root_dir).resolve()
+        for session in execution_context.data_registry.find_data(cls):
+            if session.repo_dir == repo_dir:
+                return session
+        session = cls(repo_dir)
+        execution_context.data_registry.insert(session, provider_name)
+        return session
+
+    @property
+    def repo(self) -> Repo:
+        if self._repo is None:
+            self._repo = Repo(str(self.repo_dir))
+        return self._repo
+
+    def tag_index(self, tag_format: str) -> TagVersionIndex:
+        """Return the persistent tag-to-version index for the given tag format."""
+        if tag_format not in self._tag_indexes:
+            self._tag_indexes[tag_format] = TagVersionIndex.load(self.repo, tag_format)
+        return self._tag_indexes[tag_format]
+
+    @property
+    def is_open(self) -> bool:
+        return self._repo is not None
+
+    def invalidate(self) -> None:
+        """Drop everything derived from the refs state. Required after a step has written refs."""
+        self._tag_indexes.clear()
+        # The restarted helpers see the new objects
+        self.stop_helpers()
+
+    def stop_helpers(self) -> None:
+        """Stop the persistent git helper processes (``git cat-file``). They are restarted on demand, the repository and the tag indexes are kept."""
+        if self._repo is not None:
+            self._repo.git.clear_cache()
+
+    def close(self) -> None:
+        self._tag_indexes.clear()
+        if self._repo is not None:
+            self._repo.close()
+            self._repo = None
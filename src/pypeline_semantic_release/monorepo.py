@@ -0,0 +1,132 @@
+import dataclasses
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from git import Repo
+from git.objects.commit import Commit
+from git.util import hex_to_bin
+from py_app_dev.core.logging import logger
+from semantic_release import VersionTranslator
+from semantic_release.cli.config import RuntimeContext
+
+from pypeline_semantic_release.commit_parse_cache import CachingCommitParser
+from pypeline_semantic_release.create_release_commit import PackageConfig
+from pypeline_semantic_release.git_repo_session import GitRepoSession
+from pypeline_semantic_release.release_analysis import ReleaseAnalysis, ReleaseAnalyzer
+
+
+def touches_path(file: str, path: str) -> bool:
+    """Whether the file (relative to the repository root) is the given path or inside of it."""
+    path = path.strip("/")
+    return not path or path == "." or file == path or file.startswith(f"{path}/")
+
+
+class MonorepoAnalyzer:
+    """
+    Compute the next versions of all packages of a monorepo with one pass over the history.
+
+    * the base release of every package (tags with the package tag format) is searched in parallel
+    * the commits since the oldest base release are listed once, with their changed files (``git log --name-only``)
+    * every commit is routed to the packages whose paths it changes and which did not release it yet;
+      merge commits do not change files on their own and are not routed
+    * every routed commit is parsed once and the next versions are computed in parallel
+
+    The workers use their own repository instances, the persistent git helper processes cannot be shared between threads.
+    """
+
+    def __init__(self, session: GitRepoSession, packages: list[PackageConfig], max_workers: int = 4) -> None:
+        self.session = session
+        self.packages = packages
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._repos: list[Repo] = []
+        self._lock = threading.Lock()
+
+    def analyze(self, runtime: RuntimeContext) -> dict[str, ReleaseAnalysis]:
+        """Release analysis of every package, by package name."""
+        runtimes = {package.name: self.package_runtime(runtime, package) for package in self.packages}
+        tag_indexes = {package.name: self.session.tag_index(package.tag_format) for package in self.packages}
+        names = list(runtimes)
+
+        def find_base_tags(name: str) -> tuple[str | None, str | None]:
+            return ReleaseAnalyzer(self._repo(), tag_indexes[name]).find_base_tags(runtimes[name])
+
+        def analyze_package(name: str) -> ReleaseAnalysis:
+            return ReleaseAnalyzer(self._repo(), tag_indexes[name], base_tags[name]).analyze(runtimes[name], commits[name], commit_parser)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                base_tags = dict(zip(names, executor.map(find_base_tags, names), strict=True))
+                base_commits = {name: tag_indexes[name].get_commit(base_tag) if base_tag else None for name, (_, base_tag) in base_tags.items()}
+                commits = self.route_commits(base_commits)
+                # Parse every routed commit once, the analysis of the packages only reads the cached results
+                commit_parser = CachingCommitParser.load(self.session.repo, runtime.commit_parser)
+                for commit in {commit.hexsha: commit for package_commits in commits.values() for commit in package_commits}.values():
+                    commit_parser.parse(commit)
+                commit_parser.save()
+                analyses = list(executor.map(analyze_package, names))
+        finally:
+            for repo in self._repos:
+                repo.close()
+            self._repos.clear()
+        for name, analysis in zip(names, analyses, strict=True):
+            analysis.base_commit = base_commits[name]
+        return dict(zip(names, analyses, strict=True))
+
+    def route_commits(self, base_commits: dict[str, str | None]) -> dict[str, list[Commit]]:
+        """
+        List the commits since the oldest base release once and route them to the packages, newest first.
+
+        The commits are listed children before parents, so the base releases are propagated to their ancestors
+        while walking: a commit reachable from the base release of a package was already released for it.
+        """
+        repo = self.session.repo
+        names = list(base_commits)
+        # A package without paths is the whole repository
+        paths = {package.name: package.paths or ["."] for package in self.packages}
+        released_at: dict[str, int] = {}
+        for bit, name in enumerate(names):
+            sha = base_commits[name]
+            if sha:
+                released_at[sha] = released_at.get(sha, 0) | 1 << bit
+        args = ["--topo-order", "--no-renames", "--name-only", "--format=%x00%H %P%x1f%B%x1f", "HEAD"]
+        if released_at and all(base_commits.values()):
+            # Everything reachable from all base releases was released for every package
+            args.append(f"^{repo.git.merge_base('--octopus', *released_at)}")
+        routed: dict[str, list[Commit]] = {name: [] for name in names}
+        released: dict[str, int] = {}
+        walked = 0
+        for record in repo.git.log(*args).split("\0")[1:]:
+            header, message, files = record.split("\x1f", 2)
+            sha, *parents = header.split()
+            released_mask = released.pop(sha, 0) | released_at.get(sha, 0)
+            for parent in parents:
+                released[parent] = released.get(parent, 0) | released_mask
+            walked += 1
+            changed_files = [file for file in files.splitlines() if file]
+            commit: Commit | None = None
+            for bit, name in enumerate(names):
+                if released_mask & 1 << bit or not any(touches_path(file, path) for file in changed_files for path in paths[name]):
+                    continue
+                if commit is None:
+                    # The message is already known, the commit does not have to be read again for parsing
+                    commit = Commit(repo, hex_to_bin(sha), message=message, parents=[Commit(repo, hex_to_bin(parent)) for parent in parents])
+                routed[name].append(commit)
+        logger.info(f"Routed {walked} commits to {len(names)} packages: " + ", ".join(f"{name} ({len(commits)})" for name, commits in routed.items()))
+        return routed
+
+    @staticmethod
+    def package_runtime(runtime: RuntimeContext, package: PackageConfig) -> RuntimeContext:
+        """Runtime context of the repository with the tag format of the package."""
+        translator = VersionTranslator(tag_format=package.tag_format, prerelease_token=runtime.version_translator.prerelease_token)
+        return dataclasses.replace(runtime, version_translator=translator)
+
+    def _repo(self) -> Repo:
+        """Repository instance of the current worker thread."""
+        repo = getattr(self._local, "repo", None)
+        if repo is None:
+            repo = Repo(str(self.session.repo_dir))
+            self._local.repo = repo
+            with self._lock:
+                self._repos.append(repo)
+        return repo
@@ -0,0 +1,247 @@
+import hashlib
+import re
+import secrets
+import tarfile
+import time
+import zipfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import Message
+from email.parser import HeaderParser
+from pathlib import Path
+
+import requests
+from py_app_dev.core.exceptions import UserNotificationException
+from py_app_dev.core.logging import logger
+from requests.adapters import HTTPAdapter
+
+#: Upload URL of PyPI (legacy upload API)
+PYPI_UPLOAD_URL = "https://upload.pypi.org/legacy/"
+
+#: Size of the chunks read from the distribution files
+CHUNK_SIZE = 1024 * 1024
+
+#: Metadata fields which can be used several times and their (plural) name in the upload form
+MULTIPLE_USE_FIELDS = {
+    "Classifier": "classifiers",
+    "Project-URL": "project_urls",
+    "Platform": "platform",
+    "Supported-Platform": "supported_platform",
+    "Requires-Dist": "requires_dist",
+    "Provides-Dist": "provides_dist",
+    "Obsoletes-Dist": "obsoletes_dist",
+    "Requires-External": "requires_external",
+    "Provides-Extra": "provides_extra",
+    "Dynamic": "dynamic",
+    "License-File": "license_file",
+}
+
+
+@dataclass
+class Distribution:
+    """Built distribution (wheel or sdist) with the metadata required by the upload API."""
+
+    path: Path
+    #: ``bdist_wheel`` or ``sdist``
+    filetype: str
+    #: Python tag of the wheel (e.g. ``py3``) or ``source``
+    pyversion: str
+    #: Core metadata (``METADATA`` or ``PKG-INFO``)
+    metadata: Message
+    sha256_digest: str
+    blake2_256_digest: str
+
+    @property
+    def name(self) -> str:
+        return str(self.metadata["Name"])
+
+    @property
+    def version(self) -> str:
+        return str(self.metadata["Version"])
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Distribution":
+        if path.name.endswith(".whl"):
+            # name-version(-build)?-python-abi-platform.whl
+            filetype, pyversion, metadata = "bdist_wheel", path.stem.split("-")[-3], _read_wheel_metadata(path)
+        elif path.name.endswith(".tar.gz"):
+            filetype, pyversion, metadata = "sdist", "source", _read_sdist_metadata(path)
+        else:
+            raise UserNotificationException(f"Unknown distribution format of {path}. Expected a wheel or a .tar.gz sdist.")
+        sha256, blake2_256 = hashlib.sha256(), hashlib.blake2b(digest_size=32)
+        with path.open("rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                sha256.update(chunk)
+                blake2_256.update(chunk)
+        return cls(path, filetype, pyversion, metadata, sha256.hexdigest(), blake2_256.hexdigest())
+
+    def form_fields(self) -> list[tuple[str, str]]:
+        """Return the fields of the upload form, without the file content."""
+        fields = [
+            (":action", "file_upload"),
+            ("protocol_version", "1"),
+            ("filetype", self.filetype),
+            ("pyversion", self.pyversion),
+            ("sha256_digest", self.sha256_digest),
+            ("blake2_256_digest", self.blake2_256_digest),
+        ]
+        for key, value in self.metadata.items():
+            fields.append((MULTIPLE_USE_FIELDS.get(key, key.lower().replace("-", "_")), str(value)))
+        description = self.metadata.get_payload()
+        if isinstance(description, str) and description.strip():
+            fields.append(("description", description))
+        return fields
+
+
+def _parse_metadata(content: bytes, path: Path) -> Message:
+    metadata = HeaderParser().parsestr(content.decode("utf-8"))
+    if not metadata["Name"] or not metadata["Version"]:
+        raise UserNotificationException(f"Metadata of {path} has no name or version.")
+    return metadata
+
+
+def _read_wheel_metadata(path: Path) -> Message:
+    with zipfile.ZipFile(path) as wheel:
+        for name in wheel.namelist():
+            parts = name.split("/")
+            if len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "METADATA":
+                return _parse_metadata(wheel.read(name), path)
+    raise UserNotificationException(f"No METADATA file found in {path}.")
+
+
+def _read_sdist_metadata(path: Path) -> Message:
+    with tarfile.open(path, "r:gz") as sdist:
+        for member in sdist:
+            parts = member.name.split("/")
+            if len(parts) == 2 and parts[1] == "PKG-INFO" and member.isfile():
+                file = sdist.extractfile(member)
+                if file:
+                    return _parse_metadata(file.read(), path)
+    raise UserNotificationException(f"No PKG-INFO file found in {path}.")
+
+
+class MultipartBody:
+    """
+    multipart/form-data body which streams the file from disk.
+
+    The length is known in advance, so the request is sent with a Content-Length header and not chunked.
+    Iterating again (e.g. when the request is retried) reads the file again.
+    """
+
+    def __init__(self, fields: list[tuple[str, str]], file_field: str, file: Path) -> None:
+        self.boundary = secrets.token_hex(16)
+        self.file = file
+        head = b"".join(self._part_header(f'name="{name}"') + value.encode("utf-8") + b"\r\n" for name, value in fields)
+        self.head = head + self._part_header(f'name="{file_field}"; filename="{file.name}"', "application/octet-stream")
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, disposition: str, content_type: str | None = None) -> bytes:
+        header = f"--{self.boundary}\r\nContent-Disposition: form-data; {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    def __len__(self) -> int:
+        """Content length of the request."""
+        return len(self.head) + self.file.stat().st_size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the body in chunks."""
+        yield self.head
+        with self.file.open("rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+        yield self.tail
+
+
+class PackageUploader:
+    """
+    Upload distributions with the legacy upload API (as used by PyPI, devpi, Nexus, Artifactory, etc.).
+
+    All uploads share one HTTP session. Its connection pool keeps one keep-alive connection per parallel upload,
+    so the TCP and TLS handshakes happen once per connection and not once per file.
+    """
+
+    def __init__(self, repository_url: str, username: str, password: str, max_workers: int = 4, timeout: float = 300) -> None:
+        self.repository_url = repository_url
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self) -> "PackageUploader":
+        """Use the uploader as context manager to close the connections when done."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the connections."""
+        self.session.close()
+
+    def upload(self, distributions: list[Distribution]) -> None:
+        """Upload the distributions. The first one creates the release, the others are uploaded in parallel afterwards."""
+        if not distributions:
+            return
+        # Uploading the first files of a new release at the same time makes the index create the release twice
+        self.upload_file(distributions[0])
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upload") as executor:
+            # Consume the results to raise the first error
+            list(executor.map(self.upload_file, distributions[1:]))
+
+    def upload_file(self, distribution: Distribution) -> None:
+        body = MultipartBody(distribution.form_fields(), "content", distribution.path)
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.repository_url,
+                data=body,
+                headers={"Content-Type": body.content_type},
+                timeout=self.timeout,
+                # A redirect means a wrong upload URL, the file would be posted again to a page which does not accept it
+                allow_redirects=False,
+            )
+        except requests.RequestException as exc:
+            raise UserNotificationException(f"Failed to upload {distribution.path.name} to {self.repository_url}: {exc}") from exc
+        # Any 2xx status is a successful upload, but not a redirect which is not followed
+        if not 200 <= response.status_code < 300:
+            raise UserNotificationException(f"Failed to upload {distribution.path.name} to {self.repository_url}. Status: {response.status_code} {response.reason}")
+        logger.info(f"Uploaded {distribution.path.name} ({len(body) / 1024:.0f} KiB) in {time.perf_counter() - start:.2f}s")
+
+
+def normalize_version(version: str) -> str:
+    """Normalize semantic versions (``1.0.0-rc.1``) and PEP 440 versions (``1.0.0rc1``) to the same string."""
+    match = re.match(r"v?(\d+(?:\.\d+)*)(.*)", version.strip().lower())
+    if not match:
+        return version
+    release, suffix = match.groups()
+    return release + re.sub(r"[-_.]", "", suffix).replace("alpha", "a").replace("beta", "b")
+
+
+def _version_from_filename(path: Path) -> str:
+    """Version in the file name of a wheel (``name-version-...whl``) or sdist (``name-version.tar.gz``)."""
+    if path.name.endswith(".whl"):
+        return path.name.split("-")[1]
+    return path.name.removesuffix(".tar.gz").rsplit("-", 1)[-1]
+
+
+def find_distributions(dist_dir: Path, version: str | None = None) -> list[Distribution]:
+    """
+    Return the sdists and wheels in the directory, optionally only the ones of the given version. Sdists come first.
+
+    The files of other versions are selected by their name, they are neither read nor hashed (e.g. outdated or corrupt files of earlier releases).
+    """
+    paths = sorted([*dist_dir.glob("*.tar.gz"), *dist_dir.glob("*.whl")])
+    if version is not None:
+        paths = [path for path in paths if normalize_version(_version_from_filename(path)) == normalize_version(version)]
+    distributions = [Distribution.from_file(path) for path in paths]
+    if version is not None:
+        # The metadata is authoritative, the file name could be wrong
+        distributions = [distribution for distribution in distributions if normalize_version(distribution.version) == normalize_version(version)]
+    return sorted(distributions, key=lambda distribution: distribution.filetype != "sdist")
@@ -0,0 +1,101 @@
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from mashumaro.mixins.dict import DataClassDictMixin
+
+from pypeline_semantic_release.cache import write_json_cache
+
+if sys.platform != "win32":
+    import resource
+
+#: Report file relative to the project root directory
+REPORT_FILE = Path("build/pypeline_semantic_release/process_usage.json")
+
+#: Options whose value must not end up in the report
+SECRET_OPTIONS = {"--password", "--token", "-p"}
+
+
+@dataclass
+class ProcessResourceUsage(DataClassDictMixin):
+    """Resources used by a child process launched by a step."""
+
+    #: Name of the step which launched the process
+    step: str
+    #: Command line of the process, with credentials redacted
+    command: list[str]
+    #: Return code of the process. None if the process could not be started.
+    returncode: int | None
+    #: Elapsed wall clock time in seconds
+    wall_time: float
+    #: CPU time spent in user mode in seconds. None if not supported by the platform
+    #: or if processes of other steps ran at the same time (e.g. in a publish group).
+    user_time: float | None = None
+    #: CPU time spent in kernel mode in seconds. None if not supported by the platform
+    #: or if processes of other steps ran at the same time (e.g. in a publish group).
+    system_time: float | None = None
+    #: Peak resident set size in bytes. None if not supported by the platform, if processes of other steps ran
+    #: at the same time or if it did not exceed the peak of a process which was launched before.
+    max_rss: int | None = None
+
+
+@dataclass
+class ProcessUsageReport(DataClassDictMixin):
+    processes: list[ProcessResourceUsage] = field(default_factory=list)
+
+
+class _ChildrenUsage(NamedTuple):
+    user_time: float
+    system_time: float
+    max_rss: int
+
+
+def _get_children_usage() -> _ChildrenUsage | None:
+    if sys.platform == "win32":
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux reports kilobytes, macOS bytes
+    max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return _ChildrenUsage(usage.ru_utime, usage.ru_stime, max_rss)
+
+
+def redact_command(command: list[Any]) -> list[str]:
+    """Command as strings, with the values of the secret options replaced."""
+    redacted: list[str] = []
+    for arg in map(str, command):
+        redacted.append("***" if redacted and redacted[-1] in SECRET_OPTIONS else arg)
+    return redacted
+
+
+class ChildProcessMeter:
+    """
+    Measure the resources used by the child processes waited for between creation and :meth:`stop`.
+
+    The CPU times are the deltas of ``getrusage(RUSAGE_CHILDREN)``. They only belong to a single process
+    if no other child process of the current process terminated in the meantime (e.g. from another thread).
+    """
+
+    def __init__(self) -> None:
+        self.start_time = time.perf_counter()
+        self.start_usage = _get_children_usage()
+
+    def stop(self, step: str, command: list[Any], returncode: int | None) -> ProcessResourceUsage:
+        record = ProcessResourceUsage(step=step, command=redact_command(command), returncode=returncode, wall_time=time.perf_counter() - self.start_time)
+        end_usage = _get_children_usage()
+        if self.start_usage and end_usage:
+            record.user_time = end_usage.user_time - self.start_usage.user_time
+            record.system_time = end_usage.system_time - self.start_usage.system_time
+            # The peak is the maximum over all children, it only tells something if it grew
+            record.max_rss = end_usage.max_rss if end_usage.max_rss > self.start_usage.max_rss else None
+        return record
+
+
+def write_report(project_root_dir: Path, records: list[ProcessResourceUsage]) -> Path | None:
+    """Write all records to the JSON report. Return the report file. Nothing is written if the project directory does not exist."""
+    if not project_root_dir.is_dir():
+        return None
+    report_file = project_root_dir / REPORT_FILE
+    write_json_cache(report_file, ProcessUsageReport(processes=records))
+    return report_file
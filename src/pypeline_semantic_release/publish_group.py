@@ -0,0 +1,180 @@
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.exceptions import UserNotificationException
+from py_app_dev.core.logging import logger
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.base import BaseStep, change_directory
+from pypeline_semantic_release.process_usage import ProcessResourceUsage, write_report
+
+if TYPE_CHECKING:
+    from loguru import Message
+
+#: Publish steps which can be referenced by their name. Other steps are referenced as ``module:Class``.
+PUBLISH_STEPS = {
+    "PublishPackage": "pypeline_semantic_release.publish_package:PublishPackage",
+    "PublishToOrphanBranch": "pypeline_semantic_release.publish_to_orphan_branch:PublishToOrphanBranch",
+}
+
+#: Directory relative to the project root directory with the log file of every step of the group
+LOG_DIR = Path("build/pypeline_semantic_release/publish_group")
+
+
+@dataclass
+class PublishStepConfig(DataClassDictMixin):
+    #: Name of the step (e.g. "PublishPackage") or ``module:Class`` of a step derived from :class:`BaseStep`
+    step: str
+    #: Configuration of the step
+    config: dict[str, Any] | None = None
+
+
+@dataclass
+class PublishGroupConfig(DataClassDictMixin):
+    """Configuration for the PublishGroup step."""
+
+    #: Publish steps to run concurrently. Results and errors are reported in this order.
+    steps: list[PublishStepConfig] = field(default_factory=list)
+    #: Maximum number of steps running at the same time
+    max_workers: int = 4
+
+
+@dataclass
+class PublishStepResult:
+    """Outcome of a step of the publish group."""
+
+    #: Name of the step, numbered if it is used several times in the group (e.g. ``PublishPackage-2``)
+    step: str
+    #: Elapsed wall clock time in seconds
+    duration: float
+    #: Log messages of the step
+    log: list[str] = field(default_factory=list)
+    #: Error message if the step failed
+    error: str | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def load_step_class(name: str) -> type[BaseStep]:
+    """Return the step class for a name of :data:`PUBLISH_STEPS` or a ``module:Class`` reference. The module is imported only now."""
+    module_name, _, class_name = PUBLISH_STEPS.get(name, name).partition(":")
+    if not class_name:
+        raise UserNotificationException(f"Unknown publish step '{name}'. Use one of {', '.join(PUBLISH_STEPS)} or 'module:Class'.")
+    try:
+        step_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as exc:
+        raise UserNotificationException(f"Could not load publish step '{name}': {exc}") from exc
+    if not (isinstance(step_class, type) and issubclass(step_class, BaseStep)):
+        raise UserNotificationException(f"Publish step '{name}' is not a pipeline step.")
+    return step_class
+
+
+class PublishGroup(BaseStep):
+    """
+    Run independent publish steps concurrently.
+
+    The steps only read the release commit and the CI context from the data registry and spend most of their time
+    waiting for the network. Running them on a thread pool makes the release take as long as the slowest step.
+    Every step uses its own git repository session, the GitPython helper processes cannot be shared between threads.
+    The log messages of every step are collected and written to one file per step. The resource usages of the launched
+    processes are registered when all steps are done, without CPU times because the processes ran at the same time.
+    All steps run to completion, afterwards the failures are reported in the configured order.
+    """
+
+    def __init__(self, execution_context: ExecutionContext, group_name: str | None = None, config: dict[str, Any] | None = None) -> None:
+        super().__init__(execution_context, group_name, config)
+        self.group_config = PublishGroupConfig.from_dict(self.config) if self.config else PublishGroupConfig()
+        self.steps = [load_step_class(step.step)(execution_context, group_name, step.config) for step in self.group_config.steps]
+        names = [step.get_name() for step in self.steps]
+        if names.count("PublishToOrphanBranch") > 1:
+            # Both would use the same git repository at the same time
+            raise UserNotificationException("PublishToOrphanBranch can only be used once in a publish group. Use its 'targets' to publish several branches.")
+        #: Unique name of every step for the results and the log files
+        self.step_names = [f"{name}-{names[:position].count(name) + 1}" if names.count(name) > 1 else name for position, name in enumerate(names)]
+        self.results: list[PublishStepResult] = []
+
+    def run(self) -> None:
+        self.logger.info(f"Running {self.get_name()} step with {', '.join(step.get_name() for step in self.steps) or 'no steps'}.")
+        # The steps change into the project directory themselves. The working directory is shared by all threads,
+        # it must already be the project directory such that a step finishing early does not change it for the others.
+        # The step span registers the shared tracer before the threads could register one each.
+        with change_directory(self.execution_context.project_root_dir), self.step_span():
+            with ThreadPoolExecutor(max_workers=max(1, self.group_config.max_workers), thread_name_prefix=self.get_name()) as executor:
+                self.results = list(executor.map(self._run_step, self.steps, self.step_names))
+        self._register_process_usages()
+        self._invalidate_shared_sessions()
+
+        for result in self.results:
+            status = "[OK]" if result.succeeded else f"[FAILED] {result.error}"
+            self.logger.info(f"{result.step} finished in {result.duration:.2f}s {status}")
+        failures = [result for result in self.results if not result.succeeded]
+        if failures:
+            raise UserNotificationException("Publishing failed: " + "; ".join(f"{result.step}: {result.error}" for result in failures))
+
+    def update_execution_context(self) -> None:
+        # Sequentially and in the configured order, the data registry is not thread-safe
+        for step in self.steps:
+            step.update_execution_context()
+
+    def _run_step(self, step: BaseStep, name: str) -> PublishStepResult:
+        from pypeline_semantic_release.git_repo_session import GitRepoSession
+
+        result = PublishStepResult(step=name, duration=0.0)
+        # The GitPython helper processes cannot be shared between threads, every step uses its own repository
+        step.repo_session = GitRepoSession(self.execution_context.project_root_dir)
+        step.process_usages = []
+
+        def collect(message: "Message") -> None:
+            result.log.append(message.rstrip("\n"))
+
+        # Every thread has its own context, the sink only gets the messages of this step
+        sink_id = logger.add(collect, filter=lambda record: record["extra"].get("publish_step") == id(result), format="{time:HH:mm:ss.SSS} | {level: <8} | {message}")
+        start = time.perf_counter()
+        try:
+            with logger.contextualize(publish_step=id(result)), self.span(f"publish {result.step}"):
+                step.run()
+        except UserNotificationException as exc:
+            result.error = str(exc)
+        except Exception as exc:
+            # Unexpected errors of one step shall not hide the results of the other steps
+            logger.opt(exception=exc).error(f"{result.step} failed unexpectedly.")
+            result.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            result.duration = time.perf_counter() - start
+            logger.remove(sink_id)
+            step.repo_session.close()
+        self._write_log(result)
+        return result
+
+    def _register_process_usages(self) -> None:
+        """Register the processes of all steps after the threads finished, also of the failed steps."""
+        usages = [usage for step in self.steps for usage in step.process_usages or []]
+        if not usages:
+            return
+        for usage in usages:
+            self.execution_context.data_registry.insert(usage, usage.step)
+        write_report(self.execution_context.project_root_dir, self.execution_context.data_registry.find_data(ProcessResourceUsage))
+
+    def _invalidate_shared_sessions(self) -> None:
+        """The steps wrote refs with their own repository sessions, the pipeline session must not use outdated state."""
+        from pypeline_semantic_release.git_repo_session import GitRepoSession
+
+        for session in self.execution_context.data_registry.find_data(GitRepoSession):
+            session.invalidate()
+
+    def _write_log(self, result: PublishStepResult) -> None:
+        if not self.execution_context.project_root_dir.is_dir():
+            return
+        log_file = self.execution_context.project_root_dir / LOG_DIR / f"{result.step}.log"
+        try:
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            log_file.write_text("\n".join(result.log) + "\n")
+        except OSError as exc:
+            self.logger.warning(f"Could not write log file {log_file}: {exc}")
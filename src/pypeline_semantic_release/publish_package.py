@@ -1,12 +1,37 @@
 import os
+import sys
 from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
 from typing import TypeVar
 
 from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.exceptions import UserNotificationException
 
 from pypeline_semantic_release.base import BaseStep
 from pypeline_semantic_release.check_ci_context import CIContext
-from pypeline_semantic_release.create_release_commit import ReleaseCommit
+from pypeline_semantic_release.create_release_commit import find_release_commit
+
+
+class PublishBackend(Enum):
+    """Tool used to build and publish the package."""
+
+    #: ``poetry build`` and ``poetry publish``
+    POETRY = "poetry"
+    #: ``uv build`` and ``uv publish``
+    UV = "uv"
+    #: PEP 517 ``python -m build``. It cannot publish, the distributions are always uploaded natively.
+    BUILD = "build"
+
+
+class UploadMethod(Enum):
+    """How the distributions are uploaded to the repository."""
+
+    #: With the publish command of the backend (e.g. ``poetry publish --build``)
+    BACKEND = "backend"
+    #: Build with the backend and upload the distributions of the released version from this process.
+    #: The files are uploaded in parallel over pooled keep-alive connections and the credentials are not passed on the command line.
+    NATIVE = "native"
 
 
 @dataclass
@@ -19,6 +44,76 @@ class PublishPackageConfig(DataClassDictMixin):
     pypi_user_env: str = "PYPI_USER"
     #: Environment variable name for the pypi repository password
     pypi_password_env: str = "PYPI_PASSWD"  # noqa: S105
+    #: Tool used to build and publish the package
+    backend: PublishBackend = PublishBackend.POETRY
+    #: How the distributions are uploaded
+    upload_method: UploadMethod = UploadMethod.BACKEND
+    #: Upload URL (legacy upload API) of the repository for the uv and the native upload. If not set, the package is uploaded to PyPI.
+    pypi_repository_url: str | None = None
+    #: Maximum number of distributions uploaded at the same time by the native upload
+    max_parallel_uploads: int = 4
+    #: Reuse the distributions built before from the same git tree and version (e.g. when a release is retried)
+    build_cache: bool = False
+    #: Number of builds kept in the build cache
+    build_cache_size: int = 10
+    #: Directory of the build cache, absolute or relative to the project root directory (e.g. a directory kept by the CI between jobs).
+    #: If not set, the cache is stored inside the ``.git`` directory.
+    build_cache_dir: str | None = None
+    #: Package to publish if the packages of a monorepo were released (``packages`` of the CreateReleaseCommit step)
+    package: str | None = None
+
+
+class PackageBackend:
+    """Commands of a tool to build and publish the package. The distributions are built into ``dist``."""
+
+    #: Whether the publish command can build the distributions itself
+    publish_builds: bool = False
+
+    def __init__(self, command: list[str | Path]) -> None:
+        self.command = command
+
+    def build_command(self) -> list[str | Path]:
+        return [*self.command, "build"]
+
+    def publish_command(self, config: PublishPackageConfig, credentials: tuple[str, str] | None, files: list[Path], build: bool = False) -> list[str | Path] | None:
+        """Command uploading the files. None if the tool cannot publish."""
+        return None
+
+    def publish_env(self, credentials: tuple[str, str] | None) -> dict[str, str]:
+        """Environment variables of the publish command, e.g. with the credentials."""
+        return {}
+
+
+class PoetryBackend(PackageBackend):
+    publish_builds = True
+
+    def publish_command(self, config: PublishPackageConfig, credentials: tuple[str, str] | None, files: list[Path], build: bool = False) -> list[str | Path] | None:
+        # Poetry selects the files of the project version in dist itself
+        auth_args = ["--username", credentials[0], "--password", credentials[1], "--repository", config.pypi_repository_name] if credentials and config.pypi_repository_name else []
+        return [*self.command, "publish", *(["--build"] if build else []), *auth_args]
+
+
+class UvBackend(PackageBackend):
+    def publish_command(self, config: PublishPackageConfig, credentials: tuple[str, str] | None, files: list[Path], build: bool = False) -> list[str | Path] | None:
+        if config.pypi_repository_name:
+            # Index with a publish-url in [[tool.uv.index]]
+            repository_args = ["--index", config.pypi_repository_name]
+        elif config.pypi_repository_url:
+            repository_args = ["--publish-url", config.pypi_repository_url]
+        else:
+            repository_args = []
+        # Only the files of the released version, uv would upload everything in dist
+        return [*self.command, "publish", *repository_args, *files]
+
+    def publish_env(self, credentials: tuple[str, str] | None) -> dict[str, str]:
+        # Not on the command line, it is visible in the process list
+        return {"UV_PUBLISH_USERNAME": credentials[0], "UV_PUBLISH_PASSWORD": credentials[1]} if credentials else {}
+
+
+class PypaBuildBackend(PackageBackend):
+    def build_command(self) -> list[str | Path]:
+        # The command is already complete (``python -m build``)
+        return list(self.command)
 
 
 T = TypeVar("T")
@@ -28,38 +123,116 @@ class PublishPackage(BaseStep):
     """Publish the package to PyPI."""
 
     def run(self) -> None:
-        self.logger.info(f"Running {self.get_name()} step.")
-        release_commit = self.find_data(ReleaseCommit)
-        if release_commit:
-            self.logger.info(f"Found release commit: {release_commit}")
-            ci_context = self.find_data(CIContext)
-            if ci_context:
-                if ci_context.is_ci and not ci_context.is_pull_request:
-                    self.publish_package()
+        with self.repo_session_scope(), self.step_span():
+            self.logger.info(f"Running {self.get_name()} step.")
+            config = PublishPackageConfig.from_dict(self.config) if self.config else PublishPackageConfig()
+            release_commit = find_release_commit(self.execution_context, config.package)
+            if release_commit:
+                self.logger.info(f"Found release commit: {release_commit}")
+                ci_context = self.find_data(CIContext)
+                if ci_context:
+                    if ci_context.is_ci and not ci_context.is_pull_request:
+                        self.publish_package()
+                    else:
+                        self.logger.info("Not running on CI or pull request. Skip publishing the package.")
                 else:
-                    self.logger.info("Not running on CI or pull request. Skip publishing the package.")
+                    self.logger.info("CI context Unknown. Skip publishing the package.")
             else:
-                self.logger.info("CI context Unknown. Skip publishing the package.")
-        else:
-            self.logger.info("No release commit found. There is nothing to be published.")
+                self.logger.info("No release commit found. There is nothing to be published.")
 
     def publish_package(self) -> None:
         config = PublishPackageConfig.from_dict(self.config) if self.config else PublishPackageConfig()
-        publish_auth_args = []
-        if config.pypi_repository_name:
+        backend = self.create_backend(config.backend)
+        if config.upload_method == UploadMethod.NATIVE or config.backend == PublishBackend.BUILD:
+            self.upload_package(config, backend)
+            return
+        if config.backend == PublishBackend.POETRY and config.pypi_repository_url and not config.pypi_repository_name:
+            raise UserNotificationException(
+                f"Poetry cannot publish to the URL {config.pypi_repository_url}, it needs a repository name. "
+                "Configure the repository with 'poetry config repositories.<name> <url>' and set pypi_repository_name, or use the native upload."
+            )
+        credentials = None
+        if config.pypi_repository_name or config.pypi_repository_url:
             pypi_user = os.getenv(config.pypi_user_env, None)
             pypi_password = os.getenv(config.pypi_password_env, None)
             if not pypi_user or not pypi_password:
                 self.logger.warning(
-                    f"Custom pypi repository {config.pypi_repository_name} configured but no credentials. "
+                    f"Custom pypi repository {config.pypi_repository_name or config.pypi_repository_url} configured but no credentials. "
                     f"{config.pypi_user_env} or {config.pypi_password_env} environment variables not set. "
                     "Skip releasing and publishing to PyPI."
                 )
                 return
-            publish_auth_args = ["--username", pypi_user, "--password", pypi_password, "--repository", config.pypi_repository_name]
-        self.execute_process([*self.get_poetry_command(), "publish", "--build", *publish_auth_args], "Failed to publish package to PyPI.")
+            credentials = (pypi_user, pypi_password)
+        if backend.publish_builds and not config.build_cache:
+            command = backend.publish_command(config, credentials, [], build=True)
+        else:
+            version = self.build_package(config, backend)
+            # Only needed to select the files of the released version
+            from pypeline_semantic_release.package_upload import find_distributions
+
+            files = [distribution.path for distribution in find_distributions(self.execution_context.project_root_dir / "dist", version)]
+            command = backend.publish_command(config, credentials, files)
+        if command is None:
+            raise UserNotificationException(f"The {config.backend.value} backend cannot publish. Use the native upload.")
+        self.execute_process(command, "Failed to publish package to PyPI.", backend.publish_env(credentials))
         self.logger.info("[OK] Package published to PyPI.")
 
+    def upload_package(self, config: PublishPackageConfig, backend: PackageBackend) -> None:
+        # Only needed for the native upload
+        from pypeline_semantic_release.package_upload import PYPI_UPLOAD_URL, PackageUploader, find_distributions
+
+        pypi_user = os.getenv(config.pypi_user_env, None)
+        pypi_password = os.getenv(config.pypi_password_env, None)
+        if not pypi_user or not pypi_password:
+            self.logger.warning(f"{config.pypi_user_env} or {config.pypi_password_env} environment variables not set. Skip publishing to PyPI.")
+            return
+        version = self.build_package(config, backend)
+        distributions = find_distributions(self.execution_context.project_root_dir / "dist", version)
+        if not distributions:
+            raise UserNotificationException(f"No distributions of version {version} found in dist.")
+        repository_url = config.pypi_repository_url or PYPI_UPLOAD_URL
+        with self.span("upload", repository=repository_url, files=len(distributions)):
+            with PackageUploader(repository_url, pypi_user, pypi_password, config.max_parallel_uploads) as uploader:
+                uploader.upload(distributions)
+        self.logger.info(f"[OK] Package uploaded to {repository_url}.")
+
+    def build_package(self, config: PublishPackageConfig, backend: PackageBackend) -> str | None:
+        """Build the distributions of the released version into ``dist`` or restore them from the build cache. Returns the version."""
+        release_commit = find_release_commit(self.execution_context, config.package)
+        version = str(release_commit.version) if release_commit else None
+        if not config.build_cache or version is None:
+            self.execute_process(backend.build_command(), "Failed to build package.")
+            return version
+        # Only needed for the build cache
+        from pypeline_semantic_release.build_cache import DistributionCache
+        from pypeline_semantic_release.package_upload import find_distributions
+
+        repo = self.get_repo_session().repo
+        if repo.is_dirty():
+            self.logger.info("The working tree has uncommitted changes. Build without cache.")
+            self.execute_process(backend.build_command(), "Failed to build package.")
+            return version
+        cache_dir = self.execution_context.project_root_dir / config.build_cache_dir if config.build_cache_dir else None
+        cache = DistributionCache.from_repo(repo, config.build_cache_size, cache_dir)
+        tree_sha = repo.head.commit.tree.hexsha
+        dist_dir = self.execution_context.project_root_dir / "dist"
+        with self.span("build cache", tree=tree_sha, version=version) as span:
+            restored = cache.restore(tree_sha, version, dist_dir)
+            span.attributes["hit"] = restored is not None
+        if restored is not None:
+            self.logger.info(f"Reusing cached distributions {', '.join(file.name for file in restored)} of tree {tree_sha}.")
+            return version
+        self.execute_process(backend.build_command(), "Failed to build package.")
+        cache.store(tree_sha, version, [distribution.path for distribution in find_distributions(dist_dir, version)])
+        return version
+
+    def create_backend(self, backend: PublishBackend) -> PackageBackend:
+        if backend == PublishBackend.UV:
+            return UvBackend(self.get_uv_command())
+        if backend == PublishBackend.BUILD:
+            return PypaBuildBackend(self.get_build_command())
+        return PoetryBackend(self.get_poetry_command())
+
     def find_data(self, data_type: type[T]) -> T | None:
         tmp_data = self.execution_context.data_registry.find_data(data_type)
         if len(tmp_data) > 0:
@@ -68,5 +241,13 @@ class PublishPackage(BaseStep):
             return None
 
     @staticmethod
-    def get_poetry_command() -> list[str]:
+    def get_poetry_command() -> list[str | Path]:
         return ["poetry"]
+
+    @staticmethod
+    def get_uv_command() -> list[str | Path]:
+        return ["uv"]
+
+    @staticmethod
+    def get_build_command() -> list[str | Path]:
+        return [sys.executable, "-m", "build"]
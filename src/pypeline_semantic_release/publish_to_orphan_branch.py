@@ -1,16 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
-from typing import Any, TypeVar
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar
 
-from git import Commit, Repo
-from git.exc import GitCommandError
 from mashumaro.mixins.dict import DataClassDictMixin
 from py_app_dev.core.exceptions import UserNotificationException
 from py_app_dev.core.logging import logger
+from pypeline.domain.execution_context import ExecutionContext
 
 from pypeline_semantic_release.base import BaseStep, change_directory
+from pypeline_semantic_release.cache import cache_key, get_cache_dir
 from pypeline_semantic_release.check_ci_context import CIContext
-from pypeline_semantic_release.create_release_commit import ReleaseCommit
+from pypeline_semantic_release.create_release_commit import find_release_commit
+from pypeline_semantic_release.release_plan import RELEASE_PLAN_FILE, ReleasePlan
+
+# GitPython is imported only when the step publishes something
+if TYPE_CHECKING:
+    from git import Commit, Repo
+
+
+class OrphanBranchBackend(Enum):
+    """How the orphan branch commit is created."""
+
+    #: Stream the files, the commit and the tag into a single ``git fast-import`` process
+    FAST_IMPORT = "fast-import"
+    #: Add the files to a temporary index file and write the tree from it
+    INDEX = "index"
+    #: Same as ``index``, but the index file is kept between runs (one per branch).
+    #: Only files whose stat data changed since the last run are hashed again.
+    PERSISTENT_INDEX = "persistent-index"
+
+
+class UnchangedTreeAction(Enum):
+    """What to do when the published content is the same as on the tip of the orphan branch."""
+
+    #: Always create a new commit
+    COMMIT = "commit"
+    #: Neither commit nor push
+    SKIP = "skip"
+    #: Only create and push the tag on the existing tip. Same as ``skip`` if no tag shall be created.
+    TAG = "tag"
+
+
+class FetchStrategy(Enum):
+    """How the tip of the orphan branch is fetched from the remote."""
+
+    #: Fetch the whole history of the orphan branch
+    FULL = "full"
+    #: Fetch only the tip commit. Enough to create a child commit and push it fast-forward.
+    SHALLOW = "shallow"
+    #: Fetch only the tip commit and its trees, but not the file contents.
+    #: The ``origin`` remote becomes a promisor remote (partial clone) and missing blobs are fetched on demand.
+    #: If the server does not support filters, the blobs are fetched as for ``shallow``.
+    SHALLOW_BLOBLESS = "shallow-blobless"
+
+    @property
+    def fetch_args(self) -> list[str]:
+        return {
+            FetchStrategy.FULL: [],
+            FetchStrategy.SHALLOW: ["--depth=1"],
+            FetchStrategy.SHALLOW_BLOBLESS: ["--depth=1", "--filter=blob:none"],
+        }[self]
+
+
+@dataclass
+class OrphanBranchTarget(DataClassDictMixin):
+    """Orphan branch to publish to and its content."""
+
+    #: Name of the orphan branch to publish to (e.g. "generated-code", "gh-pages")
+    branch: str
+    #: Files or folders relative to the repo root to include on the orphan branch
+    paths: list[str] = field(default_factory=list)
+    #: Whether to create a tag on the orphan branch commit
+    create_tag: bool = True
 
 
 @dataclass
@@ -18,75 +82,244 @@ class PublishToOrphanBranchConfig(DataClassDictMixin):
     """Configuration for the PublishToOrphanBranch step."""
 
     #: Name of the orphan branch to publish to (e.g. "generated-code", "gh-pages")
-    branch: str
+    branch: str | None = None
     #: Files or folders relative to the repo root to include on the orphan branch
     paths: list[str] = field(default_factory=list)
     #: Whether to create a tag on the orphan branch commit
     create_tag: bool = True
+    #: Additional orphan branches to publish. All branches are fetched with one ``git fetch`` and pushed with one ``git push --atomic``.
+    targets: list[OrphanBranchTarget] = field(default_factory=list)
+    #: How the orphan branch commit is created. See :class:`OrphanBranchBackend`.
+    backend: OrphanBranchBackend = OrphanBranchBackend.INDEX
+    #: What to do if the content did not change compared to the orphan branch tip. See :class:`UnchangedTreeAction`.
+    on_unchanged: UnchangedTreeAction = UnchangedTreeAction.COMMIT
+    #: How the tip of the orphan branch is fetched from the remote. See :class:`FetchStrategy`.
+    fetch: FetchStrategy = FetchStrategy.FULL
+    #: Check the tag and the branch tip on the remote with ``git ls-remote`` before building the tree.
+    #: Publishing is skipped if the tag already exists and the tip is not fetched again if it is available locally.
+    remote_preflight: bool = False
+    #: Package whose release is published if the packages of a monorepo were released (``packages`` of the CreateReleaseCommit step)
+    package: str | None = None
+
+    def get_targets(self) -> list[OrphanBranchTarget]:
+        """All orphan branches to publish: the one configured with ``branch`` followed by the ``targets``."""
+        targets = [OrphanBranchTarget(branch=self.branch, paths=self.paths, create_tag=self.create_tag)] if self.branch else []
+        targets += self.targets
+        branches = [target.branch for target in targets]
+        duplicates = sorted({branch for branch in branches if branches.count(branch) > 1})
+        if duplicates:
+            # The commits of the same branch would be created concurrently and overwrite each other
+            raise UserNotificationException(f"Orphan branch {', '.join(repr(branch) for branch in duplicates)} is configured more than once. Publish every branch only once.")
+        return targets
+
+
+@dataclass
+class RemoteState:
+    #: Whether the remote could be queried
+    reachable: bool
+    #: Branch names mapped to the SHA of their tip on the remote. Branches not existing on the remote are missing.
+    branch_tips: dict[str, str] = field(default_factory=dict)
+    #: Names of the release tags which already exist on the remote
+    tags: set[str] = field(default_factory=set)
+
+
+class Publication(NamedTuple):
+    target: OrphanBranchTarget
+    tag_name: str | None
 
 
 T = TypeVar("T")
 
 
 class PublishToOrphanBranch(BaseStep):
-    """Publish configured files/folders to a separate orphan branch with a clean release tag."""
+    """Publish configured files/folders to separate orphan branches with a clean release tag."""
+
+    def __init__(self, execution_context: ExecutionContext, group_name: str | None = None, config: dict[str, Any] | None = None) -> None:
+        super().__init__(execution_context, group_name, config)
+        #: Branch names mapped to the SHA of the tree built for them
+        self.published_trees: dict[str, str] = {}
 
     def run(self) -> None:
-        self.logger.info(f"Running {self.get_name()} step.")
-        config = PublishToOrphanBranchConfig.from_dict(self.config) if self.config else PublishToOrphanBranchConfig()
+        with self.repo_session_scope(), self.step_span():
+            self.logger.info(f"Running {self.get_name()} step.")
+            config = PublishToOrphanBranchConfig.from_dict(self.config) if self.config else PublishToOrphanBranchConfig()
 
-        release_commit = self._find_data(ReleaseCommit)
-        if not release_commit:
-            self.logger.info("No release commit found. Nothing to publish to orphan branch.")
-            return
+            release_plan = self._find_data(ReleasePlan)
+            if release_plan and release_plan.plan_only:
+                with change_directory(self.execution_context.project_root_dir):
+                    self._plan(config, release_plan)
+                return
 
-        ci_context = self._find_data(CIContext)
-        if not ci_context or not ci_context.is_ci:
-            self.logger.info("Not running on CI. Skip publishing to orphan branch.")
-            return
-        if ci_context.is_pull_request:
-            self.logger.info("Pull request detected. Skip publishing to orphan branch.")
+            release_commit = find_release_commit(self.execution_context, config.package)
+            if not release_commit:
+                self.logger.info("No release commit found. Nothing to publish to orphan branch.")
+                return
+
+            ci_context = self._find_data(CIContext)
+            if not ci_context or not ci_context.is_ci:
+                self.logger.info("Not running on CI. Skip publishing to orphan branch.")
+                return
+            if ci_context.is_pull_request:
+                self.logger.info("Pull request detected. Skip publishing to orphan branch.")
+                return
+
+            publications = []
+            for target in config.get_targets():
+                if not target.paths:
+                    self.logger.warning(f"No paths configured for branch '{target.branch}'. Nothing to publish to this orphan branch.")
+                    continue
+                publications.append(Publication(target, f"{target.branch}-{release_commit.version.as_tag()}" if target.create_tag else None))
+            if not publications:
+                self.logger.warning("No paths configured. Nothing to publish to orphan branch.")
+                return
+
+            with change_directory(self.execution_context.project_root_dir):
+                self._publish(config, publications)
+            if release_plan:
+                self._update_release_plan(release_plan)
+
+    def _plan(self, config: PublishToOrphanBranchConfig, release_plan: ReleasePlan) -> None:
+        """Only add the trees which would be published to the release plan. Neither commits, nor tags, nor pushes."""
+        repo = self.get_repo_session().repo
+        for target in config.get_targets():
+            if target.paths:
+                self._validate_paths(self.execution_context.project_root_dir, target.paths)
+                with self.span("build", branch=target.branch, backend=OrphanBranchBackend.INDEX.value):
+                    self.published_trees[target.branch] = self._build_tree(repo, Path(repo.working_dir), target.paths, f"tmp_index_{cache_key(target.branch)}")
+                self.logger.info(f"Plan-only mode. Tree {self.published_trees[target.branch]} would be published to branch '{target.branch}'.")
+        release_plan.orphan_trees.update(self.published_trees)
+        release_plan.save(self.execution_context.project_root_dir / RELEASE_PLAN_FILE)
+
+    def _update_release_plan(self, release_plan: ReleasePlan) -> None:
+        """Record the published trees. Trees differing from the planned ones mean the outputs are not reproducible."""
+        for branch, tree_sha in self.published_trees.items():
+            planned_tree_sha = release_plan.orphan_trees.get(branch)
+            if planned_tree_sha and planned_tree_sha != tree_sha:
+                self.logger.warning(f"Published tree {tree_sha} of branch '{branch}' differs from the planned tree {planned_tree_sha}.")
+        if self.published_trees:
+            release_plan.orphan_trees.update(self.published_trees)
+            release_plan.save(self.execution_context.project_root_dir / RELEASE_PLAN_FILE)
+
+    def _publish(self, config: PublishToOrphanBranchConfig, publications: list[Publication]) -> None:
+        repo_dir = self.execution_context.project_root_dir
+        session = self.get_repo_session()
+        repo = session.repo
+        local_tags = {tag.name for tag in repo.tags}
+        for publication in [publication for publication in publications if publication.tag_name in local_tags]:
+            self.logger.info(f"Tag {publication.tag_name} already exists. Skip publishing to orphan branch '{publication.target.branch}'.")
+            publications.remove(publication)
+
+        with self.span("preflight"):
+            remote_state = self._query_remote(repo, publications) if config.remote_preflight and publications else None
+        if remote_state:
+            for publication in [publication for publication in publications if publication.tag_name in remote_state.tags]:
+                self.logger.info(f"Tag {publication.tag_name} already exists on the remote. Skip publishing to orphan branch '{publication.target.branch}'.")
+                publications.remove(publication)
+        if not publications:
             return
 
-        if not config.paths:
-            self.logger.warning("No paths configured. Nothing to publish to orphan branch.")
+        for publication in publications:
+            self._validate_paths(repo_dir, publication.target.paths)
+        try:
+            with self.span("fetch", strategy=config.fetch.value):
+                remote_tips = self._get_remote_branch_tips(repo, config, [publication.target.branch for publication in publications], remote_state)
+            push_refs = self._create_commits(repo, config, publications, remote_tips)
+        finally:
+            session.invalidate()
+
+        if not push_refs:
             return
+        with self.span("push"):
+            # All or nothing if several refs are pushed, a single ref does not need the server support of atomic pushes
+            self.execute_process(
+                ["git", "push", *(["--atomic"] if len(push_refs) > 1 else []), "origin", *push_refs],
+                f"Failed to push {', '.join(push_refs)} to remote.",
+            )
+        self.logger.info(f"[OK] Pushed {', '.join(push_refs)} to remote.")
 
-        tag_name = f"{config.branch}-{release_commit.version.as_tag()}" if config.create_tag else None
+    def _create_commits(self, repo: "Repo", config: PublishToOrphanBranchConfig, publications: list[Publication], remote_tips: dict[str, "Commit | None"]) -> list[str]:
+        """
+        Create the commits of all orphan branches and return the refs to push.
 
-        with change_directory(self.execution_context.project_root_dir):
-            self._publish(config, tag_name)
+        Several branches are built concurrently, each thread with its own repository instance
+        because the GitPython object database helpers can not be shared between threads.
+        If any branch fails, the first error (in configuration order) is raised after all threads are done.
+        """
+        if len(publications) == 1:
+            publication = publications[0]
+            return self._create_commit(repo, config, publication, remote_tips.get(publication.target.branch))
 
-    def _publish(self, config: PublishToOrphanBranchConfig, tag_name: str | None) -> None:
-        repo_dir = self.execution_context.project_root_dir
-        with Repo(str(repo_dir)) as repo:
-            if tag_name and tag_name in [tag.name for tag in repo.tags]:
-                self.logger.info(f"Tag {tag_name} already exists. Skip publishing to orphan branch.")
-                return
+        from git import Repo
+
+        def create_commit(publication: Publication) -> list[str]:
+            remote_tip = remote_tips.get(publication.target.branch)
+            with Repo(repo.working_dir) as thread_repo:
+                return self._create_commit(thread_repo, config, publication, thread_repo.commit(remote_tip.hexsha) if remote_tip else None)
 
-            self._validate_paths(repo_dir, config.paths)
-            tree_sha = self._build_tree(repo, repo_dir, config.paths)
-            remote_tip = self._fetch_remote_branch_tip(repo, config.branch)
-            parent_commits = self._resolve_parent_commits(repo, config.branch, remote_tip)
-            message = f"release: {tag_name}" if tag_name else f"release: {config.branch}"
-            commit = Commit.create_from_tree(repo, repo.tree(tree_sha), message, parent_commits)
-            commit_sha = commit.hexsha
-            repo.git.update_ref(f"refs/heads/{config.branch}", commit_sha)
-
-            if tag_name:
-                repo.create_tag(tag_name, ref=commit_sha)
-                self.logger.info(f"Created commit {commit_sha[:8]} on branch '{config.branch}' with tag '{tag_name}'.")
+        with ThreadPoolExecutor(max_workers=min(len(publications), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(create_commit, publication) for publication in publications]
+            wait(futures)
+        push_refs = []
+        for future in futures:
+            push_refs.extend(future.result())
+        return push_refs
+
+    def _create_commit(self, repo: "Repo", config: PublishToOrphanBranchConfig, publication: Publication, remote_tip: "Commit | None") -> list[str]:
+        """Create the commit (and tag) of one orphan branch. Return the refs to push."""
+        with self.span("build", branch=publication.target.branch, backend=config.backend.value):
+            return self._build_commit(repo, config, publication, remote_tip)
+
+    def _build_commit(self, repo: "Repo", config: PublishToOrphanBranchConfig, publication: Publication, remote_tip: "Commit | None") -> list[str]:
+        from git import Commit
+
+        from pypeline_semantic_release.fast_import import FastImportCommitWriter
+
+        branch, paths = publication.target.branch, publication.target.paths
+        tag_name = publication.tag_name
+        message = f"release: {tag_name}" if tag_name else f"release: {branch}"
+        parent_commits = self._resolve_parent_commits(repo, branch, remote_tip)
+        commit_sha: str | None
+        if config.backend == OrphanBranchBackend.FAST_IMPORT:
+            # The refs are not updated if the tree is the one of the tip
+            unchanged_tree = parent_commits[0].tree.hexsha if parent_commits and config.on_unchanged != UnchangedTreeAction.COMMIT else None
+            commit_sha = FastImportCommitWriter(repo).create_commit(branch, paths, message, [parent.hexsha for parent in parent_commits], tag_name, unchanged_tree)
+            tree_sha = repo.commit(commit_sha).tree.hexsha if commit_sha else parent_commits[0].tree.hexsha
+        else:
+            if config.backend == OrphanBranchBackend.PERSISTENT_INDEX:
+                tree_sha = self._build_tree_incrementally(repo, branch, paths, parent_commits[0] if parent_commits else None)
             else:
-                self.logger.info(f"Created commit {commit_sha[:8]} on branch '{config.branch}'.")
+                tree_sha = self._build_tree(repo, Path(repo.working_dir), paths, f"tmp_index_{cache_key(branch)}")
+            commit_sha = None
+            if not self._is_unchanged(config, tree_sha, parent_commits):
+                commit = Commit.create_from_tree(repo, repo.tree(tree_sha), message, parent_commits)
+                commit_sha = commit.hexsha
+                repo.git.update_ref(f"refs/heads/{branch}", commit_sha)
+                if tag_name:
+                    repo.create_tag(tag_name, ref=commit_sha)
 
-        push_refs = [config.branch]
+        self.published_trees[branch] = tree_sha
+        if commit_sha is None:
+            return self._handle_unchanged_tree(repo, config, publication, parent_commits[0])
         if tag_name:
-            push_refs.append(tag_name)
-        self.execute_process(
-            ["git", "push", "origin", *push_refs],
-            f"Failed to push branch '{config.branch}' to remote.",
-        )
-        self.logger.info(f"[OK] Pushed branch '{config.branch}' to remote.")
+            self.logger.info(f"Created commit {commit_sha[:8]} on branch '{branch}' with tag '{tag_name}'.")
+            return [branch, tag_name]
+        self.logger.info(f"Created commit {commit_sha[:8]} on branch '{branch}'.")
+        return [branch]
+
+    @staticmethod
+    def _is_unchanged(config: PublishToOrphanBranchConfig, tree_sha: str, parent_commits: list["Commit"]) -> bool:
+        """Whether the new tree is the same as the tree of the branch tip and the no-op detection is enabled."""
+        return config.on_unchanged != UnchangedTreeAction.COMMIT and bool(parent_commits) and parent_commits[0].tree.hexsha == tree_sha
+
+    def _handle_unchanged_tree(self, repo: "Repo", config: PublishToOrphanBranchConfig, publication: Publication, tip: "Commit") -> list[str]:
+        """Return the refs to push when the published content did not change."""
+        branch, tag_name = publication.target.branch, publication.tag_name
+        if config.on_unchanged == UnchangedTreeAction.TAG and tag_name:
+            repo.create_tag(tag_name, ref=tip.hexsha)
+            self.logger.info(f"Content of branch '{branch}' is unchanged. Created tag '{tag_name}' on the existing commit {tip.hexsha[:8]}.")
+            return [tag_name]
+        self.logger.info(f"Content of branch '{branch}' is unchanged. Skip commit and push.")
+        return []
 
     @staticmethod
     def _validate_paths(repo_dir: Path, paths: list[str]) -> None:
@@ -95,25 +328,51 @@ class PublishToOrphanBranch(BaseStep):
             raise UserNotificationException(f"Configured paths not found in repository: {missing}")
 
     @staticmethod
-    def _build_tree(repo: Repo, repo_dir: Path, paths: list[str]) -> Any:
+    def _build_tree(repo: "Repo", repo_dir: Path, paths: list[str], index_name: str = "tmp_index") -> Any:
         """Build a git tree containing only the configured paths."""
         # Use a temporary index file to avoid modifying the repo's working index
-        tmp_index_path = repo_dir / ".git" / "tmp_index"
+        tmp_index_path = repo_dir / ".git" / index_name
         try:
             env = {"GIT_INDEX_FILE": str(tmp_index_path)}
-            for rel_path in paths:
-                abs_path = repo_dir / rel_path
-                if abs_path.is_file():
-                    repo.git.add(rel_path, env=env)
-                elif abs_path.is_dir():
-                    files = [str(file.relative_to(repo_dir)) for file in abs_path.rglob("*") if file.is_file()]
-                    repo.git.add(files, env=env)
+            # git walks the directories itself, listing their files on the command line exceeds the maximum
+            # command line length for large outputs. Generated files are often ignored, add them anyway.
+            existing_paths = [rel_path for rel_path in paths if (repo_dir / rel_path).exists()]
+            if existing_paths:
+                repo.git.add("--force", "--", *existing_paths, env=env)
             return repo.git.write_tree(env=env)
         finally:
             tmp_index_path.unlink(missing_ok=True)
 
     @staticmethod
-    def _resolve_parent_commits(repo: Repo, branch_name: str, remote_tip: Commit | None) -> list[Commit]:
+    def _build_tree_incrementally(repo: "Repo", branch_name: str, paths: list[str], seed_commit: "Commit | None") -> str:
+        """
+        Build a git tree containing only the configured paths using the persistent staging index of the branch.
+
+        A new staging index is seeded from the tip of the orphan branch. Afterwards git compares the stat data
+        of the files with the index entries and hashes only the files which were changed.
+        Entries outside the configured paths (e.g. paths removed from the configuration) are dropped.
+        """
+        from git import GitCommandError
+
+        index_file = get_cache_dir(repo) / f"orphan_index_{cache_key(branch_name)}"
+        env = {"GIT_INDEX_FILE": str(index_file)}
+        try:
+            if not index_file.is_file():
+                index_file.parent.mkdir(parents=True, exist_ok=True)
+                if seed_commit:
+                    repo.git.read_tree(seed_commit.hexsha, env=env)
+            excludes = [f":(exclude,literal){path}" for path in paths]
+            repo.git.rm("--cached", "-r", "-q", "--ignore-unmatch", "--", ".", *excludes, env=env)
+            # --all: also stage the deleted files, --force: publish the files even if they are ignored
+            repo.git.add("--all", "--force", "--", *paths, env=env)
+            return repo.git.write_tree(env=env)
+        except GitCommandError:
+            # Never reuse an index which might be inconsistent, the next run starts from scratch
+            index_file.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _resolve_parent_commits(repo: "Repo", branch_name: str, remote_tip: "Commit | None") -> list["Commit"]:
         """
         Return parent commits for the next commit on the orphan branch.
 
@@ -142,11 +401,75 @@ class PublishToOrphanBranch(BaseStep):
         return []
 
     @staticmethod
-    def _fetch_remote_branch_tip(repo: Repo, branch_name: str) -> Commit | None:
+    def _query_remote(repo: "Repo", publications: list[Publication]) -> RemoteState | None:
+        """Look up the branch tips and the tags on the remote with a single ``git ls-remote``. None if there is no remote."""
+        from git import GitCommandError
+
+        if "origin" not in [remote.name for remote in repo.remotes]:
+            return None
+        refs = [f"refs/heads/{publication.target.branch}" for publication in publications]
+        refs.extend(f"refs/tags/{publication.tag_name}" for publication in publications if publication.tag_name)
+        try:
+            output = str(repo.git.ls_remote("origin", *refs))
+        except GitCommandError as err:
+            branches = ", ".join(f"'{publication.target.branch}'" for publication in publications)
+            logger.warning(f"Could not query {branches} on origin: {err}. Falling back to local branch tip.")
+            return RemoteState(reachable=False)
+        remote_refs = {ref: sha for sha, ref in (line.split("\t", 1) for line in output.splitlines())}
+        return RemoteState(
+            reachable=True,
+            branch_tips={ref.removeprefix("refs/heads/"): sha for ref, sha in remote_refs.items() if ref.startswith("refs/heads/")},
+            tags={ref.removeprefix("refs/tags/") for ref in remote_refs if ref.startswith("refs/tags/")},
+        )
+
+    def _get_remote_branch_tips(self, repo: "Repo", config: PublishToOrphanBranchConfig, branches: list[str], remote_state: RemoteState | None) -> dict[str, "Commit | None"]:
+        """Tips of the remote branches. Only the branches existing on the remote whose tip commit is not available locally are fetched."""
+        if remote_state is None:
+            return self._fetch_remote_branch_tips(repo, branches, config.fetch)
+        if not remote_state.reachable:
+            # Already reported by the preflight, fetching would fail the same way
+            return {}
+        tips: dict[str, Commit | None] = {}
+        branches_to_fetch = []
+        for branch in branches:
+            tip_sha = remote_state.branch_tips.get(branch)
+            if tip_sha is None:
+                self.logger.info(f"Branch '{branch}' does not exist on origin yet.")
+                continue
+            try:
+                tip = repo.commit(tip_sha)
+                tip.tree  # noqa: B018 - make sure the commit object is available
+            except ValueError:
+                branches_to_fetch.append(branch)
+                continue
+            self.logger.info(f"Tip {tip.hexsha[:8]} of origin/{branch} is available locally. Skip fetching it.")
+            repo.git.update_ref(f"refs/remotes/origin/{branch}", tip.hexsha)
+            tips[branch] = tip
+        if branches_to_fetch:
+            tips.update(self._fetch_remote_branch_tips(repo, branches_to_fetch, config.fetch))
+        return tips
+
+    @classmethod
+    def _fetch_remote_branch_tips(cls, repo: "Repo", branches: list[str], fetch_strategy: FetchStrategy = FetchStrategy.FULL) -> dict[str, "Commit | None"]:
+        """Fetch the tips of all branches with one ``git fetch``. Falls back to fetching them one by one if any of them is missing."""
+        from git import GitCommandError
+
+        if len(branches) == 1 or "origin" not in [remote.name for remote in repo.remotes]:
+            return {branch: cls._fetch_remote_branch_tip(repo, branch, fetch_strategy) for branch in branches}
+        try:
+            repo.git.fetch(*fetch_strategy.fetch_args, "origin", *[f"+refs/heads/{branch}:refs/remotes/origin/{branch}" for branch in branches])
+        except GitCommandError:
+            return {branch: cls._fetch_remote_branch_tip(repo, branch, fetch_strategy) for branch in branches}
+        return {branch: repo.remotes.origin.refs[branch].commit for branch in branches}
+
+    @staticmethod
+    def _fetch_remote_branch_tip(repo: "Repo", branch_name: str, fetch_strategy: FetchStrategy = FetchStrategy.FULL) -> "Commit | None":
+        from git import GitCommandError
+
         if "origin" not in [remote.name for remote in repo.remotes]:
             return None
         try:
-            repo.git.fetch("origin", f"+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}")
+            repo.git.fetch(*fetch_strategy.fetch_args, "origin", f"+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}")
         except GitCommandError as err:
             # Distinguish "branch not on remote yet" (expected first-run) from
             # "remote unreachable / auth failed" — operators need the hint.
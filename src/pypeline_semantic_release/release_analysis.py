@@ -0,0 +1,173 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from git import Repo
+from git.objects.commit import Commit
+from py_app_dev.core.logging import logger
+from semantic_release.cli.config import RuntimeContext
+from semantic_release.commit_parser import ParsedCommit
+from semantic_release.const import DEFAULT_VERSION
+from semantic_release.enums import LevelBump
+from semantic_release.errors import InternalError
+from semantic_release.version import algorithm
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.commit_parse_cache import CachingCommitParser
+from pypeline_semantic_release.tag_index import TagVersionIndex
+
+#: The version increment of the semantic-release ``next_version`` algorithm. It is not public, all supported
+#: semantic-release versions provide it. Without it the whole ``next_version`` algorithm is used.
+increment_version: Callable[..., Version] | None = getattr(algorithm, "_increment_version", None)
+
+
+@dataclass
+class ReleaseAnalysis:
+    """Result of the release analysis of the current branch."""
+
+    #: Index of all existing tags and their versions
+    tag_index: TagVersionIndex
+    #: Highest tagged version in the repository, including prereleases
+    last_release: Version | None = None
+    #: Version the next version is computed from: the latest release in the history of the current branch
+    base_version: Version | None = None
+    #: Next version. None if the current branch is not configured to be released.
+    next_version: Version | None = None
+    #: Number of commits since the base version
+    commits_since_last_release: int = 0
+    #: Commit of the base version tag. None if there is no release in the history of the current branch.
+    base_commit: str | None = None
+
+    def version_exists(self, version: Version) -> bool:
+        """Whether a tag exists for the given version."""
+        return self.tag_index.contains(version)
+
+
+class ReleaseAnalyzer:
+    """
+    Compute the last release, the next version and the existing versions in one go.
+
+    Same result as the semantic-release ``next_version`` algorithm, but without walking the whole history:
+
+    * the tags are taken from the persistent tag index, already sorted by version
+    * only the tags with the highest versions are checked for being part of the current branch,
+      until the latest full release (and prerelease) in the branch history is found
+    * only the commits since this release are listed and parsed (``git rev-list <release>..HEAD``);
+      commits parsed in previous runs are taken from the commit parse cache
+    """
+
+    def __init__(self, repo: Repo, tag_index: TagVersionIndex, base_tags: tuple[str | None, str | None] | None = None) -> None:
+        self.repo = repo
+        self.tag_index = tag_index
+        #: Tags of the latest full release and of the base release, see :meth:`find_base_tags`
+        self.base_tags = base_tags
+
+    def analyze(self, runtime: RuntimeContext | None = None, commits: list[Commit] | None = None, commit_parser: CachingCommitParser | None = None) -> ReleaseAnalysis:
+        """
+        Analyze the current branch. Without a runtime context (branch not to be released) the next version is not computed.
+
+        The commits since the base release and the commit parser can be provided by the caller, e.g. when the history
+        was already walked for several packages. A provided commit parser is not saved.
+        """
+        latest = self.tag_index.latest_version()
+        analysis = ReleaseAnalysis(tag_index=self.tag_index, last_release=latest[1] if latest else None)
+        if runtime:
+            self._compute_next_version(analysis, runtime, commits, commit_parser)
+        return analysis
+
+    def find_base_tags(self, runtime: RuntimeContext) -> tuple[str | None, str | None]:
+        """Tags of the latest full release and of the release the next version is based on (the latest prerelease on prerelease branches)."""
+        if self.base_tags is None:
+            full_release_tag, prerelease_tag = self._find_releases_in_history(self.repo.active_branch.commit, runtime.prerelease, runtime.version_translator.prerelease_token)
+            self.base_tags = (full_release_tag, prerelease_tag or full_release_tag)
+        return self.base_tags
+
+    def _compute_next_version(self, analysis: ReleaseAnalysis, runtime: RuntimeContext, commits: list[Commit] | None, commit_parser: CachingCommitParser | None) -> None:
+        translator = runtime.version_translator
+        default_initial_version = translator.from_tag(translator.str_to_tag(DEFAULT_VERSION))
+        if default_initial_version is None:
+            raise InternalError("Translator was unable to parse the embedded default version")
+        head = self.repo.active_branch.commit
+        full_release_tag, base_tag = self.find_base_tags(runtime)
+        latest_full_version = self._tag_version(full_release_tag) or default_initial_version
+        latest_version = self._tag_version(base_tag) or default_initial_version
+        logger.info(f"The latest release in this branch's history was {latest_version}")
+
+        if commits is None:
+            commits = self.commits_since(head, base_tag)
+        if commit_parser is None:
+            commit_parser = CachingCommitParser.load(self.repo, runtime.commit_parser)
+            level_bump = self.max_level_bump(commit_parser, commits)
+            commit_parser.save()
+        else:
+            level_bump = self.max_level_bump(commit_parser, commits)
+
+        analysis.base_version = latest_version
+        analysis.commits_since_last_release = len(commits)
+        analysis.base_commit = self.tag_index.get_commit(base_tag) if base_tag else None
+        logger.info(f"Found {len(commits)} commits since the last release, the type of the next release is: {level_bump}")
+        if level_bump is LevelBump.NO_RELEASE and (latest_version.major != 0 or runtime.allow_zero_version):
+            analysis.next_version = latest_version
+            return
+        if increment_version is None:
+            # Walks the whole history again
+            analysis.next_version = algorithm.next_version(
+                repo=self.repo,
+                translator=translator,
+                commit_parser=runtime.commit_parser,
+                prerelease=runtime.prerelease,
+                major_on_zero=runtime.major_on_zero,
+                allow_zero_version=runtime.allow_zero_version,
+            )
+            return
+        analysis.next_version = increment_version(
+            latest_version=latest_version,
+            latest_full_version=latest_full_version,
+            level_bump=level_bump,
+            prerelease=runtime.prerelease,
+            prerelease_token=translator.prerelease_token,
+            major_on_zero=runtime.major_on_zero,
+            allow_zero_version=runtime.allow_zero_version,
+        )
+
+    def _find_releases_in_history(self, head: Commit, prerelease: bool, prerelease_token: str) -> tuple[str | None, str | None]:
+        """
+        Find the tag of the latest full release and, for prereleases, the latest prerelease with the same token in the history of ``head``.
+
+        The tags are visited from the highest to the lowest version. A matching prerelease must not be lower
+        than the latest full release, so the search always stops at the latest full release in the history.
+        """
+        prerelease_tag: str | None = None
+        for tag_name in self.tag_index.data.ordered_tags:
+            version = self._tag_version(tag_name)
+            if not version or (version.is_prerelease and (not prerelease or prerelease_tag or version.prerelease_token != prerelease_token)):
+                continue
+            if not self.is_in_history(tag_name, head):
+                continue
+            if not version.is_prerelease:
+                return tag_name, prerelease_tag
+            prerelease_tag = tag_name
+        return None, prerelease_tag
+
+    def is_in_history(self, tag_name: str, head: Commit) -> bool:
+        tag_commit = self.tag_index.get_commit(tag_name)
+        if not tag_commit:
+            return False
+        return tag_commit == head.hexsha or self.repo.is_ancestor(self.repo.commit(tag_commit), head)
+
+    def commits_since(self, head: Commit, tag_name: str | None) -> list[Commit]:
+        """Commits reachable from ``head`` but not from the given tag. All commits if there is no tag."""
+        tag_commit = self.tag_index.get_commit(tag_name) if tag_name else None
+        return list(self.repo.iter_commits(f"{tag_commit}..{head.hexsha}" if tag_commit else head.hexsha))
+
+    @staticmethod
+    def max_level_bump(commit_parser: CachingCommitParser, commits: list[Commit]) -> LevelBump:
+        level_bump = LevelBump.NO_RELEASE
+        for commit in commits:
+            result = commit_parser.parse(commit)
+            for item in result if isinstance(result, list) or type(result) is tuple else [result]:
+                if isinstance(item, ParsedCommit):
+                    level_bump = max(level_bump, item.bump)
+        return level_bump
+
+    def _tag_version(self, tag_name: str | None) -> Version | None:
+        return self.tag_index.get_version(tag_name) if tag_name else None
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.exceptions import UserNotificationException
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.base import BaseStep
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+
+if TYPE_CHECKING:
+    from git import Repo
+
+    from pypeline_semantic_release.create_release_commit import ReleaseCommit
+
+#: Release plan file relative to the project root directory
+RELEASE_PLAN_FILE = Path("build/pypeline_semantic_release/release_plan.json")
+
+#: Pipeline input to only compute the release plan, without creating, pushing or publishing anything
+PLAN_ONLY_INPUT = "plan_only"
+
+
+def is_plan_only(execution_context: ExecutionContext) -> bool:
+    """Whether the pipeline runs in plan-only mode (``pypeline run -i plan_only=true``)."""
+    plan_only = execution_context.get_input(PLAN_ONLY_INPUT)
+    if isinstance(plan_only, str):
+        return plan_only.strip().lower() in {"1", "true", "yes"}
+    return bool(plan_only)
+
+
+@dataclass
+class PlannedCIContext(DataClassDictMixin):
+    ci_system: str
+    is_pull_request: bool
+    target_branch: str | None
+    current_branch: str | None
+
+    @classmethod
+    def from_ci_context(cls, ci_context: CIContext) -> "PlannedCIContext":
+        ci_system = ci_context.ci_system.value if isinstance(ci_context.ci_system, CISystem) else ci_context.ci_system
+        return cls(ci_system, ci_context.is_pull_request, ci_context.target_branch, ci_context.current_branch)
+
+    def to_ci_context(self) -> CIContext:
+        ci_system = CISystem(self.ci_system) if self.ci_system in {system.value for system in CISystem} else self.ci_system
+        return CIContext(ci_system=ci_system, is_pull_request=self.is_pull_request, target_branch=self.target_branch, current_branch=self.current_branch)
+
+
+@dataclass
+class ReleasePlan(DataClassDictMixin):
+    """
+    Everything the publish steps need to know about a release, persisted as JSON artifact.
+
+    The release job writes the plan, later jobs of a split pipeline load it instead of detecting the CI context
+    and analyzing the history again. The file contains a checksum over its content and refers to the release commit,
+    both are verified when the plan is loaded.
+    """
+
+    #: Bump when the content changes incompatibly
+    FILE_VERSION = 1
+
+    #: Version to be released
+    version: str
+    previous_version: str | None
+    #: Format of the version tags, e.g. ``v{version}``
+    tag_format: str
+    #: Version tag, e.g. ``v1.2.0``
+    tag: str
+    #: Commit on which the release was planned
+    base_commit_sha: str
+    #: Commit created for the release. None if the plan was only computed (plan-only mode).
+    release_commit_sha: str | None
+    ci_context: PlannedCIContext
+    #: Orphan branch names mapped to the SHA of the tree published to them
+    orphan_trees: dict[str, str] = field(default_factory=dict)
+    file_version: int = FILE_VERSION
+    #: SHA-256 over all other fields
+    checksum: str = ""
+
+    @property
+    def plan_only(self) -> bool:
+        return self.release_commit_sha is None
+
+    def compute_checksum(self) -> str:
+        content = {name: value for name, value in self.to_dict().items() if name != "checksum"}
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def save(self, file: Path) -> None:
+        """Write the plan atomically, such that a job never sees a partially written plan."""
+        self.checksum = self.compute_checksum()
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(self.to_dict(), indent=2))
+        os.replace(tmp_file, file)
+
+    @classmethod
+    def load(cls, file: Path) -> "ReleasePlan":
+        """Read the plan and check its file version and checksum."""
+        if not file.is_file():
+            raise UserNotificationException(f"Release plan {file} not found. It is written by the CreateReleaseCommit step.")
+        try:
+            content = json.loads(file.read_text())
+            if content.get("file_version") != cls.FILE_VERSION:
+                raise UserNotificationException(f"Release plan {file} has version {content.get('file_version')}, expected {cls.FILE_VERSION}.")
+            plan = cls.from_dict(content)
+        except UserNotificationException:
+            raise
+        except Exception as exc:
+            raise UserNotificationException(f"Release plan {file} is invalid: {exc}") from exc
+        if plan.checksum != plan.compute_checksum():
+            raise UserNotificationException(f"Release plan {file} was modified or is corrupted, its checksum does not match.")
+        return plan
+
+    def verify(self, repo: "Repo") -> None:
+        """Check that the checked out commit is the release commit and the release tag points to it."""
+        from git import BadName
+
+        if self.release_commit_sha is None:
+            return
+        try:
+            repo.commit(self.release_commit_sha)
+        except (BadName, ValueError) as exc:
+            raise UserNotificationException(f"Release commit {self.release_commit_sha} of the release plan not found. Fetch the tag {self.tag}.") from exc
+        tag = next((tag for tag in repo.tags if tag.name == self.tag), None)
+        if tag and tag.commit.hexsha != self.release_commit_sha:
+            raise UserNotificationException(f"Tag {self.tag} points to {tag.commit.hexsha}, but the release plan was created for {self.release_commit_sha}.")
+        head_sha = repo.head.commit.hexsha
+        if head_sha != self.release_commit_sha:
+            raise UserNotificationException(f"Checked out commit {head_sha} is not the release commit {self.release_commit_sha} of the release plan. Check out the tag {self.tag}.")
+
+    def to_release_commit(self) -> "ReleaseCommit":
+        from semantic_release.version.version import Version
+
+        from pypeline_semantic_release.create_release_commit import ReleaseCommit
+
+        return ReleaseCommit(
+            version=Version.parse(self.version, tag_format=self.tag_format),
+            previous_version=Version.parse(self.previous_version, tag_format=self.tag_format) if self.previous_version else None,
+        )
+
+
+@dataclass
+class LoadReleasePlanConfig(DataClassDictMixin):
+    """Configuration for the LoadReleasePlan step."""
+
+    #: Release plan file relative to the project root directory
+    file: str = RELEASE_PLAN_FILE.as_posix()
+
+
+class LoadReleasePlan(BaseStep):
+    """
+    Provide the CI context and the release commit from the release plan written by an earlier job.
+
+    Replaces the ``CheckCIContext`` and ``CreateReleaseCommit`` steps in the jobs which only publish.
+    """
+
+    def __init__(self, execution_context: ExecutionContext, group_name: str | None = None, config: dict[str, Any] | None = None) -> None:
+        super().__init__(execution_context, group_name, config)
+        self.release_plan: ReleasePlan | None = None
+
+    def run(self) -> None:
+        with self.repo_session_scope(), self.step_span():
+            self.logger.info(f"Running {self.get_name()} step.")
+            config = LoadReleasePlanConfig.from_dict(self.config) if self.config else LoadReleasePlanConfig()
+            plan_file = self.execution_context.project_root_dir / config.file
+            with self.span("load plan", file=plan_file):
+                release_plan = ReleasePlan.load(plan_file)
+                release_plan.verify(self.get_repo_session().repo)
+            if release_plan.plan_only:
+                self.logger.info(f"Release plan for {release_plan.tag} was only computed, nothing was released.")
+            else:
+                self.logger.info(f"Loaded release plan for {release_plan.tag} (commit {release_plan.release_commit_sha}).")
+            self.release_plan = release_plan
+
+    def update_execution_context(self) -> None:
+        if not self.release_plan:
+            return
+        self.execution_context.data_registry.insert(self.release_plan.ci_context.to_ci_context(), self.get_name())
+        self.execution_context.data_registry.insert(self.release_plan, self.get_name())
+        if not self.release_plan.plan_only:
+            self.execution_context.data_registry.insert(self.release_plan.to_release_commit(), self.get_name())
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import NamedTuple
+
+from git import GitCommandError, Repo
+from mashumaro.mixins.dict import DataClassDictMixin
+from py_app_dev.core.logging import logger
+from semantic_release import VersionTranslator
+from semantic_release.errors import InvalidVersion
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.cache import cache_key, get_cache_dir, read_json_cache, write_json_cache
+
+#: Refs modified less than this number of seconds ago are not trusted for the fingerprint,
+#: because another tag could still be written within the same file system timestamp granularity.
+RACY_REFS_SECONDS = 2.0
+
+
+def version_sort_key(version: Version) -> tuple[int, int, int, int, tuple[str, ...], int]:
+    """Sort key with the same ordering as the semantic-release ``Version`` comparison operators."""
+    if version.is_prerelease:
+        return (version.major, version.minor, version.patch, 0, tuple(version.prerelease_token.split(".")), version.prerelease_revision or 0)
+    return (version.major, version.minor, version.patch, 1, (), 0)
+
+
+def version_key(version: Version | str) -> str:
+    """Identity of a version as used by the semantic-release ``Version`` equality (build metadata is ignored)."""
+    return str(version).split("+", 1)[0]
+
+
+class TagRef(NamedTuple):
+    name: str
+    #: SHA of the object the tag ref points to (the tag object for annotated tags)
+    target: str
+    #: SHA of the tagged commit. Empty if the tag does not point to a commit.
+    commit: str
+
+
+@dataclass
+class TagIndexData(DataClassDictMixin):
+    #: Tag format used to translate the tags into versions
+    tag_format: str
+    #: Fingerprint of the refs state (packed-refs and loose tag refs) the index was built from
+    fingerprint: str | None = None
+    #: All tag names mapped to their version string. Tags not matching the tag format are mapped to None.
+    tags: dict[str, str | None] = field(default_factory=dict)
+    #: All tag names mapped to the SHA of the object the tag ref points to, used to detect moved tags
+    targets: dict[str, str] = field(default_factory=dict)
+    #: Tag names mapped to the SHA of the tagged commit, only for the tags matching the tag format
+    commits: dict[str, str] = field(default_factory=dict)
+    #: Names of the tags matching the tag format, sorted from the highest to the lowest version
+    ordered_tags: list[str] = field(default_factory=list)
+    #: Name of the tag with the highest version which is not a prerelease
+    latest_release: str | None = None
+    #: Prerelease token mapped to the name of the tag with the highest prerelease version for it
+    latest_prereleases: dict[str, str] = field(default_factory=dict)
+
+
+class TagVersionIndex:
+    """
+    Persistent index of the repository tags and their versions for one tag format.
+
+    The index is stored under ``.git/`` and is only rebuilt for the tags which were added since the last run.
+    When the refs state did not change at all, the tags are not even listed.
+    """
+
+    FILE_VERSION = 2
+
+    def __init__(self, data: TagIndexData, index_file: Path | None = None) -> None:
+        self.data = data
+        self.index_file = index_file
+        self._version_keys: set[str] | None = None
+
+    @classmethod
+    def load(cls, repo: Repo, tag_format: str) -> "TagVersionIndex":
+        """Load the index for the given tag format and update it with the current tags of the repository."""
+        index_file = get_cache_dir(repo) / f"tag_index_v{cls.FILE_VERSION}_{cache_key(tag_format)}.json"
+        data = read_json_cache(index_file, TagIndexData, lambda data: data.tag_format == tag_format) or TagIndexData(tag_format=tag_format)
+        index = cls(data, index_file)
+        fingerprint = cls.refs_fingerprint(Path(repo.common_dir))
+        if fingerprint is None or fingerprint != data.fingerprint:
+            index.update(cls.list_tags(repo))
+            data.fingerprint = fingerprint
+            index.save()
+        return index
+
+    def save(self) -> None:
+        if self.index_file:
+            write_json_cache(self.index_file, self.data)
+
+    @staticmethod
+    def refs_fingerprint(common_dir: Path) -> str | None:
+        """
+        Fingerprint of the tag refs state based on the file system metadata of ``packed-refs`` and ``refs/tags``.
+
+        Creating, moving or deleting a loose tag always changes the modification time of its directory.
+        Returns None if the refs are not stored as files (e.g. reftable) or were modified just now.
+        In this case the tags must be listed.
+        """
+        if (common_dir / "reftable").is_dir():
+            return None
+        stats: list[str] = []
+        newest_mtime_ns = 0
+        packed_refs = common_dir / "packed-refs"
+        if packed_refs.is_file():
+            stat = packed_refs.stat()
+            stats.append(f"packed-refs:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}")
+            newest_mtime_ns = stat.st_mtime_ns
+        tags_dir = common_dir / "refs" / "tags"
+        for dir_path, _, _ in os.walk(tags_dir):
+            stat = os.stat(dir_path)
+            stats.append(f"{Path(dir_path).relative_to(tags_dir).as_posix()}:{stat.st_mtime_ns}")
+            newest_mtime_ns = max(newest_mtime_ns, stat.st_mtime_ns)
+        if time.time_ns() - newest_mtime_ns < RACY_REFS_SECONDS * 1e9:
+            return None
+        return hashlib.sha1("\n".join(stats).encode()).hexdigest()  # noqa: S324
+
+    @staticmethod
+    def list_tags(repo: Repo) -> list[TagRef]:
+        """List all tags with a single ``git for-each-ref`` call. Annotated tags are peeled to the tagged object."""
+        output = repo.git.for_each_ref("--format=%(refname:strip=2)%00%(objectname)%00%(objecttype)%00%(*objectname)%00%(*objecttype)", "refs/tags")
+        tags = []
+        for line in output.splitlines() if output else []:
+            name, target, target_type, peeled, peeled_type = line.split("\0")
+            if target_type == "tag":
+                target_type, commit = peeled_type, peeled
+            else:
+                commit = target
+            if target_type == "tag":
+                # Tag pointing to another tag, let git resolve the whole chain
+                with suppress(GitCommandError):
+                    commit = repo.git.rev_parse("--verify", "--quiet", f"refs/tags/{name}^{{commit}}")
+                    target_type = "commit"
+            tags.append(TagRef(name, target, commit if target_type == "commit" else ""))
+        return tags
+
+    def update(self, tags: list[TagRef]) -> None:
+        """Translate only the new tags, refresh the moved ones and drop the deleted ones."""
+        current = {tag.name for tag in tags}
+        known = self.data.tags
+        changed_tags = [tag for tag in tags if self.data.targets.get(tag.name) != tag.target or tag.name not in known]
+        removed_tags = [name for name in known if name not in current]
+        if not changed_tags and not removed_tags:
+            return
+        translator = VersionTranslator(tag_format=self.data.tag_format)
+        for name in removed_tags:
+            del known[name]
+            self.data.targets.pop(name, None)
+            self.data.commits.pop(name, None)
+        for tag in changed_tags:
+            if tag.name not in known:
+                try:
+                    version = translator.from_tag(tag.name)
+                except (NotImplementedError, InvalidVersion) as exc:
+                    logger.warning(f"Couldn't parse tag {tag.name} as Version: {exc}")
+                    version = None
+                known[tag.name] = str(version) if version else None
+            self.data.targets[tag.name] = tag.target
+            if known[tag.name] and tag.commit:
+                self.data.commits[tag.name] = tag.commit
+            else:
+                self.data.commits.pop(tag.name, None)
+        versions = {name: self._parse(version_str) for name, version_str in known.items() if version_str}
+        self.data.ordered_tags = sorted(versions, key=lambda name: version_sort_key(versions[name]), reverse=True)
+        self.data.latest_release = next((name for name in self.data.ordered_tags if not versions[name].is_prerelease), None)
+        self.data.latest_prereleases = {}
+        for name in reversed(self.data.ordered_tags):
+            if versions[name].is_prerelease:
+                self.data.latest_prereleases[versions[name].prerelease_token] = name
+        self._version_keys = None
+
+    def _parse(self, version_str: str) -> Version:
+        return Version.parse(version_str, tag_format=self.data.tag_format)
+
+    def _version_str(self, tag_name: str) -> str:
+        # Only tags matching the tag format are referenced, therefore the version string is never None
+        return self.data.tags[tag_name] or ""
+
+    def _tag_and_version(self, tag_name: str | None) -> tuple[str, Version] | None:
+        return (tag_name, self._parse(self._version_str(tag_name))) if tag_name else None
+
+    @property
+    def version_keys(self) -> set[str]:
+        if self._version_keys is None:
+            self._version_keys = {version_key(version_str) for version_str in self.data.tags.values() if version_str}
+        return self._version_keys
+
+    def get_version(self, tag_name: str) -> Version | None:
+        """Version of the tag. None for tags not matching the tag format."""
+        version_str = self.data.tags.get(tag_name)
+        return self._parse(version_str) if version_str else None
+
+    def get_commit(self, tag_name: str) -> str | None:
+        """SHA of the commit the tag points to. None for tags not pointing to a commit."""
+        return self.data.commits.get(tag_name)
+
+    def tagged_commits(self) -> set[str]:
+        """SHAs of the commits tagged with a version, including prereleases."""
+        return set(self.data.commits.values())
+
+    def contains(self, version: Version) -> bool:
+        """Whether a tag exists for the given version."""
+        return version_key(version) in self.version_keys
+
+    def versions(self) -> list[Version]:
+        """All tagged versions, sorted from the highest to the lowest."""
+        return [self._parse(self._version_str(name)) for name in self.data.ordered_tags]
+
+    def latest_version(self) -> tuple[str, Version] | None:
+        """Tag and version of the highest version, including prereleases."""
+        return self._tag_and_version(self.data.ordered_tags[0] if self.data.ordered_tags else None)
+
+    def latest_release(self) -> tuple[str, Version] | None:
+        """Tag and version of the highest version which is not a prerelease."""
+        return self._tag_and_version(self.data.latest_release)
+
+    def latest_prerelease(self, prerelease_token: str) -> tuple[str, Version] | None:
+        """Tag and version of the highest prerelease with the given prerelease token."""
+        return self._tag_and_version(self.data.latest_prereleases.get(prerelease_token))
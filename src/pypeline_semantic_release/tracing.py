@@ -0,0 +1,164 @@
+import json
+import os
+import secrets
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from py_app_dev.core.logging import logger
+from pypeline.domain.execution_context import ExecutionContext
+
+#: Chrome trace-event file relative to the project root directory. Open it with chrome://tracing or https://ui.perfetto.dev.
+TRACE_FILE = Path("build/pypeline_semantic_release/trace.json")
+
+#: Environment variable with the path of an additional OTLP-JSON trace file
+OTLP_FILE_ENV = "PYPELINE_SEMANTIC_RELEASE_OTLP_FILE"
+
+
+@dataclass
+class Span:
+    """Timed phase of a step."""
+
+    #: Name of the phase
+    name: str
+    #: Name of the step the phase belongs to
+    step: str
+    #: Start time in nanoseconds since the epoch
+    start_ns: int
+    #: Duration in nanoseconds. None while the span is running.
+    duration_ns: int | None = None
+    #: Additional information about the phase, e.g. the branch name
+    attributes: dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    parent_id: str | None = None
+    thread_id: int = field(default_factory=threading.get_ident)
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + (self.duration_ns or 0)
+
+
+class Tracer:
+    """
+    Collects the spans of all steps of a pipeline run and exports them.
+
+    The tracer is shared through the data registry like the git repository session.
+    Spans can be nested and can be created from several threads. The steps export the trace when they are done
+    (see :meth:`pypeline_semantic_release.base.BaseStep.step_span`): the Chrome trace-event file (and the OTLP-JSON file,
+    if configured) is written again with all spans so far, once per step and not for every span.
+    """
+
+    def __init__(self, project_root_dir: Path) -> None:
+        self.project_root_dir = project_root_dir
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._active = threading.local()
+
+    @classmethod
+    def from_execution_context(cls, execution_context: ExecutionContext, provider_name: str) -> "Tracer":
+        """Return the tracer registered for the pipeline run or register a new one."""
+        tracers = execution_context.data_registry.find_data(cls)
+        if tracers:
+            return tracers[0]
+        tracer = cls(execution_context.project_root_dir)
+        execution_context.data_registry.insert(tracer, provider_name)
+        return tracer
+
+    @contextmanager
+    def span(self, step: str, name: str, **attributes: Any) -> Iterator[Span]:
+        stack: list[Span] = self._active.__dict__.setdefault("stack", [])
+        span = Span(name=name, step=step, start_ns=time.time_ns(), attributes=attributes, parent_id=stack[-1].span_id if stack else None)
+        start = time.perf_counter_ns()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.attributes["error"] = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.duration_ns = time.perf_counter_ns() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def export(self) -> None:
+        """Write the trace files. Failing to write them is not an error."""
+        if not self.project_root_dir.is_dir():
+            # E.g. a mocked project, the trace is only kept in memory
+            return
+        # Spans of several threads can end at the same time, the files are written by one thread at a time
+        with self._export_lock:
+            with self._lock:
+                spans = list(self.spans)
+            files = {self.project_root_dir / TRACE_FILE: to_chrome_trace(spans)}
+            otlp_file = os.getenv(OTLP_FILE_ENV)
+            if otlp_file:
+                files[Path(otlp_file)] = to_otlp_json(spans, self.trace_id)
+            self._write(files)
+
+    @staticmethod
+    def _write(files: dict[Path, dict[str, Any]]) -> None:
+        for file, content in files.items():
+            try:
+                file.parent.mkdir(parents=True, exist_ok=True)
+                file.write_text(json.dumps(content, indent=1))
+            except OSError as exc:
+                logger.warning(f"Could not write trace file {file}: {exc}")
+
+
+def to_chrome_trace(spans: list[Span]) -> dict[str, Any]:
+    """Convert the spans to the Chrome trace-event format (complete events, timestamps in microseconds)."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": span.name,
+            "cat": span.step,
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": (span.duration_ns or 0) / 1000,
+            "pid": pid,
+            "tid": span.thread_id,
+            "args": {key: str(value) for key, value in span.attributes.items()},
+        }
+        for span in sorted(spans, key=lambda span: span.start_ns)
+    ]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def to_otlp_json(spans: list[Span], trace_id: str) -> dict[str, Any]:
+    """Convert the spans to the OTLP-JSON trace format as used by the OpenTelemetry collector file receiver."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "pypeline-semantic-release"}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "pypeline_semantic_release"},
+                        "spans": [
+                            {
+                                "traceId": trace_id,
+                                "spanId": span.span_id,
+                                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                                "name": span.name,
+                                # SPAN_KIND_INTERNAL
+                                "kind": 1,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": "step", "value": {"stringValue": span.step}},
+                                    *({"key": key, "value": {"stringValue": str(value)}} for key, value in span.attributes.items()),
+                                ],
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
@@ -0,0 +1,241 @@
+import mmap
+import os
+import re
+import shutil
+import subprocess
+import time
+from collections.abc import MutableMapping, Sequence
+from dataclasses import dataclass, field
+from functools import cache
+from itertools import pairwise
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import tomlkit
+from git import Repo
+from py_app_dev.core.exceptions import UserNotificationException
+from semantic_release.version.version import Version
+
+if TYPE_CHECKING:
+    from semantic_release.version.declarations.i_version_replacer import IVersionReplacer
+
+#: Files of at least this size (in bytes) are memory mapped instead of read
+MMAP_THRESHOLD = 1024 * 1024
+
+#: Name of the regular expression group with the version, same as for semantic-release
+VERSION_GROUP = "version"
+
+
+@cache
+def _bytes_pattern(pattern: "re.Pattern[str]") -> "re.Pattern[bytes]":
+    """The pattern compiled for matching the UTF-8 encoded file content. Compiled once per pattern."""
+    return re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+
+
+def _stamp_value(version: Version, tag_format: bool) -> str:
+    return version.as_tag() if tag_format else str(version)
+
+
+class _VersionSwapper:
+    """Replace the version group of a match, same as the semantic-release ``VersionSwapper`` but for bytes."""
+
+    def __init__(self, value: bytes) -> None:
+        self.value = value
+
+    def __call__(self, match: "re.Match[bytes]") -> bytes:
+        """Matched text with the new version."""
+        start, end = match.span()
+        version_start, version_end = match.span(VERSION_GROUP)
+        return match.string[start:version_start] + self.value + match.string[version_end:end]
+
+
+@dataclass
+class PatternStamp:
+    """Regular expression of a ``version_variables`` entry."""
+
+    pattern: "re.Pattern[str]"
+    #: Stamp the version tag (e.g. ``v1.2.0``) instead of the version number
+    tag_format: bool = False
+
+
+@dataclass
+class TomlStamp:
+    """Dotted key of a ``version_toml`` entry, e.g. ``project.version``."""
+
+    key: str
+    #: Stamp the version tag (e.g. ``v1.2.0``) instead of the version number
+    tag_format: bool = False
+
+
+@dataclass
+class StampTarget:
+    """All version declarations of one file."""
+
+    path: Path
+    patterns: list[PatternStamp] = field(default_factory=list)
+    toml_keys: list[TomlStamp] = field(default_factory=list)
+
+
+@dataclass
+class StampedFile:
+    path: Path
+    #: Whether the file content changed
+    changed: bool
+    #: Seconds for reading, stamping and writing the file
+    duration: float
+    #: Size in bytes before stamping
+    size: int
+
+
+class VersionStamper:
+    """
+    Stamp the version in all files of the ``version_variables`` and ``version_toml`` declarations with one pass per file.
+
+    semantic-release reads and writes a file once per declaration. Here the declarations are grouped by file:
+
+    * every file is read once; files of at least :data:`MMAP_THRESHOLD` bytes are memory mapped
+    * the regular expressions are matched on the UTF-8 bytes and all versions are replaced in one go,
+      such that line endings and the rest of the content are kept byte by byte
+    * the TOML keys of a file are updated with one parse of the document
+    * changed files are written atomically (temporary file and rename)
+
+    With :meth:`stage` the written content is stored as blobs and added to the index without ``git add``.
+    """
+
+    def __init__(self, targets: list[StampTarget], other_declarations: "list[IVersionReplacer] | None" = None) -> None:
+        self.targets = targets
+        #: Declarations of unknown types, stamped by semantic-release itself
+        self.other_declarations = other_declarations or []
+
+    @classmethod
+    def from_declarations(cls, declarations: "Sequence[IVersionReplacer]") -> "VersionStamper":
+        """
+        Group the pattern and TOML declarations by file.
+
+        The file, the pattern and the key are private attributes of the semantic-release declarations.
+        Declarations without them (e.g. of another semantic-release version) are left to semantic-release.
+        """
+        try:
+            from semantic_release.version.declarations.enum import VersionStampType
+            from semantic_release.version.declarations.pattern import PatternVersionDeclaration
+            from semantic_release.version.declarations.toml import TomlVersionDeclaration
+        except ImportError:
+            # semantic-release before 9.20
+            return cls([], list(declarations))
+
+        targets: dict[Path, StampTarget] = {}
+        others = []
+        for declaration in declarations:
+            path = getattr(declaration, "_path", None)
+            stamp_format = getattr(declaration, "_stamp_format", None)
+            pattern = getattr(declaration, "_search_pattern", None) if isinstance(declaration, PatternVersionDeclaration) else None
+            key = getattr(declaration, "_search_text", None) if isinstance(declaration, TomlVersionDeclaration) else None
+            if not isinstance(path, Path) or not isinstance(stamp_format, VersionStampType):
+                others.append(declaration)
+            elif isinstance(pattern, re.Pattern):
+                targets.setdefault(path, StampTarget(path)).patterns.append(PatternStamp(pattern, stamp_format == VersionStampType.TAG_FORMAT))
+            elif isinstance(key, str):
+                targets.setdefault(path, StampTarget(path)).toml_keys.append(TomlStamp(key, stamp_format == VersionStampType.TAG_FORMAT))
+            else:
+                others.append(declaration)
+        return cls(list(targets.values()), others)
+
+    def stamp(self, target: StampTarget, version: Version) -> StampedFile:
+        """Stamp the version in the file of the target and write it, if it changed."""
+        start = time.perf_counter()
+        if not target.path.is_file():
+            raise UserNotificationException(f"Cannot stamp the version in {target.path}, the file does not exist.")
+        with open(target.path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            buffer: Any = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size >= MMAP_THRESHOLD else file.read()
+            try:
+                parts, changed = self.substitute(buffer, target.patterns, version)
+                if target.toml_keys:
+                    content = b"".join(parts).decode("utf-8")
+                    new_content = self.update_toml(content, target.toml_keys, version)
+                    parts, changed = [new_content.encode("utf-8")], changed or new_content != content
+                tmp_file = self.write_tmp_file(target.path, parts) if changed else None
+            finally:
+                # The slices of the mapped file must be released before it can be closed
+                parts = []
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
+        if tmp_file:
+            os.replace(tmp_file, target.path)
+        return StampedFile(target.path, changed, time.perf_counter() - start, size)
+
+    @staticmethod
+    def substitute(buffer: Any, stamps: list[PatternStamp], version: Version) -> tuple[list[Any], bool]:
+        """
+        Replace the versions matched by all patterns. Returns the new content as list of parts and whether it changed.
+
+        The patterns are matched on the original content. If matches of different patterns overlap,
+        the patterns are applied one after another like semantic-release does.
+        """
+        replacements: dict[tuple[int, int], tuple[int, int, bytes]] = {}
+        for stamp in stamps:
+            value = _stamp_value(version, stamp.tag_format).encode()
+            for match in _bytes_pattern(stamp.pattern).finditer(buffer):
+                replacements[match.span()] = (*match.span(VERSION_GROUP), value)
+        spans = sorted(replacements)
+        if any(end > next_start for (_, end), (next_start, _) in pairwise(spans)):
+            original = content = bytes(buffer)
+            for stamp in stamps:
+                content = _bytes_pattern(stamp.pattern).sub(_VersionSwapper(_stamp_value(version, stamp.tag_format).encode()), content)
+            return [content], content != original
+        view = memoryview(buffer)
+        parts: list[Any] = []
+        position = 0
+        changed = False
+        for span in spans:
+            version_start, version_end, value = replacements[span]
+            changed = changed or view[version_start:version_end] != value
+            parts.extend([view[position:version_start], value])
+            position = version_end
+        parts.append(view[position:])
+        return parts, changed
+
+    @staticmethod
+    def update_toml(content: str, stamps: list[TomlStamp], version: Version) -> str:
+        """Set all keys with one parse of the document. Missing keys are ignored, like semantic-release does."""
+        document = tomlkit.loads(content)
+        for stamp in stamps:
+            *tables, name = stamp.key.split(".")
+            table: Any = document
+            for table_name in tables:
+                table = table.get(table_name) if isinstance(table, MutableMapping) else None
+            if isinstance(table, MutableMapping) and name in table:
+                table[name] = _stamp_value(version, stamp.tag_format)
+        return tomlkit.dumps(document)
+
+    @staticmethod
+    def write_tmp_file(path: Path, parts: list[Any]) -> Path:
+        """Write the new content next to the file, to be renamed over it."""
+        tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as file:
+            file.writelines(parts)
+        shutil.copymode(path, tmp_file)
+        return tmp_file
+
+    @staticmethod
+    def stage(repo: Repo, files: list[Path]) -> None:
+        """Write the blobs of the files and add them to the index, with one ``git hash-object`` and one ``git update-index`` call for all files."""
+        repo_dir = Path(repo.working_dir).resolve()
+        paths = [file.resolve().relative_to(repo_dir).as_posix() for file in files]
+        # Keep the file mode of the index, e.g. of executable scripts
+        modes = {}
+        # -z: otherwise paths with non-ASCII characters are C-quoted
+        for entry in repo.git.ls_files("-z", "--stage", "--", *paths).split("\0"):
+            if entry:
+                info, path = entry.split("\t", 1)
+                modes[path] = info.split()[0]
+        # The paths select the attributes (e.g. line ending conversion), same as for git add
+        blobs = _run_git(repo_dir, ["hash-object", "-w", "--stdin-paths"], "".join(f"{path}\n" for path in paths)).split()
+        _run_git(repo_dir, ["update-index", "--index-info"], "".join(f"{modes.get(path, '100644')} {blob}\t{path}\n" for path, blob in zip(paths, blobs, strict=True)))
+
+
+def _run_git(repo_dir: Path, args: list[str], input: str) -> str:
+    result = subprocess.run(["git", *args], input=input, cwd=repo_dir, capture_output=True, text=True)  # noqa: S603, S607
+    if result.returncode != 0:
+        raise UserNotificationException(f"Failed to stage the stamped files, git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
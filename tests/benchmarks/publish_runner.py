@@ -0,0 +1,53 @@
+"""
+Run the PublishToOrphanBranch step once and print the measurements as JSON.
+
+The step runs in its own process, so the peak memory is the one of the publish and not of the test session.
+Usage: ``python -m tests.benchmarks.publish_runner <repo_dir> <version> <backend>``
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from pypeline.domain.execution_context import ExecutionContext
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import ReleaseCommit
+from pypeline_semantic_release.publish_to_orphan_branch import OrphanBranchBackend, PublishToOrphanBranch, PublishToOrphanBranchConfig
+from pypeline_semantic_release.tracing import Tracer
+
+if sys.platform != "win32":
+    import resource
+
+
+def _peak_memory(children: bool) -> int | None:
+    """Peak resident set size in bytes of this process or of its terminated child processes. None on Windows."""
+    if sys.platform == "win32":
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def main(repo_dir: Path, version: str, backend: str) -> dict[str, float | int | None]:
+    execution_context = ExecutionContext(project_root_dir=repo_dir)
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse(version)), "benchmark")
+    execution_context.data_registry.insert(CIContext(is_pull_request=False, ci_system=CISystem.JENKINS, target_branch="develop", current_branch="develop"), "benchmark")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output"], backend=OrphanBranchBackend(backend))
+    step = PublishToOrphanBranch(execution_context, config=config.to_dict())
+    start = time.perf_counter()
+    step.run()
+    total = time.perf_counter() - start
+    phases = {span.name: (span.duration_ns or 0) / 1e9 for span in Tracer.from_execution_context(execution_context, "benchmark").spans if span.name not in ("process", "run")}
+    return {
+        **phases,
+        "total": total,
+        "peak_memory": _peak_memory(children=False),
+        "git_peak_memory": _peak_memory(children=True),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(Path(sys.argv[1]), sys.argv[2], sys.argv[3])))
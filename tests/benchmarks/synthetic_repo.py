@@ -0,0 +1,124 @@
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, cast
+
+from git import Repo
+
+PYPROJECT_CONTENT = """\
+[tool.poetry]
+name = "example-project"
+version = "0.1.0"
+description = "An example project"
+authors = ["Your Name <your.email@example.com>"]
+
+[tool.semantic_release.branches.main]
+match = "develop"
+
+[tool.semantic_release.branches.noop]
+match = "(?!develop$)"
+prerelease = true
+"""
+
+#: Commit message types used round robin, a feature every few commits like in a real project
+COMMIT_TYPES = ["fix", "chore", "feat", "docs", "fix", "refactor", "test"]
+
+
+def synthetic_versions(count: int) -> Iterator[str]:
+    """Yield increasing versions, every fourth release is preceded by two release candidates."""
+    release = 1
+    while True:
+        version = f"{release // 100}.{release % 100}.0"
+        if release % 4 == 0:
+            for rc in (1, 2):
+                yield f"{version}-rc.{rc}"
+                count -= 1
+                if count == 0:
+                    return
+        yield version
+        count -= 1
+        if count == 0:
+            return
+        release += 1
+
+
+def _write_data(stream: IO[bytes], data: bytes) -> None:
+    stream.write(f"data {len(data)}\n".encode() + data + b"\n")
+
+
+def create_bare_repo(path: Path, commits: int, tags: int, unreleased_commits: int = 10) -> Path:
+    """
+    Create a bare repository with a linear ``develop`` history of conventional commits and tags ``v<version>``.
+
+    The repository is written with a single ``git fast-import`` process, which takes seconds even for 100k commits.
+    The tags are distributed evenly over the history, the last ``unreleased_commits`` commits are not released yet.
+    """
+    Repo.init(path, bare=True, initial_branch="develop")
+    tag_every = max(1, (commits - unreleased_commits) // tags)
+    versions = synthetic_versions(tags)
+    process = subprocess.Popen(["git", "fast-import", "--quiet", "--done"], cwd=path, stdin=subprocess.PIPE)  # noqa: S607
+    stream = cast(IO[bytes], process.stdin)
+    timestamp = 1_600_000_000
+    for number in range(1, commits + 1):
+        stream.write(f"commit refs/heads/develop\nmark :{number}\n".encode())
+        stream.write(f"committer Bench <bench@example.com> {timestamp + number * 60} +0000\n".encode())
+        _write_data(stream, f"{COMMIT_TYPES[number % len(COMMIT_TYPES)]}: change number {number}\n".encode())
+        if number == 1:
+            stream.write(b"M 100644 inline pyproject.toml\n")
+            _write_data(stream, PYPROJECT_CONTENT.encode())
+            stream.write(b"M 100644 inline CHANGELOG.md\n")
+            _write_data(stream, b"")
+        stream.write(b"M 100644 inline feature.txt\n")
+        _write_data(stream, f"{number}\n".encode())
+        stream.write(b"\n")
+        if number % tag_every == 0 and number <= commits - unreleased_commits:
+            version = next(versions, None)
+            if version:
+                stream.write(f"reset refs/tags/v{version}\nfrom :{number}\n\n".encode())
+    stream.write(b"done\n")
+    process.communicate()
+    assert process.returncode == 0, "git fast-import failed"
+    return path
+
+
+def create_bare_monorepo(path: Path, packages: int, commits: int, releases: int, unreleased_commits: int = 100) -> Path:
+    """
+    Create a bare monorepo with the packages ``packages/p<number>``, every commit changes one of them (round robin).
+
+    All packages are released together ``releases`` times, with the tags ``p<number>-v<version>``.
+    """
+    Repo.init(path, bare=True, initial_branch="develop")
+    release_every = max(1, (commits - unreleased_commits) // releases)
+    versions = synthetic_versions(releases)
+    process = subprocess.Popen(["git", "fast-import", "--quiet", "--done"], cwd=path, stdin=subprocess.PIPE)  # noqa: S607
+    stream = cast(IO[bytes], process.stdin)
+    timestamp = 1_600_000_000
+    for number in range(1, commits + 1):
+        package = number % packages
+        stream.write(f"commit refs/heads/develop\nmark :{number}\n".encode())
+        stream.write(f"committer Bench <bench@example.com> {timestamp + number * 60} +0000\n".encode())
+        _write_data(stream, f"{COMMIT_TYPES[number % len(COMMIT_TYPES)]}: change number {number} of p{package}\n".encode())
+        if number == 1:
+            stream.write(b"M 100644 inline pyproject.toml\n")
+            _write_data(stream, PYPROJECT_CONTENT.encode())
+        stream.write(f"M 100644 inline packages/p{package}/module.py\n".encode())
+        _write_data(stream, f"{number}\n".encode())
+        stream.write(b"\n")
+        if number % release_every == 0 and number <= commits - unreleased_commits:
+            version = next(versions, None)
+            if version:
+                for tagged_package in range(packages):
+                    stream.write(f"reset refs/tags/p{tagged_package}-v{version}\nfrom :{number}\n\n".encode())
+    stream.write(b"done\n")
+    process.communicate()
+    assert process.returncode == 0, "git fast-import failed"
+    return path
+
+
+def clone(origin: Path, path: Path) -> Repo:
+    """Clone the bare repository like a CI job does, with the bare repository as origin."""
+    repo = Repo.clone_from(str(origin), str(path), branch="develop")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Bench")
+        config.set_value("user", "email", "bench@example.com")
+    return repo
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import ChangelogRendering, CreateReleaseCommit, CreateReleaseCommitConfig
+from pypeline_semantic_release.tracing import Tracer
+from tests.benchmarks.synthetic_repo import clone, create_bare_repo
+from tests.benchmarks.utils import check_baseline
+
+#: Changelog template of this repository
+CHANGELOG_TEMPLATE = Path(__file__).parents[2] / "templates" / "CHANGELOG.md.j2"
+
+
+def _changelog_duration(repo_dir: Path, rendering: ChangelogRendering) -> float:
+    execution_context = ExecutionContext(project_root_dir=repo_dir)
+    execution_context.data_registry.insert(CIContext(is_pull_request=False, ci_system=CISystem.JENKINS, target_branch="develop", current_branch="develop"), "ci_context")
+    config = CreateReleaseCommitConfig(push=False, in_process=True, changelog_rendering=rendering)
+    step = CreateReleaseCommit(execution_context, config=config.to_dict())
+    step.run()
+    assert step.release_commit
+    return next(span.duration_ns or 0 for span in Tracer.from_execution_context(execution_context, "benchmark").spans if span.name == "changelog") / 1e9
+
+
+@pytest.mark.benchmark
+def test_changelog(tmp_path: Path) -> None:
+    """Changelog of a repository with 1000 releases: rendering the whole history against inserting the new release."""
+    repo = clone(create_bare_repo(tmp_path / "origin.git", 10_000, 1_000), tmp_path / "repo")
+    repo_dir = Path(repo.working_dir)
+    (repo_dir / "templates").mkdir()
+    (repo_dir / "templates" / "CHANGELOG.md.j2").write_text(CHANGELOG_TEMPLATE.read_text())
+    repo.index.add(["templates/CHANGELOG.md.j2"])
+    repo.index.commit("docs: add changelog template")
+
+    metrics = {"full": _changelog_duration(repo_dir, ChangelogRendering.FULL)}
+    (repo_dir / "feature.txt").write_text("new feature")
+    repo.index.add(["feature.txt"])
+    repo.index.commit("feat: new feature")
+    metrics["incremental"] = _changelog_duration(repo_dir, ChangelogRendering.INCREMENTAL)
+
+    assert (repo_dir / "CHANGELOG.md").read_text().count("\n## v") > 1000
+    check_baseline("changelog", metrics)
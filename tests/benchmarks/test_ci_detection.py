@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+from pypeline_semantic_release.check_ci_context import CIDetectionRule, CIDetectionTable, detect_ci_context, load_detection_rules
+from tests.benchmarks.utils import check_baseline
+
+#: Number of detections per measurement, a single detection takes microseconds
+DETECTIONS = 100_000
+
+#: Number of additional rules, to see how the detection scales with the number of registered detectors
+PLUGIN_RULES = 100
+
+
+def _measure(environ: dict[str, str], table: CIDetectionTable) -> float:
+    start = time.perf_counter()
+    for _ in range(DETECTIONS):
+        detect_ci_context(environ, table)
+    return time.perf_counter() - start
+
+
+@pytest.mark.benchmark
+def test_ci_detection() -> None:
+    load_detection_rules.cache_clear()
+    start = time.perf_counter()
+    table = load_detection_rules()
+    load_time = time.perf_counter() - start
+
+    plugin_rules = [CIDetectionRule(ci_system=f"ci_{number}", detect={f"CI_{number}": "true"}, branch=f"CI_{number}_BRANCH") for number in range(PLUGIN_RULES)]
+    many_rules = CIDetectionTable([*table.rules, *plugin_rules])
+    # A local build evaluates all rules without a match, the worst case
+    local_environ = {name: value for name, value in os.environ.items() if name not in {"JENKINS_HOME", "GITHUB_ACTIONS"}}
+    jenkins_environ = {**local_environ, "JENKINS_HOME": "/var/jenkins", "CHANGE_ID": "1", "CHANGE_TARGET": "main", "CHANGE_BRANCH": "feature"}
+
+    check_baseline(
+        "ci_detection",
+        {
+            "load rules": load_time,
+            "local": _measure(local_environ, table),
+            "jenkins": _measure(jenkins_environ, table),
+            f"local with {PLUGIN_RULES} plugin rules": _measure(local_environ, many_rules),
+        },
+    )
@@ -0,0 +1,43 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig, PackageConfig
+from tests.benchmarks.synthetic_repo import COMMIT_TYPES, clone, create_bare_monorepo
+from tests.benchmarks.utils import check_baseline
+
+#: Number of packages, commits and releases of the synthetic monorepo
+PACKAGES, COMMITS, RELEASES = 40, 10_000, 50
+
+#: Every package gets a commit of every type since its last release
+UNRELEASED_COMMITS = PACKAGES * len(COMMIT_TYPES)
+
+
+def _next_versions(repo_dir: Path, packages: list[PackageConfig]) -> float:
+    execution_context = ExecutionContext(project_root_dir=repo_dir)
+    execution_context.data_registry.insert(CIContext(is_pull_request=False, ci_system=CISystem.JENKINS, target_branch="develop", current_branch="develop"), "ci_context")
+    step = CreateReleaseCommit(execution_context, config=CreateReleaseCommitConfig(push=False, packages=packages).to_dict())
+    # Only the version computation is measured
+    with patch.object(CreateReleaseCommit, "tag_packages"):
+        start = time.perf_counter()
+        step.run()
+        total = time.perf_counter() - start
+    assert len(step.package_releases) == len(packages)
+    return total
+
+
+@pytest.mark.benchmark
+def test_monorepo_next_versions(tmp_path: Path) -> None:
+    """Next versions of 40 packages: one step for all packages against one step per package."""
+    repo_dir = Path(clone(create_bare_monorepo(tmp_path / "origin.git", PACKAGES, COMMITS, RELEASES, UNRELEASED_COMMITS), tmp_path / "repo").working_dir)
+    packages = [PackageConfig(name=f"p{number}", tag_format=f"p{number}-v{{version}}", paths=[f"packages/p{number}"]) for number in range(PACKAGES)]
+    # Warm up the tag indexes and the commit parse cache, like for every following pipeline run
+    _next_versions(repo_dir, packages)
+
+    metrics = {"all packages": _next_versions(repo_dir, packages)}
+    metrics["per package"] = sum(_next_versions(repo_dir, [package]) for package in packages)
+    check_baseline("monorepo_next_versions", metrics)
@@ -0,0 +1,102 @@
+import importlib.util
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pypeline.domain.execution_context import ExecutionContext
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import ReleaseCommit
+from pypeline_semantic_release.package_upload import PackageUploader, find_distributions
+from pypeline_semantic_release.publish_package import PublishBackend, PublishPackage, PublishPackageConfig, UploadMethod
+from tests.benchmarks.utils import check_baseline
+from tests.index_server import LocalIndexServer, create_sdist, create_wheel
+
+#: Seconds every upload takes on the stand-in index, like a remote index
+INDEX_LATENCY = 0.1
+
+#: Number of modules of the package, to have distributions of a realistic size
+MODULES = 200
+
+#: Wheels of a package with extension modules, for the upload without build
+PYTHON_TAGS = ["cp310", "cp311", "cp312", "cp313", "cp314"]
+
+
+def _build_without_isolation(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Build with the poetry-core of this environment instead of downloading it into an isolated build environment, the benchmark runs offline."""
+    monkeypatch.setattr(PublishPackage, "get_build_command", staticmethod(lambda: [sys.executable, "-m", "build", "--no-isolation"]))
+    monkeypatch.setenv("UV_NO_BUILD_ISOLATION", "1")
+    monkeypatch.setenv("UV_PYTHON", sys.executable)
+    # Fail instead of measuring a download if a tool still needs a package index
+    monkeypatch.setenv("UV_NO_INDEX", "1")
+    monkeypatch.setenv("PIP_NO_INDEX", "1")
+
+
+def _tool_available(backend: PublishBackend) -> bool:
+    if backend == PublishBackend.BUILD:
+        return importlib.util.find_spec("build.__main__") is not None
+    return shutil.which(backend.value) is not None
+
+
+def _create_project(project_dir: Path) -> None:
+    (project_dir / "src" / "bench_package").mkdir(parents=True)
+    (project_dir / "pyproject.toml").write_text(
+        '[project]\nname = "bench-package"\nversion = "1.0.0"\ndescription = "Benchmark package"\nrequires-python = ">=3.10"\n\n'
+        '[build-system]\nrequires = ["poetry-core>=2,<3"]\nbuild-backend = "poetry.core.masonry.api"\n'
+    )
+    (project_dir / "src" / "bench_package" / "__init__.py").write_text("")
+    for number in range(MODULES):
+        (project_dir / "src" / "bench_package" / f"module_{number}.py").write_text(f"def function_{number}() -> int:\n    return {number}\n" * 50)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("upload_method", list(UploadMethod), ids=lambda upload_method: upload_method.value)
+@pytest.mark.parametrize("backend", list(PublishBackend), ids=lambda backend: backend.value)
+def test_publish_package_latency(backend: PublishBackend, upload_method: UploadMethod, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    if backend == PublishBackend.BUILD and upload_method == UploadMethod.BACKEND:
+        pytest.skip("The build backend cannot publish.")
+    if not _tool_available(backend):
+        pytest.skip(f"{backend.value} is not installed.")
+    if importlib.util.find_spec("poetry.core") is None:
+        pytest.skip("poetry-core is not installed, it is needed to build without isolation.")
+    _create_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    _build_without_isolation(monkeypatch)
+    monkeypatch.setenv("PYPI_USER", "user")
+    monkeypatch.setenv("PYPI_PASSWD", "password")
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse("1.0.0")), "benchmark")
+    execution_context.data_registry.insert(CIContext(ci_system=CISystem.JENKINS, is_pull_request=False, target_branch="main", current_branch="main"), "benchmark")
+
+    with LocalIndexServer(latency=INDEX_LATENCY) as index:
+        config = PublishPackageConfig(backend=backend, upload_method=upload_method, pypi_repository_url=index.url)
+        if backend == PublishBackend.POETRY and upload_method == UploadMethod.BACKEND:
+            # Poetry only publishes to configured repositories
+            monkeypatch.setenv("POETRY_REPOSITORIES_LOCAL_URL", index.url)
+            config.pypi_repository_name = "local"
+        start = time.perf_counter()
+        PublishPackage(execution_context, config=config.to_dict()).run()
+        total = time.perf_counter() - start
+
+    assert sorted(upload.filename for upload in index.uploads) == ["bench_package-1.0.0-py3-none-any.whl", "bench_package-1.0.0.tar.gz"]
+    check_baseline(f"publish_package[{backend.value}-{upload_method.value}]", {"total": total})
+
+
+@pytest.mark.benchmark
+def test_native_upload_latency(tmp_path: Path) -> None:
+    """Upload only, without a build tool: a sdist and one wheel per Python version."""
+    create_sdist(tmp_path, "bench_package", "1.0.0", size=1024 * 1024)
+    for python_tag in PYTHON_TAGS:
+        create_wheel(tmp_path, "bench_package", "1.0.0", python_tag, size=1024 * 1024)
+    distributions = find_distributions(tmp_path)
+    metrics = {}
+    for max_workers in [1, 4]:
+        with LocalIndexServer(latency=INDEX_LATENCY) as index, PackageUploader(index.url, "user", "password", max_workers) as uploader:
+            start = time.perf_counter()
+            uploader.upload(distributions)
+            metrics[f"{max_workers} workers"] = time.perf_counter() - start
+        assert len(index.uploads) == len(distributions)
+    check_baseline("native_upload", metrics)
@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from pypeline_semantic_release.publish_to_orphan_branch import OrphanBranchBackend
+from tests.benchmarks.utils import check_baseline
+
+#: Number of generated files and directory nesting depth of the output trees
+SCALES = {"1k": (1_000, 1), "50k": (50_000, 1), "200k": (200_000, 1), "deep": (20_000, 64)}
+
+#: Files per directory of the generated output
+FILES_PER_DIR = 100
+
+#: Every n-th file is changed for the incremental republish
+CHANGE_EVERY = 100
+
+PROJECT_ROOT = Path(__file__).parents[2]
+
+
+def _file_path(number: int, depth: int) -> str:
+    directory = number // FILES_PER_DIR
+    levels = [f"level{level}" for level in range(directory % depth)]
+    return "/".join(["output", *levels, f"dir{directory}", f"file{number}.c"])
+
+
+def write_output_tree(repo_dir: Path, files: int, depth: int, revision: int = 0) -> None:
+    """Write the generated output. Only every ``CHANGE_EVERY``-th file depends on the revision."""
+    for number in range(files):
+        path = repo_dir / _file_path(number, depth)
+        if number % FILES_PER_DIR == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        if revision and number % CHANGE_EVERY:
+            continue
+        path.write_text(f"/* Generated file {number}, revision {revision} */\nconst int value_{number} = {number + revision};\n" + "/* padding */\n" * 8)
+
+
+def _create_repo(tmp_path: Path) -> Path:
+    """Working repository with a local bare repository as origin."""
+    origin = Repo.init(tmp_path / "origin.git", bare=True, initial_branch="develop")
+    repo = Repo.init(tmp_path / "repo", initial_branch="develop")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Bench")
+        config.set_value("user", "email", "bench@example.com")
+    (Path(repo.working_dir) / ".gitignore").write_text("build/\n")
+    repo.index.add([".gitignore"])
+    repo.index.commit("chore: initial commit")
+    repo.create_remote("origin", str(origin.git_dir))
+    repo.git.push("origin", "develop")
+    return Path(repo.working_dir)
+
+
+def _publish(repo_dir: Path, version: str, backend: OrphanBranchBackend) -> dict[str, float]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "tests.benchmarks.publish_runner", str(repo_dir), version, backend.value],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+        # The package is also importable without installation, e.g. from a checkout with pytest's pythonpath
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert result.returncode == 0, result.stderr
+    metrics = json.loads(result.stdout.splitlines()[-1])
+    return {name: value for name, value in metrics.items() if value is not None}
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("backend", list(OrphanBranchBackend), ids=lambda backend: backend.value)
+@pytest.mark.parametrize("scale", list(SCALES))
+def test_publish_to_orphan_branch(scale: str, backend: OrphanBranchBackend, tmp_path: Path) -> None:
+    files, depth = SCALES[scale]
+    repo_dir = _create_repo(tmp_path)
+    origin = Repo(tmp_path / "origin.git")
+
+    write_output_tree(repo_dir, files, depth)
+    metrics = {f"first/{name}": value for name, value in _publish(repo_dir, "1.0.0", backend).items()}
+    first_tree = origin.commit("generated-code").tree
+    assert origin.tags["generated-code-v1.0.0"].commit == origin.commit("generated-code")
+
+    write_output_tree(repo_dir, files, depth, revision=1)
+    metrics.update({f"incremental/{name}": value for name, value in _publish(repo_dir, "1.1.0", backend).items()})
+    tip = origin.commit("generated-code")
+    assert tip.parents[0].tree == first_tree
+    assert len(tip.diff(tip.parents[0])) == len(range(0, files, CHANGE_EVERY))
+
+    check_baseline(f"publish_to_orphan_branch[{scale}-{backend.value}]", metrics)
@@ -0,0 +1,51 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit
+from pypeline_semantic_release.tracing import Tracer
+from tests.benchmarks.synthetic_repo import clone, create_bare_repo
+from tests.benchmarks.utils import check_baseline
+
+#: Number of commits and tags of the synthetic repositories
+SCALES = {"10k": (10_000, 1_000), "100k": (100_000, 20_000)}
+
+
+@pytest.fixture(scope="module", params=list(SCALES))
+def origin(request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory) -> tuple[str, Path]:
+    commits, tags = SCALES[request.param]
+    return request.param, create_bare_repo(tmp_path_factory.mktemp(f"origin_{request.param}") / "origin.git", commits, tags)
+
+
+def _run_step(repo_dir: Path) -> tuple[CreateReleaseCommit, dict[str, float]]:
+    execution_context = ExecutionContext(project_root_dir=repo_dir)
+    execution_context.data_registry.insert(CIContext(is_pull_request=False, ci_system=CISystem.JENKINS, target_branch="develop", current_branch="develop"), "ci_context")
+    step = CreateReleaseCommit(execution_context)
+    # Only the version computation is measured, creating the release commit is semantic-release itself
+    with patch.object(CreateReleaseCommit, "do_release") as do_release:
+        start = time.perf_counter()
+        step.run()
+        total = time.perf_counter() - start
+    do_release.assert_called_once()
+    phases = {span.name: (span.duration_ns or 0) / 1e9 for span in Tracer.from_execution_context(execution_context, "benchmark").spans if span.name not in ("release", "run")}
+    return step, {**phases, "total": total}
+
+
+@pytest.mark.benchmark
+def test_release_version(origin: tuple[str, Path], tmp_path: Path) -> None:
+    scale, origin_path = origin
+    repo_dir = Path(clone(origin_path, tmp_path / "repo").working_dir)
+
+    metrics: dict[str, float] = {}
+    # The first run in a fresh clone builds the caches (tag index, parsed commits), the second one uses them
+    for run in ("cold", "warm"):
+        step, phases = _run_step(repo_dir)
+        assert step.release_commit and step.release_commit.previous_version
+        assert step.release_commit.version > step.release_commit.previous_version
+        metrics.update({f"{run}/{phase}": duration for phase, duration in phases.items()})
+
+    check_baseline(f"release_version[{scale}]", metrics)
@@ -0,0 +1,46 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+#: Stored baselines, the measured values of a reference run per benchmark and metric
+BASELINES_FILE = Path(__file__).parent / "baselines.json"
+
+#: Measured values of the last run, to compare before and after a change
+RESULTS_DIR = Path(__file__).parents[2] / "build" / "benchmarks"
+
+#: A metric fails if it exceeds the baseline by this factor. Can be changed with the PYPELINE_BENCHMARK_THRESHOLD environment variable.
+DEFAULT_THRESHOLD = 2.0
+
+#: Time metrics below this absolute value (in seconds) are never reported as regression, they are dominated by noise
+MIN_TIME = 0.05
+
+#: Memory metrics below this absolute value (in bytes) are never reported as regression
+MIN_MEMORY = 128 * 1024 * 1024
+
+
+def check_baseline(benchmark: str, metrics: dict[str, float]) -> None:
+    """
+    Compare the measured metrics with the stored baselines and fail on regressions.
+
+    Metric names ending with ``peak_memory`` are bytes, all others seconds.
+    Set ``PYPELINE_BENCHMARK_UPDATE=1`` to store the measured values as new baselines instead.
+    """
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    (RESULTS_DIR / f"{benchmark}.json").write_text(json.dumps(metrics, indent=2))
+    baselines = json.loads(BASELINES_FILE.read_text()) if BASELINES_FILE.exists() else {}
+    if os.getenv("PYPELINE_BENCHMARK_UPDATE") == "1":
+        baselines[benchmark] = {name: round(value, 3) if isinstance(value, float) else value for name, value in metrics.items()}
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        return
+    if benchmark not in baselines:
+        pytest.skip(f"No baseline for {benchmark}. Run with PYPELINE_BENCHMARK_UPDATE=1 to store one.")
+    threshold = float(os.getenv("PYPELINE_BENCHMARK_THRESHOLD", DEFAULT_THRESHOLD))
+    regressions = []
+    for name, value in metrics.items():
+        baseline = baselines[benchmark].get(name)
+        limit = max(baseline * threshold, MIN_MEMORY if name.endswith("peak_memory") else MIN_TIME) if baseline is not None else None
+        if limit is not None and value > limit:
+            regressions.append(f"{name}: {value:.3f} > {limit:.3f} (baseline {baseline})")
+    assert not regressions, f"Regressions in {benchmark}:\n" + "\n".join(regressions)
@@ -0,0 +1,132 @@
+"""Local stand-in for a package index implementing the legacy upload API."""
+
+import hashlib
+import io
+import tarfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class Upload:
+    filename: str
+    fields: dict[str, list[str]]
+    content: bytes
+    #: Client port of the connection, the same port means the connection was reused
+    client_port: int
+    authorization: str | None
+
+
+@dataclass
+class LocalIndexServer:
+    """HTTP server accepting uploads like PyPI. Use it as context manager."""
+
+    #: Seconds every upload takes on the server, to simulate a remote index
+    latency: float = 0.0
+    #: Status of successful uploads, some indexes answer with 201 Created
+    success_status: int = 200
+    uploads: list[Upload] = field(default_factory=list)
+    requests: int = 0
+
+    def __post_init__(self) -> None:
+        """Start listening on a free port."""
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/legacy/"
+
+    @property
+    def connections(self) -> int:
+        return len({upload.client_port for upload in self.uploads})
+
+    def __enter__(self) -> "LocalIndexServer":
+        """Serve the requests in a background thread."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        index = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive connections
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                message = BytesParser(policy=default).parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+                fields: dict[str, list[str]] = {}
+                upload = None
+                for part in message.iter_parts():
+                    name = part.get_param("name", header="content-disposition")
+                    filename = part.get_filename()
+                    content = part.get_payload(decode=True)
+                    assert isinstance(name, str) and isinstance(content, bytes)
+                    if filename:
+                        upload = Upload(filename, fields, content, self.client_address[1], self.headers["Authorization"])
+                    else:
+                        fields.setdefault(name, []).append(content.decode())
+                time.sleep(index.latency)
+                with index._lock:
+                    index.requests += 1
+                    if not upload or hashlib.sha256(upload.content).hexdigest() != fields["sha256_digest"][0]:
+                        self._respond(400, "Invalid upload")
+                    elif any(existing.filename == upload.filename for existing in index.uploads):
+                        self._respond(400, "File already exists")
+                    else:
+                        index.uploads.append(upload)
+                        self._respond(index.success_status, "OK")
+
+            def _respond(self, status: int, reason: str) -> None:
+                self.send_response(status, reason)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def create_wheel(dist_dir: Path, name: str, version: str, python_tag: str = "py3", size: int = 1024) -> Path:
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    path = dist_dir / f"{name}-{version}-{python_tag}-none-any.whl"
+    with zipfile.ZipFile(path, "w") as wheel:
+        wheel.writestr(f"{name}/__init__.py", "x" * size)
+        wheel.writestr(f"{name}-{version}.dist-info/METADATA", _metadata(name, version))
+    return path
+
+
+def create_sdist(dist_dir: Path, name: str, version: str, size: int = 1024) -> Path:
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    path = dist_dir / f"{name}-{version}.tar.gz"
+    with tarfile.open(path, "w:gz") as sdist:
+        for member, content in [("PKG-INFO", _metadata(name, version)), (f"{name}/__init__.py", "x" * size)]:
+            data = content.encode()
+            info = tarfile.TarInfo(f"{name}-{version}/{member}")
+            info.size = len(data)
+            sdist.addfile(info, io.BytesIO(data))
+    return path
+
+
+def _metadata(name: str, version: str) -> str:
+    return (
+        f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\nSummary: Test package\n"
+        "Classifier: Programming Language :: Python :: 3\nClassifier: Topic :: Software Development\n"
+        "Requires-Dist: requests\n\nLong description.\n"
+    )
@@ -0,0 +1,97 @@
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from git import Repo
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.build_cache import DistributionCache
+from pypeline_semantic_release.create_release_commit import ReleaseCommit
+from pypeline_semantic_release.publish_package import PublishPackage, PublishPackageConfig
+from tests.conftest import PyPackageRepo
+from tests.index_server import create_sdist, create_wheel
+
+
+def test_restore_stored_distributions(tmp_path: Path) -> None:
+    files = [create_sdist(tmp_path / "build", "my_package", "1.0.0"), create_wheel(tmp_path / "build", "my_package", "1.0.0")]
+    cache = DistributionCache(tmp_path / "cache")
+    assert cache.restore("tree1", "1.0.0", tmp_path / "dist") is None
+
+    cache.store("tree1", "1.0.0", files)
+
+    restored = cache.restore("tree1", "1.0.0", tmp_path / "dist")
+    assert restored == [tmp_path / "dist" / file.name for file in files]
+    assert all(file.read_bytes() == restored_file.read_bytes() for file, restored_file in zip(files, restored, strict=True))
+    # Other tree or version
+    assert cache.restore("tree2", "1.0.0", tmp_path / "dist") is None
+    assert cache.restore("tree1", "1.0.1", tmp_path / "dist") is None
+
+
+def test_corrupted_distribution_is_not_restored(tmp_path: Path) -> None:
+    wheel = create_wheel(tmp_path / "build", "my_package", "1.0.0")
+    cache = DistributionCache(tmp_path / "cache")
+    cache.store("tree1", "1.0.0", [wheel])
+    object_file = next((tmp_path / "cache" / "objects").glob("*/*"))
+    object_file.write_bytes(b"corrupted")
+
+    assert cache.restore("tree1", "1.0.0", tmp_path / "dist") is None
+    assert not (tmp_path / "dist").exists()
+    # The entry is dropped, the next build is stored again
+    assert not list((tmp_path / "cache" / "entries").glob("*.json"))
+
+
+def test_identical_distributions_are_stored_once_and_pruned(tmp_path: Path) -> None:
+    cache = DistributionCache(tmp_path / "cache", max_entries=2)
+    wheel = create_wheel(tmp_path / "build", "my_package", "1.0.0")
+    cache.store("tree1", "1.0.0", [wheel])
+    cache.store("tree2", "1.0.0", [wheel])
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*"))) == 1
+
+    cache.store("tree3", "1.0.0", [create_wheel(tmp_path / "other", "my_package", "1.0.0", size=10)])
+    assert len(list((tmp_path / "cache" / "entries").glob("*.json"))) == 2
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*"))) == 2
+
+
+@pytest.mark.parametrize("in_build_cache_dir", [False, True])
+def test_publish_package_reuses_cached_build(py_package_tmp: PyPackageRepo, tmp_path: Path, in_build_cache_dir: bool) -> None:
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    execution_context = py_package_tmp.create_ci_execution_context()
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse("0.1.0")), "test")
+    commands = []
+
+    def execute(command: list[str]) -> Mock:
+        commands.append(command[1:])
+        if command[1:] == ["build"]:
+            create_sdist(repo_dir / "dist", "example_project", "0.1.0")
+            create_wheel(repo_dir / "dist", "example_project", "0.1.0")
+        return Mock(execute=Mock(return_value=Mock(returncode=0)))
+
+    build_cache_dir = tmp_path / "ci-cache" if in_build_cache_dir else None
+    config = PublishPackageConfig(build_cache=True, build_cache_dir=str(build_cache_dir) if build_cache_dir else None).to_dict()
+    with patch.object(execution_context, "create_process_executor", side_effect=execute):
+        PublishPackage(execution_context, config=config).run()
+        built = {file.name: file.read_bytes() for file in (repo_dir / "dist").iterdir()}
+        # Retry on a new checkout of the same commit
+        shutil.rmtree(repo_dir / "dist")
+        PublishPackage(execution_context, config=config).run()
+
+    assert commands == [["build"], ["publish"], ["publish"]]
+    assert {file.name: file.read_bytes() for file in (repo_dir / "dist").iterdir()} == built
+    git_cache_dir = Path(Repo(repo_dir).common_dir) / "pypeline_semantic_release" / "dist_cache_v1"
+    cache_dir = build_cache_dir / "dist_cache_v1" if build_cache_dir else git_cache_dir
+    assert (cache_dir / "entries").is_dir()
+    assert git_cache_dir.exists() != in_build_cache_dir
+
+
+def test_publish_package_builds_dirty_tree(py_package_tmp: PyPackageRepo) -> None:
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    (repo_dir / "pyproject.toml").write_text("changed")
+    execution_context = py_package_tmp.create_ci_execution_context()
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse("0.1.0")), "test")
+
+    with patch.object(execution_context, "create_process_executor", return_value=Mock(execute=Mock(return_value=Mock(returncode=0)))) as create_process_executor:
+        PublishPackage(execution_context, config=PublishPackageConfig(build_cache=True).to_dict()).run()
+
+    assert [call.args[0][1:] for call in create_process_executor.call_args_list] == [["build"], ["publish"]]
+    assert not (Path(Repo(repo_dir).common_dir) / "pypeline_semantic_release" / "dist_cache_v1").exists()
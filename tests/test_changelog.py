@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from git import Repo
+
+from pypeline_semantic_release import changelog
+from pypeline_semantic_release.cache import get_cache_dir
+from pypeline_semantic_release.changelog import TEMPLATE_CACHE_DIR, ChangelogSplice
+from pypeline_semantic_release.create_release_commit import ChangelogRendering, CreateReleaseCommit, CreateReleaseCommitConfig
+from tests.conftest import PyPackageRepo
+
+#: Changelog template of this repository
+CHANGELOG_TEMPLATE = (Path(__file__).parents[1] / "templates" / "CHANGELOG.md.j2").read_text()
+
+
+def _add_template(repo: Repo, content: str) -> None:
+    template_file = Path(repo.working_dir) / "templates" / "CHANGELOG.md.j2"
+    template_file.parent.mkdir()
+    template_file.write_text(content)
+    repo.index.add([str(template_file)])
+    repo.index.commit("docs: add changelog template")
+
+
+def _release(py_package_tmp: PyPackageRepo, consistency_check: bool = False, inputs: dict[str, Any] | None = None) -> None:
+    config = CreateReleaseCommitConfig(push=False, in_process=True, changelog_rendering=ChangelogRendering.INCREMENTAL, changelog_consistency_check=consistency_check)
+    CreateReleaseCommit(py_package_tmp.create_ci_execution_context(inputs), config=config.to_dict()).run()
+
+
+def test_changelog_splice() -> None:
+    splice = ChangelogSplice.from_renders("# Changelog\n<!-- marker -->\n---\n", "# Changelog\n<!-- marker -->\n\n## v2\n---\n")
+    assert splice == ChangelogSplice(header="# Changelog\n<!-- marker -->\n", section="\n## v2\n")
+
+    assert splice.insert_into("# Changelog\n<!-- marker -->\n\n## v1\n---\n") == "# Changelog\n<!-- marker -->\n\n## v2\n\n## v1\n---\n"
+    # Edited title, the section is inserted after the marker
+    assert splice.insert_into("# My project\n<!-- marker -->\n\n## v1\n", "<!-- marker -->") == "# My project\n<!-- marker -->\n\n## v2\n\n## v1\n"
+    assert splice.insert_into("# My project\n\n## v1\n", "<!-- marker -->") is None
+
+
+def test_incremental_changelog(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    changelog_file = Path(repo.working_dir) / "CHANGELOG.md"
+    _add_template(repo, CHANGELOG_TEMPLATE)
+    # The empty changelog file is rendered with the whole history
+    _release(py_package_tmp)
+    assert changelog_file.read_text().startswith("# Changelog\n\n## v0.0.0")
+
+    py_package_tmp.new_feature()
+    with patch.object(changelog.logger, "warning") as warning:
+        _release(py_package_tmp, consistency_check=True)
+
+    warning.assert_not_called()
+    content = changelog_file.read_text()
+    assert content.startswith("# Changelog\n\n## v0.1.0")
+    assert content.count("- Some new feature") == 1
+    assert content.index("- Some new feature") < content.index("## v0.0.0")
+    assert repo.tags["v0.1.0"].commit == repo.head.commit
+    assert not repo.is_dirty()
+    assert list((get_cache_dir(repo) / TEMPLATE_CACHE_DIR).iterdir())
+
+
+def test_incremental_changelog_consistency_check(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    changelog_file = Path(repo.working_dir) / "CHANGELOG.md"
+    # The footer depends on all releases, it cannot be updated incrementally
+    _add_template(repo, CHANGELOG_TEMPLATE + "\n\n{{ context.history.released | length }} releases\n")
+    _release(py_package_tmp)
+    py_package_tmp.new_feature()
+    _release(py_package_tmp)
+    # Without the check, the footer is outdated
+    assert changelog_file.read_text().endswith("\n1 releases\n")
+
+    py_package_tmp.new_feature()
+    with patch.object(changelog.logger, "warning") as warning:
+        _release(py_package_tmp, consistency_check=True)
+
+    warning.assert_called_once()
+    content = changelog_file.read_text()
+    assert content.endswith("\n\n3 releases\n")
+    assert [line.split(" (")[0] for line in content.splitlines() if line.startswith("## ")] == ["## v0.2.0", "## v0.1.0", "## v0.0.0"]
+
+
+def test_incremental_changelog_after_prerelease(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    changelog_file = Path(repo.working_dir) / "CHANGELOG.md"
+    _add_template(repo, CHANGELOG_TEMPLATE)
+    _release(py_package_tmp)
+    # A prerelease of a feature branch, merged afterwards
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test")
+        config.set_value("user", "email", "test@example.com")
+    py_package_tmp.checkout_branch("feature")
+    py_package_tmp.new_feature()
+    _release(py_package_tmp, inputs={"do_prerelease": True})
+    assert "v0.1.0-rc.1" in [tag.name for tag in repo.tags]
+    repo.git.checkout("develop")
+    repo.git.merge("--no-ff", "-m", "Merge branch feature", "feature")
+
+    with patch.object(changelog.logger, "warning") as warning:
+        _release(py_package_tmp, consistency_check=True)
+
+    warning.assert_not_called()
+    content = changelog_file.read_text()
+    assert [line.split(" (")[0] for line in content.splitlines() if line.startswith("## ")] == ["## v0.1.0", "## v0.1.0-rc.1", "## v0.0.0"]
+    # The feature is listed only under the prerelease which released it
+    assert content.count("- Some new feature") == 1
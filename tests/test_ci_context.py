@@ -1,12 +1,31 @@
+import os
+from importlib.metadata import EntryPoint
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 from pypeline.domain.execution_context import ExecutionContext
 
-from pypeline_semantic_release.check_ci_context import CheckCIContext, CIContext, CIDetector, CISystem
+from pypeline_semantic_release.check_ci_context import (
+    BUILTIN_DETECTION_RULES,
+    CI_DETECTORS_ENTRY_POINT_GROUP,
+    CheckCIContext,
+    CIContext,
+    CIDetectionRule,
+    CIDetectionTable,
+    CIDetector,
+    CISystem,
+    GitHubActionsDetector,
+    JenkinsDetector,
+    detect_ci_context,
+    load_detection_rules,
+)
 from tests.utils import assert_element_of_type
 
+#: Rules of CI detection plugins, an entry point refers to a list of rules or to a single rule
+PLUGIN_RULES = [CIDetectionRule(ci_system="my_ci", detect={"MY_CI": "1"}, branch="MY_BRANCH"), CIDetectionRule(ci_system="other_ci", detect={"OTHER_CI": "1"})]
+PLUGIN_RULE = CIDetectionRule(ci_system="single_ci", detect={"SINGLE_CI": "1"})
+
 
 @pytest.fixture
 def execution_context(tmp_path: Path) -> ExecutionContext:
@@ -22,14 +41,16 @@ def check_ci_context(execution_context: ExecutionContext) -> CheckCIContext:
 
 def test_jenkins_pull_request(check_ci_context: CheckCIContext) -> None:
     """Test Jenkins CI environment with a pull request."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        mock_get_env.side_effect = lambda var, default=None: {
+    with patch.dict(
+        os.environ,
+        {
             "JENKINS_HOME": "/jenkins/home",
             "CHANGE_ID": "123",
             "CHANGE_TARGET": "main",
             "CHANGE_BRANCH": "feature-branch",
-        }.get(var, default)
-
+        },
+        clear=True,
+    ):
         check_ci_context.update_execution_context()
 
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
@@ -41,9 +62,7 @@ def test_jenkins_pull_request(check_ci_context: CheckCIContext) -> None:
 
 def test_non_jenkins_environment(check_ci_context: CheckCIContext) -> None:
     """Test non-Jenkins CI environment."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        mock_get_env.side_effect = lambda var, default=None: {}.get(var, default)
-
+    with patch.dict(os.environ, {}, clear=True):
         check_ci_context.update_execution_context()
 
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
@@ -56,11 +75,13 @@ def test_non_jenkins_environment(check_ci_context: CheckCIContext) -> None:
 
 def test_missing_branch_names(check_ci_context: CheckCIContext) -> None:
     """Test CI environment with missing branch names."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        mock_get_env.side_effect = lambda var, default=None: {
+    with patch.dict(
+        os.environ,
+        {
             "JENKINS_HOME": "/jenkins/home",
-        }.get(var, default)
-
+        },
+        clear=True,
+    ):
         check_ci_context.update_execution_context()
 
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
@@ -73,14 +94,16 @@ def test_missing_branch_names(check_ci_context: CheckCIContext) -> None:
 
 def test_github_actions_pull_request(check_ci_context: CheckCIContext) -> None:
     """Test GitHub Actions CI environment with a pull request."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        mock_get_env.side_effect = lambda var, default=None: {
+    with patch.dict(
+        os.environ,
+        {
             "GITHUB_ACTIONS": "true",
             "GITHUB_EVENT_NAME": "pull_request",
             "GITHUB_BASE_REF": "main",
             "GITHUB_HEAD_REF": "feature-branch",
-        }.get(var, default)
-
+        },
+        clear=True,
+    ):
         check_ci_context.update_execution_context()
 
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
@@ -92,13 +115,15 @@ def test_github_actions_pull_request(check_ci_context: CheckCIContext) -> None:
 
 def test_github_actions_push(check_ci_context: CheckCIContext) -> None:
     """Test GitHub Actions CI environment with a push (not a pull request)."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        mock_get_env.side_effect = lambda var, default=None: {
+    with patch.dict(
+        os.environ,
+        {
             "GITHUB_ACTIONS": "true",
             "GITHUB_EVENT_NAME": "push",  # Different event name
             "GITHUB_REF_NAME": "main",
-        }.get(var, default)
-
+        },
+        clear=True,
+    ):
         check_ci_context.update_execution_context()
 
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
@@ -110,15 +135,137 @@ def test_github_actions_push(check_ci_context: CheckCIContext) -> None:
 
 def test_github_actions_missing_branch_names(check_ci_context: CheckCIContext) -> None:
     """Test GitHub Actions with missing, but required environment variables."""
-    with patch.object(CIDetector, "get_env_variable") as mock_get_env:
-        # GITHUB_REF_NAME is missing
-        mock_get_env.side_effect = lambda var, default=None: {
+    # GITHUB_REF_NAME is missing
+    with patch.dict(
+        os.environ,
+        {
             "GITHUB_ACTIONS": "true",
             "GITHUB_EVENT_NAME": "push",
-        }.get(var, default)
-
+        },
+        clear=True,
+    ):
         check_ci_context.update_execution_context()
         ci_context = assert_element_of_type(check_ci_context.execution_context.data_registry.find_data(CIContext), CIContext)
         assert ci_context.ci_system == CISystem.GITHUB_ACTIONS
         assert ci_context.target_branch is None
         assert ci_context.current_branch is None
+
+
+@pytest.mark.parametrize(
+    ("environ", "expected"),
+    [
+        (
+            {"GITLAB_CI": "true", "CI_COMMIT_BRANCH": "develop"},
+            CIContext(CISystem.GITLAB_CI, is_pull_request=False, target_branch="develop", current_branch="develop"),
+        ),
+        (
+            {"GITLAB_CI": "true", "CI_MERGE_REQUEST_IID": "7", "CI_MERGE_REQUEST_TARGET_BRANCH_NAME": "develop", "CI_MERGE_REQUEST_SOURCE_BRANCH_NAME": "feature/x"},
+            CIContext(CISystem.GITLAB_CI, is_pull_request=True, target_branch="develop", current_branch="feature/x"),
+        ),
+        (
+            {"TF_BUILD": "True", "BUILD_REASON": "IndividualCI", "BUILD_SOURCEBRANCH": "refs/heads/release/1.x", "BUILD_SOURCEBRANCHNAME": "1.x"},
+            CIContext(CISystem.AZURE_PIPELINES, is_pull_request=False, target_branch="release/1.x", current_branch="release/1.x"),
+        ),
+        (
+            {"TF_BUILD": "True", "BUILD_REASON": "PullRequest", "SYSTEM_PULLREQUEST_TARGETBRANCH": "refs/heads/main", "SYSTEM_PULLREQUEST_SOURCEBRANCH": "refs/heads/feature/x"},
+            CIContext(CISystem.AZURE_PIPELINES, is_pull_request=True, target_branch="main", current_branch="feature/x"),
+        ),
+        (
+            {"BITBUCKET_BUILD_NUMBER": "12", "BITBUCKET_BRANCH": "main"},
+            CIContext(CISystem.BITBUCKET_PIPELINES, is_pull_request=False, target_branch="main", current_branch="main"),
+        ),
+        (
+            {"BITBUCKET_BUILD_NUMBER": "12", "BITBUCKET_PR_ID": "3", "BITBUCKET_BRANCH": "feature/x", "BITBUCKET_PR_DESTINATION_BRANCH": "main"},
+            CIContext(CISystem.BITBUCKET_PIPELINES, is_pull_request=True, target_branch="main", current_branch="feature/x"),
+        ),
+        (
+            {"TEAMCITY_VERSION": "2024.1", "BRANCH_NAME": "main"},
+            CIContext(CISystem.TEAMCITY, is_pull_request=False, target_branch="main", current_branch="main"),
+        ),
+    ],
+)
+def test_builtin_rules(environ: dict[str, str], expected: CIContext) -> None:
+    assert detect_ci_context(environ, CIDetectionTable(BUILTIN_DETECTION_RULES)) == expected
+
+
+def test_rules_are_loaded_from_entry_points() -> None:
+    plugins = [
+        EntryPoint("my_ci", f"{__name__}:PLUGIN_RULES", CI_DETECTORS_ENTRY_POINT_GROUP),
+        EntryPoint("broken", "not_existing_module:RULES", CI_DETECTORS_ENTRY_POINT_GROUP),
+        EntryPoint("a_single_rule", f"{__name__}:PLUGIN_RULE", CI_DETECTORS_ENTRY_POINT_GROUP),
+    ]
+    load_detection_rules.cache_clear()
+    try:
+        with patch("importlib.metadata.entry_points", return_value=plugins) as entry_points, patch.object(EntryPoint, "load", autospec=True, side_effect=EntryPoint.load) as load:
+            table = load_detection_rules()
+            assert load_detection_rules() is table
+            entry_points.assert_called_once_with(group=CI_DETECTORS_ENTRY_POINT_GROUP)
+            assert load.call_count == 3
+        assert table.rules == (*BUILTIN_DETECTION_RULES, PLUGIN_RULE, *PLUGIN_RULES)
+        assert detect_ci_context({"GITLAB_CI": "true", "CI_COMMIT_BRANCH": "main"}).ci_system == CISystem.GITLAB_CI
+        # Systems which are not well known are identified by their name
+        ci_context = detect_ci_context({"MY_CI": "1", "MY_BRANCH": "main"})
+        assert ci_context.ci_system == "my_ci"
+        assert ci_context.is_ci
+    finally:
+        load_detection_rules.cache_clear()
+
+
+def test_deprecated_detectors() -> None:
+    with patch.dict(os.environ, {"GITHUB_ACTIONS": "true", "GITHUB_EVENT_NAME": "push", "GITHUB_REF_NAME": "main"}, clear=True):
+        with pytest.deprecated_call():
+            github_detector = GitHubActionsDetector()
+        with pytest.deprecated_call():
+            jenkins_detector = JenkinsDetector()
+        assert github_detector.detect() == CIContext(CISystem.GITHUB_ACTIONS, is_pull_request=False, target_branch="main", current_branch="main")
+        assert jenkins_detector.detect() is None
+        assert github_detector.get_env_variable("GITHUB_REF_NAME") == "main"
+
+
+def test_deprecated_detectors_of_ci_systems() -> None:
+    assert CISystem.JENKINS.detector_class is JenkinsDetector
+    assert CISystem.GITHUB_ACTIONS.detector_class is GitHubActionsDetector
+    assert CISystem.UNKNOWN.detector_class is None
+    assert CISystem.UNKNOWN.get_detector() is None
+    # Systems which never had a detector class do not get one
+    assert CISystem.GITLAB_CI.detector_class is None
+    assert CISystem.GITLAB_CI.get_detector() is None
+    with pytest.deprecated_call():
+        assert isinstance(CISystem.GITHUB_ACTIONS.get_detector(), GitHubActionsDetector)
+
+
+def test_detector_subclasses_are_not_used() -> None:
+    with pytest.warns(DeprecationWarning, match="MyDetector is not used by CheckCIContext"):
+
+        class MyDetector(CIDetector):
+            def detect(self) -> CIContext | None:
+                return CIContext(CISystem.JENKINS, is_pull_request=False, target_branch="main", current_branch="main")
+
+    with patch.dict(os.environ, {}, clear=True):
+        assert not detect_ci_context(dict(os.environ)).is_ci
+
+
+@pytest.mark.parametrize(
+    ("environ", "expected"),
+    [
+        ({"JENKINS_HOME": "/var/jenkins", "BRANCH_NAME": "refs/heads/main"}, "refs/heads/main"),
+        ({"GITHUB_ACTIONS": "true", "GITHUB_EVENT_NAME": "push", "GITHUB_REF_NAME": "refs/heads/main"}, "refs/heads/main"),
+        ({"TF_BUILD": "True", "BUILD_SOURCEBRANCH": "refs/heads/main"}, "main"),
+    ],
+)
+def test_branch_prefix_is_only_removed_if_configured(environ: dict[str, str], expected: str) -> None:
+    assert detect_ci_context(environ, CIDetectionTable(BUILTIN_DETECTION_RULES)).current_branch == expected
+
+
+def test_first_matching_rule_wins() -> None:
+    table = CIDetectionTable(
+        [
+            CIDetectionRule(ci_system="first", detect={"CI": "true", "FIRST": None}),
+            CIDetectionRule(ci_system="second", detect={"SECOND": None}),
+            CIDetectionRule(ci_system="generic", detect={"CI": "true"}),
+        ]
+    )
+    assert detect_ci_context({"CI": "true", "SECOND": "1", "FIRST": "1"}, table).ci_system == "first"
+    assert detect_ci_context({"CI": "true", "SECOND": "1"}, table).ci_system == "second"
+    assert detect_ci_context({"CI": "true"}, table).ci_system == "generic"
+    assert detect_ci_context({"CI": "false"}, table).ci_system == CISystem.UNKNOWN
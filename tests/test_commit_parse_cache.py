@@ -0,0 +1,82 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from semantic_release.commit_parser import ConventionalCommitParser, ConventionalCommitParserOptions, ParseError, ParseResult
+from semantic_release.commit_parser.token import ParsedCommit
+from semantic_release.enums import LevelBump
+
+from pypeline_semantic_release.cache import CACHE_DIR_NAME
+from pypeline_semantic_release.commit_parse_cache import CachingCommitParser
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig
+from tests.conftest import PyPackageRepo
+
+
+def _commit(py_package_tmp: PyPackageRepo, message: str) -> None:
+    py_package_tmp.repo.index.commit(message)
+
+
+def _single_result(result: ParseResult | list[ParseResult]) -> ParseResult:
+    results = result if isinstance(result, list) else [result]
+    assert len(results) == 1
+    return results[0]
+
+
+def test_results_are_cached_per_commit(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _commit(py_package_tmp, "feat(api)!: breaking feature\n\nBREAKING CHANGE: removed the old api")
+    _commit(py_package_tmp, "not a conventional commit")
+    commits = list(repo.iter_commits())
+    parser = ConventionalCommitParser()
+
+    caching_parser = CachingCommitParser.load(repo, parser)
+    expected = [caching_parser.parse(commit) for commit in commits]
+    caching_parser.save()
+    assert list((Path(repo.git_dir) / CACHE_DIR_NAME).glob("commit_parse_cache_*.json"))
+
+    # Load the cache again, the wrapped parser shall not be called anymore
+    caching_parser = CachingCommitParser.load(repo, parser)
+    with patch.object(parser, "parse") as parse:
+        results = [_single_result(caching_parser.parse(commit)) for commit in commits]
+    parse.assert_not_called()
+    expected = [_single_result(result) for result in expected]
+
+    assert isinstance(results[0], ParseError)
+    assert isinstance(expected[0], ParseError)
+    breaking, breaking_expected = results[1], expected[1]
+    assert isinstance(breaking, ParsedCommit) and isinstance(breaking_expected, ParsedCommit)
+    assert (breaking.bump, breaking.type, breaking.scope, breaking.commit) == (LevelBump.MAJOR, breaking_expected.type, "api", commits[1])
+    assert breaking.breaking_descriptions
+    chore = results[2]
+    assert isinstance(chore, ParsedCommit)
+    assert chore.bump == LevelBump.NO_RELEASE
+    assert not chore.breaking_descriptions
+
+
+def test_cache_is_keyed_by_parser_options(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    commit = repo.head.commit
+    caching_parser = CachingCommitParser.load(repo, ConventionalCommitParser())
+    caching_parser.parse(commit)
+    caching_parser.save()
+
+    other_parser = ConventionalCommitParser(ConventionalCommitParserOptions(minor_tags=("feat", "chore")))
+    assert CachingCommitParser.get_parser_key(other_parser) != caching_parser.data.parser_key
+    caching_parser = CachingCommitParser.load(repo, other_parser)
+    assert caching_parser.data.commits == {}
+    result = _single_result(caching_parser.parse(commit))
+    assert isinstance(result, ParsedCommit)
+    assert result.bump == LevelBump.MINOR
+
+
+def test_next_version_parses_only_new_commits(py_package_tmp: PyPackageRepo) -> None:
+    py_package_tmp.new_feature()
+    iut_step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context(), config=CreateReleaseCommitConfig(push=False).to_dict())
+    with patch.object(ConventionalCommitParser, "parse", autospec=True, side_effect=ConventionalCommitParser.parse) as parse:
+        iut_step.run()
+        assert parse.call_count == 2
+        py_package_tmp.new_feature()
+        parse.reset_mock()
+        iut_step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context(), config=CreateReleaseCommitConfig(push=False).to_dict())
+        iut_step.run()
+    # Only the new feature commit is parsed for the next version
+    assert [call.args[1].message for call in parse.call_args_list] == ["feat: some new feature"]
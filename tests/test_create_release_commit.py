@@ -1,6 +1,12 @@
+from pathlib import Path
+from unittest.mock import Mock, patch
+
 import pytest
-from semantic_release.cli.config import BranchConfig
+from semantic_release.cli.cli_context import CliContextObj
+from semantic_release.cli.config import BranchConfig, GlobalCommandLineOptions
+from semantic_release.version.version import Version
 
+from pypeline_semantic_release.base import change_directory
 from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig, ReleaseCommit
 from tests.conftest import PyPackageRepo
 from tests.utils import assert_element_of_type
@@ -157,3 +163,46 @@ def test_prerelease_not_created_automatically(repo_with_feature_branch: PyPackag
     iut_step.update_execution_context()
     # Expect no release commit
     assert iut_step.execution_context.data_registry.find_data(ReleaseCommit)
+
+
+def test_create_release_commit_in_process(py_package_tmp: PyPackageRepo) -> None:
+    config = CreateReleaseCommitConfig(push=False, in_process=True).to_dict()
+    iut_step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context(), config=config)
+    with patch.object(iut_step, "execute_process") as mock_execute_process:
+        iut_step.run()
+    iut_step.update_execution_context()
+    # The semantic-release command shall not be spawned
+    mock_execute_process.assert_not_called()
+    release_commit = assert_element_of_type(iut_step.execution_context.data_registry.find_data(ReleaseCommit), ReleaseCommit)
+    assert release_commit.version.as_tag() == "v0.0.0"
+    assert "v0.0.0" in [tag.name for tag in py_package_tmp.repo.tags]
+    # Create a new feature commit and release again
+    py_package_tmp.new_feature()
+    iut_step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context(), config=config)
+    iut_step.run()
+    iut_step.update_execution_context()
+    release_commit = assert_element_of_type(iut_step.execution_context.data_registry.find_data(ReleaseCommit), ReleaseCommit)
+    assert release_commit.version.as_tag() == "v0.1.0"
+    assert release_commit.previous_version and release_commit.previous_version.as_tag() == "v0.0.0"
+    repo = py_package_tmp.repo
+    assert repo.tags["v0.1.0"].commit == repo.head.commit
+    message = repo.head.commit.message
+    assert isinstance(message, str) and message.startswith("0.1.0")
+    assert not repo.is_dirty()
+
+
+def test_deprecated_release_methods(py_package_tmp: PyPackageRepo) -> None:
+    py_package_tmp.new_tag("v0.1.0")
+    py_package_tmp.new_feature()
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    iut_step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context())
+
+    with pytest.deprecated_call():
+        assert iut_step.last_released_version(repo_dir, "v{version}") == Version.parse("0.1.0")
+    with pytest.deprecated_call():
+        versions = iut_step.collect_all_tags_and_versions(repo_dir, "v{version}")
+    assert versions == [Version.parse("0.1.0")]
+    with pytest.deprecated_call():
+        assert not CreateReleaseCommit.does_version_exist(Version.parse("0.2.0"), versions)
+    with change_directory(repo_dir), pytest.deprecated_call():
+        assert iut_step.next_version(CliContextObj(Mock(), Mock(), GlobalCommandLineOptions())) == Version.parse("0.2.0")
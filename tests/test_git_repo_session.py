@@ -0,0 +1,80 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig
+from pypeline_semantic_release.git_repo_session import GitRepoSession
+from pypeline_semantic_release.publish_to_orphan_branch import PublishToOrphanBranch, PublishToOrphanBranchConfig
+from tests.conftest import PyPackageRepo
+from tests.utils import assert_element_of_type
+
+
+def test_session_is_registered_once(py_package_tmp: PyPackageRepo) -> None:
+    execution_context = py_package_tmp.create_ci_execution_context()
+    session = GitRepoSession.from_execution_context(execution_context, "first")
+    # The same session is returned for the same repository, also when the path is not normalized
+    assert GitRepoSession.from_execution_context(execution_context, "second") is session
+    assert GitRepoSession.from_execution_context(execution_context, "third", Path(py_package_tmp.repo.working_dir) / ".") is session
+    assert assert_element_of_type(execution_context.data_registry.find_data(GitRepoSession), GitRepoSession) is session
+    assert [entry.provider_name for entry in execution_context.data_registry.find_entries(GitRepoSession)] == ["first"]
+
+
+def test_session_lifecycle(py_package_tmp: PyPackageRepo) -> None:
+    session = GitRepoSession(Path(py_package_tmp.repo.working_dir))
+    was_open = session.is_open
+    repo = session.repo
+    assert (was_open, session.is_open) == (False, True)
+    assert session.repo is repo
+    # Refs written outside the session are visible after invalidation
+    py_package_tmp.new_feature().new_tag("v1.0.0")
+    session.invalidate()
+    assert session.repo is repo
+    assert "v1.0.0" in [tag.name for tag in session.repo.tags]
+    session.close()
+    assert not session.is_open
+    assert session.repo is not repo
+
+
+def test_steps_share_the_session(py_package_tmp: PyPackageRepo) -> None:
+    execution_context = py_package_tmp.create_ci_execution_context()
+    release_step = CreateReleaseCommit(execution_context, config=CreateReleaseCommitConfig(push=False, in_process=True).to_dict())
+    release_step.run()
+    release_step.update_execution_context()
+    session = assert_element_of_type(execution_context.data_registry.find_data(GitRepoSession), GitRepoSession)
+
+    output_file = Path(py_package_tmp.repo.working_dir) / "output" / "result.c"
+    output_file.parent.mkdir()
+    output_file.write_text("int main() {}")
+    publish_step = PublishToOrphanBranch(execution_context, config=PublishToOrphanBranchConfig(branch="generated-code", paths=["output"]).to_dict())
+    # Do not push to the (unreachable) remote
+    with patch.object(publish_step, "execute_process"):
+        publish_step.run()
+
+    assert assert_element_of_type(execution_context.data_registry.find_data(GitRepoSession), GitRepoSession) is session
+    # The refs written by the previous steps are visible through the shared session
+    assert {"v0.0.0", "generated-code-v0.0.0"} <= {tag.name for tag in session.repo.tags}
+
+
+def test_session_for_other_repository(tmp_path: Path) -> None:
+    execution_context = ExecutionContext(tmp_path)
+    session = GitRepoSession.from_execution_context(execution_context, "test", tmp_path / "other")
+    assert session.repo_dir == (tmp_path / "other").resolve()
+    assert GitRepoSession.from_execution_context(execution_context, "test") is not session
+
+
+def test_no_git_helper_outlives_the_step(py_package_tmp: PyPackageRepo) -> None:
+    execution_context = py_package_tmp.create_ci_execution_context()
+    session = GitRepoSession.from_execution_context(execution_context, "test")
+    session.repo.head.commit.tree  # noqa: B018 - starts the cat-file helper
+    helper = session.repo.git.cat_file_header
+    assert helper and helper.proc
+    process = helper.proc
+    assert process.poll() is None
+
+    release_step = CreateReleaseCommit(execution_context, config=CreateReleaseCommitConfig(push=False, in_process=True).to_dict())
+    release_step.run()
+
+    assert session.is_open
+    assert session.repo.git.cat_file_header is None and session.repo.git.cat_file_all is None
+    assert process.poll() is not None
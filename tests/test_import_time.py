@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+#: Modules already loaded by pypeline before any step module is imported
+FRAMEWORK_MODULES = ["pypeline.domain.pipeline", "pypeline.domain.execution_context"]
+
+#: Maximum import time in milliseconds of each step module, on top of the framework modules
+IMPORT_TIME_BUDGETS = {
+    "pypeline_semantic_release.check_ci_context": 50,
+    "pypeline_semantic_release.create_release_commit": 100,
+    "pypeline_semantic_release.publish_group": 100,
+    "pypeline_semantic_release.publish_package": 100,
+    "pypeline_semantic_release.publish_to_orphan_branch": 100,
+    "pypeline_semantic_release.release_plan": 100,
+}
+
+#: Packages which shall only be imported when a step runs
+HEAVY_PACKAGES = {"git", "semantic_release"}
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """Import the module in a new interpreter and return the cumulative import time in microseconds of every imported module."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(FRAMEWORK_MODULES)}; import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        # The package is also importable without installation, e.g. from a checkout with pytest's pythonpath
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+@pytest.mark.parametrize("module", list(IMPORT_TIME_BUDGETS))
+def test_import_time_budget(module: str) -> None:
+    # Best of three, the first run might have to compile the byte code
+    runs = [_import_times(module) for _ in range(3)]
+    import_time_ms = min(times[module] for times in runs) / 1000
+    assert import_time_ms <= IMPORT_TIME_BUDGETS[module], f"Importing {module} took {import_time_ms:.1f}ms"
+    heavy_modules = sorted(name for name in runs[0] if name.split(".")[0] in HEAVY_PACKAGES)
+    assert not heavy_modules, f"{module} imports {', '.join(heavy_modules[:5])}"
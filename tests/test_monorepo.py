@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+from git import Repo
+from py_app_dev.core.exceptions import UserNotificationException
+
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig, PackageConfig, ReleaseCommit
+from pypeline_semantic_release.git_repo_session import GitRepoSession
+from pypeline_semantic_release.monorepo import MonorepoAnalyzer, touches_path
+from tests.conftest import PyPackageRepo
+
+PACKAGES = [
+    PackageConfig(name="a", tag_format="a-v{version}", paths=["packages/a"]),
+    PackageConfig(name="b", tag_format="b-v{version}", paths=["packages/b", "shared/"]),
+    PackageConfig(name="c", tag_format="c-v{version}", paths=["packages/c"]),
+]
+
+
+def _commit(repo: Repo, message: str, *files: str) -> str:
+    for file in files:
+        path = Path(repo.working_dir) / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"{message}\n")
+    repo.index.add(list(files))
+    return repo.index.commit(message).hexsha
+
+
+def _release_packages(py_package_tmp: PyPackageRepo) -> dict[str | None, str]:
+    step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context(), config=CreateReleaseCommitConfig(push=False, packages=PACKAGES).to_dict())
+    step.run()
+    step.update_execution_context()
+    return {release_commit.package: release_commit.version.as_tag() for release_commit in step.execution_context.data_registry.find_data(ReleaseCommit)}
+
+
+def test_touches_path() -> None:
+    assert touches_path("packages/a/file.py", "packages/a")
+    assert touches_path("packages/a", "packages/a/")
+    assert touches_path("README.md", ".")
+    assert not touches_path("packages/ab/file.py", "packages/a")
+
+
+def test_release_packages(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _commit(repo, "feat: first feature of a", "packages/a/a.py")
+    _commit(repo, "feat: first feature of b", "packages/b/b.py")
+    _commit(repo, "feat: first feature of c", "packages/c/c.py")
+    assert _release_packages(py_package_tmp) == {"a": "a-v0.1.0", "b": "b-v0.1.0", "c": "c-v0.1.0"}
+    assert {tag.name for tag in repo.tags} == {"a-v0.1.0", "b-v0.1.0", "c-v0.1.0"}
+
+    _commit(repo, "feat: new feature of a", "packages/a/a.py")
+    _commit(repo, "fix: fix shared by b", "shared/common.py")
+    _commit(repo, "feat: not part of any package", "README.md")
+    # Only the packages with new commits are released, on the current commit
+    assert _release_packages(py_package_tmp) == {"a": "a-v0.2.0", "b": "b-v0.1.1"}
+    assert repo.tags["a-v0.2.0"].commit == repo.tags["b-v0.1.1"].commit == repo.head.commit
+    assert _release_packages(py_package_tmp) == {}
+
+
+def test_commits_are_routed_once_per_package(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _commit(repo, "feat: feature of a", "packages/a/a.py")
+    repo.create_tag("a-v1.0.0")
+    both = _commit(repo, "fix: fix of a and b", "packages/a/a.py", "packages/b/b.py")
+    # A feature branch merged into the released history
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test")
+        config.set_value("user", "email", "test@example.com")
+    repo.git.checkout("-b", "feature")
+    feature = _commit(repo, "feat: feature of b", "packages/b/b.py")
+    repo.git.checkout("develop")
+    only_a = _commit(repo, "docs: docs of a", "packages/a/a.md")
+    repo.git.merge("--no-ff", "-m", "Merge branch feature", "feature")
+
+    analyzer = MonorepoAnalyzer(GitRepoSession(Path(repo.working_dir)), PACKAGES)
+    base_commits = {"a": repo.tags["a-v1.0.0"].commit.hexsha, "b": None, "c": None}
+    routed = {name: [commit.hexsha for commit in commits] for name, commits in analyzer.route_commits(base_commits).items()}
+
+    assert set(routed["a"]) == {both, only_a}
+    assert set(routed["b"]) == {both, feature}
+    assert routed["c"] == []
+    # Same commits as listing them for every package separately
+    for name, paths in [("a", ["packages/a"]), ("b", ["packages/b", "shared"])]:
+        since = f"{base_commits[name]}..HEAD" if base_commits[name] else "HEAD"
+        assert set(routed[name]) == set(repo.git.log("--format=%H", "--full-history", "--no-merges", since, "--", *paths).split())
+
+
+def test_plan_only_is_not_supported(py_package_tmp: PyPackageRepo) -> None:
+    _commit(py_package_tmp.repo, "feat: first feature of a", "packages/a/a.py")
+    step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context({"plan_only": True}), config=CreateReleaseCommitConfig(push=False, packages=PACKAGES).to_dict())
+    with pytest.raises(UserNotificationException, match="plan-only"):
+        step.run()
+    assert not py_package_tmp.repo.tags
@@ -0,0 +1,101 @@
+import base64
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+
+from pypeline_semantic_release.package_upload import Distribution, MultipartBody, PackageUploader, find_distributions, normalize_version
+from tests.index_server import LocalIndexServer, create_sdist, create_wheel
+
+
+def test_upload_distributions(tmp_path: Path) -> None:
+    paths = [
+        create_sdist(tmp_path, "my_package", "1.2.0"),
+        *[create_wheel(tmp_path, "my_package", "1.2.0", python_tag) for python_tag in ["py3", "cp310", "cp311", "cp312"]],
+    ]
+    with LocalIndexServer() as index, PackageUploader(index.url, "__token__", "secret", max_workers=2) as uploader:
+        uploader.upload(find_distributions(tmp_path))
+
+    assert sorted(upload.filename for upload in index.uploads) == sorted(path.name for path in paths)
+    # The sdist creates the release
+    assert index.uploads[0].filename == "my_package-1.2.0.tar.gz"
+    # At most one connection per parallel upload
+    assert index.connections <= 2
+    for upload in index.uploads:
+        assert upload.content == (tmp_path / upload.filename).read_bytes()
+        assert upload.authorization == "Basic " + base64.b64encode(b"__token__:secret").decode()
+        assert upload.fields[":action"] == ["file_upload"]
+        assert upload.fields["name"] == ["my_package"]
+        assert upload.fields["version"] == ["1.2.0"]
+        assert upload.fields["classifiers"] == ["Programming Language :: Python :: 3", "Topic :: Software Development"]
+        assert upload.fields["description"] == ["Long description.\n"]
+    assert {upload.fields["pyversion"][0] for upload in index.uploads} == {"source", "py3", "cp310", "cp311", "cp312"}
+
+
+def test_upload_error(tmp_path: Path) -> None:
+    distributions = [Distribution.from_file(create_wheel(tmp_path, "my_package", "1.2.0"))]
+    with LocalIndexServer() as index, PackageUploader(index.url, "user", "password") as uploader:
+        uploader.upload(distributions)
+        with pytest.raises(UserNotificationException, match="Status: 400 File already exists"):
+            uploader.upload(distributions)
+
+
+def test_upload_accepts_any_success_status(tmp_path: Path) -> None:
+    distributions = [Distribution.from_file(create_wheel(tmp_path, "my_package", "1.2.0"))]
+    with LocalIndexServer(success_status=201) as index, PackageUploader(index.url, "user", "password") as uploader:
+        uploader.upload(distributions)
+
+    assert [upload.filename for upload in index.uploads] == ["my_package-1.2.0-py3-none-any.whl"]
+
+
+def test_multipart_body_is_streamed(tmp_path: Path) -> None:
+    file = tmp_path / "data.bin"
+    file.write_bytes(b"a" * 2_500_000)
+    body = MultipartBody([("name", "value")], "content", file)
+    chunks = list(body)
+    assert len(chunks) == 5
+    assert max(len(chunk) for chunk in chunks) == 1024 * 1024
+    assert len(body) == sum(len(chunk) for chunk in chunks)
+    # Iterating again, e.g. for a retry, reads the file again
+    assert b"".join(body) == b"".join(chunks)
+
+
+def test_find_distributions_of_version(tmp_path: Path) -> None:
+    create_wheel(tmp_path, "my_package", "1.0.0")
+    create_wheel(tmp_path, "my_package", "1.1.0rc1")
+    create_sdist(tmp_path, "my_package", "1.1.0rc1")
+    assert [distribution.path.name for distribution in find_distributions(tmp_path, "1.1.0-rc.1")] == ["my_package-1.1.0rc1.tar.gz", "my_package-1.1.0rc1-py3-none-any.whl"]
+    assert normalize_version("1.0.0-alpha.2") == normalize_version("1.0.0a2")
+    assert normalize_version("1.10.0") != normalize_version("11.0.0")
+
+
+def test_find_distributions_does_not_read_other_versions(tmp_path: Path) -> None:
+    (tmp_path / "my_package-0.9.0-py3-none-any.whl").write_bytes(b"corrupt")
+    (tmp_path / "my-package-0.9.0.tar.gz").write_bytes(b"corrupt")
+    create_wheel(tmp_path, "my_package", "1.0.0")
+    create_sdist(tmp_path, "my_package", "1.0.0")
+    with patch.object(Distribution, "from_file", autospec=True, side_effect=Distribution.from_file) as from_file:
+        assert [distribution.path.name for distribution in find_distributions(tmp_path, "1.0.0")] == ["my_package-1.0.0.tar.gz", "my_package-1.0.0-py3-none-any.whl"]
+    assert sorted(call.args[0].name for call in from_file.call_args_list) == ["my_package-1.0.0-py3-none-any.whl", "my_package-1.0.0.tar.gz"]
+
+
+def test_upload_runs_in_parallel(tmp_path: Path) -> None:
+    for python_tag in ["cp310", "cp311", "cp312"]:
+        create_wheel(tmp_path, "my_package", "1.0.0", python_tag)
+    with LocalIndexServer(latency=0.2) as index, PackageUploader(index.url, "user", "password", max_workers=2) as uploader:
+        threads = []
+        upload_file = uploader.upload_file
+
+        def record_thread(distribution: Distribution) -> None:
+            threads.append(threading.current_thread().name)
+            upload_file(distribution)
+
+        with patch.object(uploader, "upload_file", side_effect=record_thread):
+            uploader.upload(find_distributions(tmp_path))
+
+    assert len(index.uploads) == 3
+    # The first one alone, the others on the pool
+    assert threads[0] == threading.current_thread().name
+    assert all(name.startswith("upload") for name in threads[1:])
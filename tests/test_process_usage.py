@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.base import BaseStep
+from pypeline_semantic_release.process_usage import REPORT_FILE, ChildProcessMeter, ProcessResourceUsage, redact_command
+
+
+def test_redact_command() -> None:
+    command = ["poetry", "publish", "--username", "user", "--password", "secret", Path("dist")]
+    assert redact_command(command) == ["poetry", "publish", "--username", "user", "--password", "***", "dist"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="getrusage is not available on Windows")
+def test_meter_measures_child_process() -> None:
+    meter = ChildProcessMeter()
+    # Allocate and touch 200 MB and burn some CPU
+    subprocess.run([sys.executable, "-c", "data = bytearray(200 * 1024 * 1024); sum(range(3_000_000))"], check=True)
+    usage = meter.stop("MyStep", [sys.executable, "-c", "..."], 0)
+
+    assert usage.step == "MyStep"
+    assert usage.wall_time > 0
+    assert usage.user_time is not None and usage.user_time > 0
+    assert usage.system_time is not None
+    assert usage.max_rss is not None and usage.max_rss > 200 * 1024 * 1024
+
+
+def test_execute_process_records_usage(tmp_path: Path) -> None:
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    step = BaseStep(execution_context)
+    step.execute_process([sys.executable, "-c", "print('hello')"], "Failed.")
+    with pytest.raises(UserNotificationException, match="Failed"):
+        step.execute_process([sys.executable, "-c", "raise SystemExit(3)"], "Failed.")
+
+    records = execution_context.data_registry.find_data(ProcessResourceUsage)
+    assert [(record.step, record.returncode) for record in records] == [("BaseStep", 0), ("BaseStep", 3)]
+    report = json.loads((tmp_path / REPORT_FILE).read_text())
+    assert [process["returncode"] for process in report["processes"]] == [0, 3]
+    assert report["processes"][0]["command"] == [sys.executable, "-c", "print('hello')"]
+    assert report["processes"][0]["wall_time"] > 0
@@ -0,0 +1,139 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.base import BaseStep
+from pypeline_semantic_release.git_repo_session import GitRepoSession
+from pypeline_semantic_release.process_usage import REPORT_FILE, ProcessResourceUsage
+from pypeline_semantic_release.publish_group import LOG_DIR, PublishGroup, PublishGroupConfig, PublishStepConfig, load_step_class
+from pypeline_semantic_release.publish_package import PublishPackage
+from tests.conftest import PyPackageRepo
+
+#: All steps wait for each other, this only finishes if they run concurrently
+barrier = threading.Barrier(3, timeout=10)
+
+
+class WaitingPublisher(BaseStep):
+    def run(self) -> None:  # type: ignore[override]
+        self.logger.info(f"{self.get_name()} uploads {self.config}")
+        barrier.wait()
+
+    def get_name(self) -> str:
+        return f"Waiting{self.config['id']}" if self.config else super().get_name()
+
+    def update_execution_context(self) -> None:
+        self.execution_context.data_registry.insert(self.get_name(), self.get_name())
+
+
+class FailingPublisher(WaitingPublisher):
+    def run(self) -> None:  # type: ignore[override]
+        super().run()
+        raise UserNotificationException(f"{self.get_name()} upload rejected.")
+
+
+class SessionPublisher(BaseStep):
+    def run(self) -> None:  # type: ignore[override]
+        session = self.get_repo_session()
+        self.logger.info(f"Publishing from {session.repo.head.commit.hexsha}")
+        sessions.append(session)
+
+
+class ProcessPublisher(BaseStep):
+    def run(self) -> None:  # type: ignore[override]
+        self.execute_process([sys.executable, "-c", "pass"], "Failed.")
+        # The usage is only registered when all steps are done
+        assert not self.execution_context.data_registry.find_data(ProcessResourceUsage)
+        self.execute_process([sys.executable, "-c", "raise SystemExit(1)"], "Failed.")
+
+
+#: Repository sessions used by the SessionPublisher steps
+sessions: list[GitRepoSession] = []
+
+
+def _step(name: str, step_id: int) -> PublishStepConfig:
+    return PublishStepConfig(step=f"{__name__}:{name}", config={"id": step_id})
+
+
+def test_steps_run_concurrently_with_logs_per_step(tmp_path: Path) -> None:
+    barrier.reset()
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    config = PublishGroupConfig(steps=[_step("WaitingPublisher", 1), _step("WaitingPublisher", 2), _step("WaitingPublisher", 3)], max_workers=3)
+    step = PublishGroup(execution_context, config=config.to_dict())
+
+    step.run()
+    step.update_execution_context()
+
+    assert [result.step for result in step.results] == ["Waiting1", "Waiting2", "Waiting3"]
+    assert all(result.succeeded for result in step.results)
+    assert execution_context.data_registry.find_data(str) == ["Waiting1", "Waiting2", "Waiting3"]
+    for result in step.results:
+        # Only the messages of the step itself
+        assert len(result.log) == 1 and f"{result.step} uploads" in result.log[0]
+        assert (tmp_path / LOG_DIR / f"{result.step}.log").read_text().splitlines() == result.log
+
+
+def test_failures_are_reported_in_configured_order(tmp_path: Path) -> None:
+    barrier.reset()
+    config = PublishGroupConfig(steps=[_step("FailingPublisher", 1), _step("WaitingPublisher", 2), _step("FailingPublisher", 3)])
+    step = PublishGroup(ExecutionContext(project_root_dir=tmp_path), config=config.to_dict())
+
+    with pytest.raises(UserNotificationException, match=r"Waiting1: Waiting1 upload rejected.; Waiting3: Waiting3 upload rejected.$"):
+        step.run()
+
+    # The step in between was not cancelled
+    assert [result.succeeded for result in step.results] == [False, True, False]
+
+
+def test_load_step_class() -> None:
+    assert load_step_class("PublishPackage") is PublishPackage
+    assert load_step_class(f"{__name__}:WaitingPublisher") is WaitingPublisher
+    with pytest.raises(UserNotificationException, match="Unknown publish step"):
+        load_step_class("PublishToTheMoon")
+    with pytest.raises(UserNotificationException, match="Could not load"):
+        load_step_class(f"{__name__}:Missing")
+    with pytest.raises(UserNotificationException, match="not a pipeline step"):
+        load_step_class(f"{__name__}:barrier")
+
+
+def test_orphan_branch_step_only_once(tmp_path: Path) -> None:
+    config = PublishGroupConfig(steps=[PublishStepConfig(step="PublishToOrphanBranch"), PublishStepConfig(step="PublishToOrphanBranch")])
+    with pytest.raises(UserNotificationException, match="only be used once"):
+        PublishGroup(ExecutionContext(project_root_dir=tmp_path), config=config.to_dict())
+
+
+def test_steps_use_own_sessions_and_log_files(py_package_tmp: PyPackageRepo) -> None:
+    sessions.clear()
+    execution_context = py_package_tmp.create_ci_execution_context()
+    shared_session = GitRepoSession.from_execution_context(execution_context, "test")
+    config = PublishGroupConfig(steps=[PublishStepConfig(step=f"{__name__}:SessionPublisher"), PublishStepConfig(step=f"{__name__}:SessionPublisher")])
+    step = PublishGroup(execution_context, config=config.to_dict())
+
+    step.run()
+
+    assert len({id(session) for session in sessions}) == 2
+    assert shared_session not in sessions
+    assert not any(session.is_open for session in sessions)
+    # Same step twice, one log file each
+    assert [result.step for result in step.results] == ["SessionPublisher-1", "SessionPublisher-2"]
+    for result in step.results:
+        assert (Path(py_package_tmp.repo.working_dir) / LOG_DIR / f"{result.step}.log").read_text().splitlines() == result.log
+
+
+def test_process_usages_are_registered_after_the_steps(tmp_path: Path) -> None:
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    config = PublishGroupConfig(steps=[PublishStepConfig(step=f"{__name__}:ProcessPublisher"), PublishStepConfig(step=f"{__name__}:ProcessPublisher")])
+    step = PublishGroup(execution_context, config=config.to_dict())
+
+    with pytest.raises(UserNotificationException, match="Failed"):
+        step.run()
+
+    records = execution_context.data_registry.find_data(ProcessResourceUsage)
+    assert [(record.step, record.returncode) for record in records] == [("ProcessPublisher", 0), ("ProcessPublisher", 1)] * 2
+    # The processes of the steps ran at the same time, the CPU times cannot be attributed to one of them
+    assert all(record.user_time is None and record.system_time is None and record.max_rss is None for record in records)
+    assert len(json.loads((tmp_path / REPORT_FILE).read_text())["processes"]) == 4
@@ -2,12 +2,14 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
+from py_app_dev.core.exceptions import UserNotificationException
 from pypeline.domain.execution_context import ExecutionContext
 from semantic_release.version.version import Version
 
 from pypeline_semantic_release.check_ci_context import CIContext, CISystem
 from pypeline_semantic_release.create_release_commit import ReleaseCommit
-from pypeline_semantic_release.publish_package import PublishPackage, PublishPackageConfig
+from pypeline_semantic_release.publish_package import PublishBackend, PublishPackage, PublishPackageConfig, UploadMethod
+from tests.index_server import LocalIndexServer, create_sdist, create_wheel
 
 
 @pytest.fixture
@@ -117,3 +119,96 @@ def test_publish_package_not_on_ci(mock_execution_context: Mock) -> None:
 
     # Verify that create_process_executor was not called
     mock_execution_context.create_process_executor.assert_not_called()
+
+
+def test_publish_package_native_upload(tmp_path: Path, mock_execution_context: Mock) -> None:
+    mock_execution_context.project_root_dir = tmp_path
+    # Previous release still in dist
+    create_wheel(tmp_path / "dist", "my_package", "0.0.9")
+
+    def poetry_build(command: list[str]) -> Mock:
+        create_sdist(tmp_path / "dist", "my_package", "0.1.0")
+        create_wheel(tmp_path / "dist", "my_package", "0.1.0")
+        return Mock(execute=Mock(return_value=Mock(returncode=0)))
+
+    mock_execution_context.create_process_executor.side_effect = poetry_build
+    with LocalIndexServer() as index:
+        config = PublishPackageConfig(upload_method=UploadMethod.NATIVE, pypi_repository_url=index.url)
+        with patch.dict("os.environ", {"PYPI_USER": "user", "PYPI_PASSWD": "password"}):
+            PublishPackage(mock_execution_context, config=config.to_dict()).run()
+
+    # The credentials are not passed on the command line
+    mock_execution_context.create_process_executor.assert_called_once_with([*PublishPackage.get_poetry_command(), "build"])
+    assert sorted(upload.filename for upload in index.uploads) == ["my_package-0.1.0-py3-none-any.whl", "my_package-0.1.0.tar.gz"]
+
+
+def test_publish_package_with_uv(tmp_path: Path, mock_execution_context: Mock) -> None:
+    mock_execution_context.project_root_dir = tmp_path
+    create_wheel(tmp_path / "dist", "my_package", "0.0.9")
+
+    executors: list[Mock] = []
+
+    def uv_build(command: list[str]) -> Mock:
+        if command[1:] == ["build"]:
+            create_wheel(tmp_path / "dist", "my_package", "0.1.0")
+        executors.append(Mock(execute=Mock(return_value=Mock(returncode=0)), env={"PATH": "/usr/bin"}))
+        return executors[-1]
+
+    mock_execution_context.create_process_executor.side_effect = uv_build
+    config = PublishPackageConfig(backend=PublishBackend.UV, pypi_repository_url="https://test.pypi.org/legacy/")
+    with patch.object(PublishPackage, "execute_process", autospec=True, side_effect=PublishPackage.execute_process) as execute_process:
+        with patch.dict("os.environ", {"PYPI_USER": "user", "PYPI_PASSWD": "password"}):
+            PublishPackage(mock_execution_context, config=config.to_dict()).run()
+
+    assert [call.args[0] for call in mock_execution_context.create_process_executor.call_args_list] == [
+        ["uv", "build"],
+        # Only the files of the released version, the credentials are not on the command line
+        ["uv", "publish", "--publish-url", "https://test.pypi.org/legacy/", tmp_path / "dist" / "my_package-0.1.0-py3-none-any.whl"],
+    ]
+    assert execute_process.call_args.args[3] == {"UV_PUBLISH_USERNAME": "user", "UV_PUBLISH_PASSWORD": "password"}
+    # The credentials are added to the environment of the pipeline
+    assert executors[1].env == {"PATH": "/usr/bin", "UV_PUBLISH_USERNAME": "user", "UV_PUBLISH_PASSWORD": "password"}
+
+
+def test_publish_package_with_poetry_to_url(mock_execution_context: Mock) -> None:
+    config = PublishPackageConfig(pypi_repository_url="https://test.pypi.org/legacy/")
+    with patch.dict("os.environ", {"PYPI_USER": "user", "PYPI_PASSWD": "password"}):
+        with pytest.raises(UserNotificationException, match="needs a repository name"):
+            PublishPackage(mock_execution_context, config=config.to_dict()).run()
+
+    mock_execution_context.create_process_executor.assert_not_called()
+
+
+def test_publish_package_with_pypa_build(tmp_path: Path, mock_execution_context: Mock) -> None:
+    mock_execution_context.project_root_dir = tmp_path
+
+    def build(command: list[str]) -> Mock:
+        create_wheel(tmp_path / "dist", "my_package", "0.1.0")
+        return Mock(execute=Mock(return_value=Mock(returncode=0)))
+
+    mock_execution_context.create_process_executor.side_effect = build
+    with LocalIndexServer() as index:
+        # The build backend cannot publish, the distributions are uploaded natively
+        config = PublishPackageConfig(backend=PublishBackend.BUILD, pypi_repository_url=index.url)
+        with patch.dict("os.environ", {"PYPI_USER": "user", "PYPI_PASSWD": "password"}):
+            PublishPackage(mock_execution_context, config=config.to_dict()).run()
+
+    mock_execution_context.create_process_executor.assert_called_once_with(PublishPackage.get_build_command())
+    assert [upload.filename for upload in index.uploads] == ["my_package-0.1.0-py3-none-any.whl"]
+
+
+def test_publish_package_of_a_monorepo(mock_execution_context: Mock) -> None:
+    mock_execution_context.data_registry.find_data.side_effect = lambda data_type: {
+        ReleaseCommit: [ReleaseCommit(version=Version.parse("0.1.0"), package="a"), ReleaseCommit(version=Version.parse("0.2.0"), package="b")],
+        CIContext: [CIContext(ci_system=CISystem.JENKINS, is_pull_request=False, target_branch="main", current_branch="main")],
+    }.get(data_type, [])
+
+    # Several packages were released, the project itself was not
+    with pytest.raises(UserNotificationException, match="packages a, b were released"):
+        PublishPackage(mock_execution_context).run()
+    # Package not released
+    PublishPackage(mock_execution_context, config=PublishPackageConfig(package="c").to_dict()).run()
+    mock_execution_context.create_process_executor.assert_not_called()
+
+    PublishPackage(mock_execution_context, config=PublishPackageConfig(package="b").to_dict()).run()
+    mock_execution_context.create_process_executor.assert_called_once_with([*PublishPackage.get_poetry_command(), "publish", "--build"])
@@ -1,14 +1,26 @@
+import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
-from git import Repo
+from git import Blob, Repo, Tree
+from py_app_dev.core.exceptions import UserNotificationException
 from pypeline.domain.execution_context import ExecutionContext
 from semantic_release.version.version import Version
 
+from pypeline_semantic_release.cache import CACHE_DIR_NAME
 from pypeline_semantic_release.check_ci_context import CIContext, CISystem
 from pypeline_semantic_release.create_release_commit import ReleaseCommit
-from pypeline_semantic_release.publish_to_orphan_branch import PublishToOrphanBranch, PublishToOrphanBranchConfig
+from pypeline_semantic_release.fast_import import FastImportCommitWriter
+from pypeline_semantic_release.publish_to_orphan_branch import (
+    FetchStrategy,
+    OrphanBranchBackend,
+    OrphanBranchTarget,
+    PublishToOrphanBranch,
+    PublishToOrphanBranchConfig,
+    UnchangedTreeAction,
+)
+from pypeline_semantic_release.tracing import Tracer
 from tests.conftest import PyPackageRepo
 
 
@@ -39,6 +51,11 @@ def _create_step(
     return PublishToOrphanBranch(execution_context, config=cfg.to_dict())
 
 
+def _blobs(tree: Tree) -> list[Blob]:
+    """Files of the tree and its subtrees."""
+    return [item for item in tree.traverse() if isinstance(item, Blob)]
+
+
 def _write_file(repo: PyPackageRepo, rel_path: str, content: str = "generated") -> None:
     path = Path(repo.repo.working_dir) / rel_path
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -63,7 +80,7 @@ def test_happy_path_single_file(py_package_tmp: PyPackageRepo) -> None:
     orphan_commit = repo.heads["generated-code"].commit
     assert len(orphan_commit.parents) == 0
     # Verify only the configured file is on the orphan branch
-    blob_paths = [blob.path for blob in orphan_commit.tree.traverse() if blob.type == "blob"]
+    blob_paths = [blob.path for blob in _blobs(orphan_commit.tree)]
     assert "output/result.c" in blob_paths
 
 
@@ -82,7 +99,7 @@ def test_happy_path_folder(py_package_tmp: PyPackageRepo) -> None:
     assert "artifacts-v2.0.0-rc.1" in [t.name for t in repo.tags]
     orphan_commit = repo.heads["artifacts"].commit
     assert len(orphan_commit.parents) == 0
-    blob_paths = [blob.path for blob in orphan_commit.tree.traverse() if blob.type == "blob"]
+    blob_paths = [blob.path for blob in _blobs(orphan_commit.tree)]
     assert "gen/src/module.c" in blob_paths
     assert "gen/src/module.h" in blob_paths
 
@@ -99,7 +116,7 @@ def test_multiple_paths(py_package_tmp: PyPackageRepo) -> None:
 
     repo = py_package_tmp.repo
     orphan_tree = repo.heads["release"].commit.tree
-    blob_paths = [blob.path for blob in orphan_tree.traverse() if blob.type == "blob"]
+    blob_paths = [blob.path for blob in _blobs(orphan_tree)]
     assert "gen/output.c" in blob_paths
     assert "docs/README.md" in blob_paths
 
@@ -156,6 +173,22 @@ def test_no_release_commit(py_package_tmp: PyPackageRepo) -> None:
     assert "generated-code" not in [b.name for b in py_package_tmp.repo.branches]
 
 
+def test_release_of_a_package(py_package_tmp: PyPackageRepo) -> None:
+    _write_file(py_package_tmp, "output/file.c", "code")
+    execution_context = ExecutionContext(project_root_dir=Path(py_package_tmp.repo.working_dir))
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse("1.0.0", tag_format="a-v{version}"), package="a"), "test")
+    execution_context.data_registry.insert(ReleaseCommit(version=Version.parse("2.0.0", tag_format="b-v{version}"), package="b"), "test")
+    execution_context.data_registry.insert(CIContext(ci_system=CISystem.JENKINS, is_pull_request=False, target_branch="main", current_branch="main"), "test")
+
+    with pytest.raises(UserNotificationException, match="packages a, b were released"):
+        _create_step(execution_context, PublishToOrphanBranchConfig(branch="generated-code", paths=["output/file.c"])).run()
+    step = _create_step(execution_context, PublishToOrphanBranchConfig(branch="generated-code", paths=["output/file.c"], package="b"))
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    assert [tag.name for tag in py_package_tmp.repo.tags] == ["generated-code-b-v2.0.0"]
+
+
 def test_non_prerelease_version(py_package_tmp: PyPackageRepo) -> None:
     _write_file(py_package_tmp, "output/file.c", "code")
     ctx = _create_execution_context(py_package_tmp, "3.0.0")
@@ -251,7 +284,7 @@ def test_remote_branch_exists_uses_remote_tip_as_parent(py_package_tmp: PyPackag
     new_commit = repo.heads["generated-code"].commit
     assert len(new_commit.parents) == 1
     assert new_commit.parents[0].hexsha == remote_tip_sha
-    blob_paths = [blob.path for blob in new_commit.tree.traverse() if blob.type == "blob"]
+    blob_paths = [blob.path for blob in _blobs(new_commit.tree)]
     assert "output/result.c" in blob_paths
 
 
@@ -316,6 +349,458 @@ def test_push_command_invoked_with_expected_refs(py_package_tmp: PyPackageRepo)
 
     mock_exec.assert_called_once()
     command = mock_exec.call_args.args[0]
-    assert command[:3] == ["git", "push", "origin"]
+    assert command[:4] == ["git", "push", "--atomic", "origin"]
     assert "generated-code" in command
     assert "generated-code-v1.0.0-dev.1" in command
+
+
+@pytest.mark.parametrize("git_setup", ["default", "autocrlf", "gitattributes"])
+def test_backends_create_the_same_tree(py_package_tmp: PyPackageRepo, git_setup: str) -> None:
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    (repo_dir / "gen").mkdir()
+    # Files with Windows line endings, converted by git add depending on the configuration and the attributes
+    (repo_dir / "gen/windows.txt").write_bytes(b"line 1\r\nline 2\r\n")
+    (repo_dir / "gen/upper.up").write_text("lower case\n")
+    expected_contents = {"gen/windows.txt": b"line 1\r\nline 2\r\n", "gen/upper.up": b"lower case\n"}
+    with py_package_tmp.repo.config_writer() as config_writer:
+        if git_setup == "autocrlf":
+            config_writer.set_value("core", "autocrlf", "true")
+            expected_contents["gen/windows.txt"] = b"line 1\nline 2\n"
+        elif git_setup == "gitattributes":
+            # Clean filters (e.g. LFS) are applied when the blobs are written
+            config_writer.set_value('filter "upper"', "clean", "tr a-z A-Z")
+            (repo_dir / ".gitattributes").write_text("*.txt text eol=crlf\n*.up filter=upper\n")
+            expected_contents = {"gen/windows.txt": b"line 1\nline 2\n", "gen/upper.up": b"LOWER CASE\n"}
+    _write_file(py_package_tmp, "gen/src/module.c", "void foo() {}")
+    _write_file(py_package_tmp, "gen/src/nested/module.h", "#pragma once")
+    _write_file(py_package_tmp, "gen/run.sh", "echo run")
+    _write_file(py_package_tmp, "docs/my file.md", "# Docs")
+    (Path(py_package_tmp.repo.working_dir) / "gen/run.sh").chmod(0o755)
+    # Generated files which are ignored in the working branch are published as well
+    (Path(py_package_tmp.repo.working_dir) / ".gitignore").write_text("*.o\n")
+    (Path(py_package_tmp.repo.working_dir) / "gen/module.o").write_text("binary")
+    repo = py_package_tmp.repo
+
+    trees = {}
+    for backend in OrphanBranchBackend:
+        branch = f"release-{backend.value}"
+        config = PublishToOrphanBranchConfig(branch=branch, paths=["gen", "docs/my file.md"], backend=backend)
+        step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+        with patch.object(step, "execute_process"):
+            step.run()
+        orphan_commit = repo.heads[branch].commit
+        assert repo.tags[f"{branch}-v1.0.0"].commit == orphan_commit
+        assert orphan_commit.message == f"release: {branch}-v1.0.0"
+        trees[backend] = orphan_commit.tree.hexsha
+
+    assert len(set(trees.values())) == 1
+    blobs = {blob.path: blob for blob in _blobs(repo.heads["release-fast-import"].commit.tree)}
+    assert {path: blob.mode for path, blob in blobs.items()} == {
+        "docs/my file.md": 0o100644,
+        "gen/module.o": 0o100644,
+        "gen/run.sh": 0o100755,
+        "gen/src/module.c": 0o100644,
+        "gen/src/nested/module.h": 0o100644,
+        "gen/upper.up": 0o100644,
+        "gen/windows.txt": 0o100644,
+    }
+    assert {path: blobs[path].data_stream.read() for path in expected_contents} == expected_contents
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="File modes are not supported on Windows")
+def test_backends_ignore_executable_bit_without_file_mode(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "gen/run.sh", "echo run")
+    (Path(repo.working_dir) / "gen/run.sh").chmod(0o755)
+    with repo.config_writer() as config_writer:
+        config_writer.set_value("core", "filemode", "false")
+
+    for backend in OrphanBranchBackend:
+        branch = f"release-{backend.value}"
+        step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), PublishToOrphanBranchConfig(branch=branch, paths=["gen"], backend=backend))
+        with patch.object(step, "execute_process"):
+            step.run()
+        assert [blob.mode for blob in _blobs(repo.heads[branch].commit.tree)] == [0o100644], backend
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Symbolic links and file modes are not supported on Windows")
+def test_backends_store_links_and_modes_like_git_add(py_package_tmp: PyPackageRepo) -> None:
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    _write_file(py_package_tmp, "gen/src/module.c", "void foo() {}")
+    _write_file(py_package_tmp, "gen/run.sh", "echo run")
+    _write_file(py_package_tmp, "gen/tool.sh", "echo tool")
+    (repo_dir / "gen/run.sh").chmod(0o744)
+    # Only the executable bit of the owner makes git store an executable file
+    (repo_dir / "gen/tool.sh").chmod(0o654)
+    # Symbolic links are stored as links, also if they point to a directory
+    (repo_dir / "gen/linked").symlink_to("src", target_is_directory=True)
+    (repo_dir / "gen/run").symlink_to("run.sh")
+    (repo_dir / "gen-link").symlink_to("gen", target_is_directory=True)
+    repo = py_package_tmp.repo
+
+    trees = {}
+    for backend in OrphanBranchBackend:
+        config = PublishToOrphanBranchConfig(branch=f"release-{backend.value}", paths=["gen", "gen-link"], backend=backend)
+        step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+        with patch.object(step, "execute_process"):
+            step.run()
+        trees[backend] = repo.heads[f"release-{backend.value}"].commit.tree
+
+    assert len({tree.hexsha for tree in trees.values()}) == 1
+    assert {blob.path: blob.mode for blob in _blobs(trees[OrphanBranchBackend.FAST_IMPORT])} == {
+        "gen-link": 0o120000,
+        "gen/linked": 0o120000,
+        "gen/run": 0o120000,
+        "gen/run.sh": 0o100755,
+        "gen/src/module.c": 0o100644,
+        "gen/tool.sh": 0o100644,
+    }
+
+
+def test_index_backend_adds_ignored_directories(py_package_tmp: PyPackageRepo) -> None:
+    repo_dir = Path(py_package_tmp.repo.working_dir)
+    # The whole output directory is ignored and never committed on the working branch
+    (repo_dir / ".gitignore").write_text("build/\n")
+    for number in range(50):
+        (repo_dir / "build" / "gen" / f"module_{number:02}.c").parent.mkdir(parents=True, exist_ok=True)
+        (repo_dir / "build" / "gen" / f"module_{number:02}.c").write_text(f"int value = {number};")
+    repo = py_package_tmp.repo
+    git_add = repo.git.add
+
+    with patch.object(type(repo.git), "add", create=True, wraps=git_add) as add:
+        tree_sha = PublishToOrphanBranch._build_tree(repo, repo_dir, ["build/gen"])
+
+    # git walks the directory itself, the files are not listed on the command line
+    assert add.call_args.args == ("--force", "--", "build/gen")
+    assert repo.git.ls_tree("-r", "--name-only", tree_sha).splitlines() == [f"build/gen/module_{number:02}.c" for number in range(50)]
+    assert not (repo_dir / ".git" / "tmp_index").exists()
+
+
+def test_fast_import_does_not_keep_parent_content(py_package_tmp: PyPackageRepo) -> None:
+    _write_file(py_package_tmp, "output/old.c", "old")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/old.c"], backend=OrphanBranchBackend.FAST_IMPORT)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    _write_file(py_package_tmp, "output/new.c", "new")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/new.c"], backend=OrphanBranchBackend.FAST_IMPORT)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.1.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    orphan_commit = py_package_tmp.repo.heads["generated-code"].commit
+    assert [blob.path for blob in _blobs(orphan_commit.tree)] == ["output/new.c"]
+    assert orphan_commit.parents[0] == py_package_tmp.repo.tags["generated-code-v1.0.0"].commit
+
+
+def test_fast_import_does_not_overwrite_existing_tag(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    tagged_commit = repo.head.commit
+    repo.create_tag("generated-code-v1.0.0")
+
+    with pytest.raises(UserNotificationException, match="already exists"):
+        FastImportCommitWriter(repo).create_commit("generated-code", ["output"], "release: generated-code-v1.0.0", [], "generated-code-v1.0.0")
+
+    assert repo.tags["generated-code-v1.0.0"].commit == tagged_commit
+    assert "generated-code" not in repo.heads
+
+
+def test_fast_import_does_not_update_refs_for_unchanged_tree(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    writer = FastImportCommitWriter(repo)
+    tip = writer.create_commit("generated-code", ["output"], "release: generated-code-v1.0.0", [], "generated-code-v1.0.0")
+    assert tip and repo.tags["generated-code-v1.0.0"].commit.hexsha == tip
+
+    with patch("git.cmd.Git.update_ref", create=True, side_effect=repo.git.update_ref) as update_ref:
+        commit_sha = writer.create_commit("generated-code", ["output"], "release: generated-code-v1.1.0", [tip], "generated-code-v1.1.0", repo.commit(tip).tree.hexsha)
+
+    assert commit_sha is None
+    # Only the scratch ref of git fast-import is deleted, the branch and the tag are never written
+    assert [call.args for call in update_ref.call_args_list] == [("-d", "refs/pypeline/fast-import/generated-code")]
+    assert repo.heads["generated-code"].commit.hexsha == tip
+    assert "generated-code-v1.1.0" not in [tag.name for tag in repo.tags]
+
+
+def test_persistent_index_is_updated_incrementally(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "gen/a.c", "a")
+    _write_file(py_package_tmp, "gen/b.c", "b")
+    _write_file(py_package_tmp, "docs/index.md", "# Docs")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["gen", "docs"], backend=OrphanBranchBackend.PERSISTENT_INDEX)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+    index_files = list((Path(repo.git_dir) / CACHE_DIR_NAME).glob("orphan_index_*"))
+    assert len(index_files) == 1
+
+    # Modify, delete and add files and stop publishing the docs
+    (Path(repo.working_dir) / "gen/a.c").write_text("a changed")
+    (Path(repo.working_dir) / "gen/b.c").unlink()
+    (Path(repo.working_dir) / "gen/c.c").write_text("c")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["gen"], backend=OrphanBranchBackend.PERSISTENT_INDEX)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.1.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    orphan_tree = repo.heads["generated-code"].commit.tree
+    assert {blob.path: blob.data_stream.read() for blob in _blobs(orphan_tree)} == {"gen/a.c": b"a changed", "gen/c.c": b"c"}
+    # The staging index is kept and matches the published tree
+    assert repo.git.write_tree(env={"GIT_INDEX_FILE": str(index_files[0])}) == orphan_tree.hexsha
+
+
+def test_persistent_index_is_seeded_from_branch_tip(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "gen/a.c", "a")
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), PublishToOrphanBranchConfig(branch="generated-code", paths=["gen"]))
+    with patch.object(step, "execute_process"):
+        step.run()
+    tip = repo.heads["generated-code"].commit
+
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["gen"], create_tag=False, backend=OrphanBranchBackend.PERSISTENT_INDEX)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.1"), config)
+    # The step opens its own repository, so the git command is patched for all instances
+    with patch.object(step, "execute_process"), patch("git.cmd.Git.read_tree", create=True, side_effect=repo.git.read_tree) as read_tree:
+        step.run()
+    assert read_tree.call_args.args == (tip.hexsha,)
+    assert repo.heads["generated-code"].commit.tree == tip.tree
+
+
+@pytest.mark.parametrize("backend", list(OrphanBranchBackend))
+def test_unchanged_tree_skips_commit_and_push(py_package_tmp: PyPackageRepo, backend: OrphanBranchBackend) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "gen/a.c", "a")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["gen"], backend=backend, on_unchanged=UnchangedTreeAction.SKIP)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+    tip = repo.heads["generated-code"].commit
+
+    step = _create_step(_create_execution_context(py_package_tmp, "1.1.0"), config)
+    mock_exec = MagicMock()
+    with patch.object(step, "execute_process", mock_exec):
+        step.run()
+
+    mock_exec.assert_not_called()
+    assert repo.heads["generated-code"].commit == tip
+    assert "generated-code-v1.1.0" not in [t.name for t in repo.tags]
+
+
+@pytest.mark.parametrize("backend", list(OrphanBranchBackend))
+def test_unchanged_tree_only_pushes_tag(py_package_tmp: PyPackageRepo, backend: OrphanBranchBackend) -> None:
+    repo = py_package_tmp.repo
+    _write_file(py_package_tmp, "gen/a.c", "a")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["gen"], backend=backend, on_unchanged=UnchangedTreeAction.TAG)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+    tip = repo.heads["generated-code"].commit
+
+    step = _create_step(_create_execution_context(py_package_tmp, "1.1.0"), config)
+    mock_exec = MagicMock()
+    with patch.object(step, "execute_process", mock_exec):
+        step.run()
+
+    assert mock_exec.call_args.args[0] == ["git", "push", "origin", "generated-code-v1.1.0"]
+    assert repo.heads["generated-code"].commit == tip
+    assert repo.tags["generated-code-v1.1.0"].commit == tip
+
+    # Changed content is committed as usual
+    _write_file(py_package_tmp, "gen/a.c", "a changed")
+    step = _create_step(_create_execution_context(py_package_tmp, "1.2.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+    assert repo.heads["generated-code"].commit.parents == (tip,)
+    assert repo.tags["generated-code-v1.2.0"].commit == repo.heads["generated-code"].commit
+
+
+@pytest.mark.parametrize("fetch_strategy", [FetchStrategy.SHALLOW, FetchStrategy.SHALLOW_BLOBLESS])
+def test_shallow_fetch_of_remote_tip(py_package_tmp: PyPackageRepo, tmp_path: Path, fetch_strategy: FetchStrategy) -> None:
+    bare_path, first_tip_sha = _seed_orphan_branch_on_origin(tmp_path, "generated-code")
+    Repo(bare_path).git.config("uploadpack.allowFilter", "true")
+    seeder = Repo(tmp_path / "seeder")
+    (tmp_path / "seeder" / "seed.txt").write_text("second seed")
+    seeder.index.add(["seed.txt"])
+    remote_tip_sha = seeder.index.commit("second commit on orphan branch").hexsha
+    seeder.git.push("origin", "generated-code")
+    repo = py_package_tmp.repo
+    repo.delete_remote("origin")
+    repo.create_remote("origin", str(bare_path))
+
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/result.c"], fetch=fetch_strategy)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    new_commit = repo.heads["generated-code"].commit
+    assert [parent.hexsha for parent in new_commit.parents] == [remote_tip_sha]
+    # Only the tip was fetched, not its history
+    assert (Path(repo.git_dir) / "shallow").read_text().split() == [remote_tip_sha]
+    local_objects = repo.git.cat_file("--batch-check=%(objectname)", "--batch-all-objects").split()
+    assert first_tip_sha not in local_objects
+    seed_blob_sha = Repo(bare_path).commit(remote_tip_sha).tree["seed.txt"].hexsha
+    assert (seed_blob_sha in local_objects) == (fetch_strategy == FetchStrategy.SHALLOW)
+    # The new commit can be pushed fast-forward
+    repo.git.push("origin", "generated-code", "generated-code-v1.0.0")
+    assert Repo(bare_path).heads["generated-code"].commit.hexsha == new_commit.hexsha
+
+
+def _use_origin(repo: PyPackageRepo, bare_path: Path) -> None:
+    repo.repo.delete_remote("origin")
+    repo.repo.create_remote("origin", str(bare_path))
+
+
+def test_preflight_skips_when_tag_exists_on_remote(py_package_tmp: PyPackageRepo, tmp_path: Path) -> None:
+    bare_path, remote_tip_sha = _seed_orphan_branch_on_origin(tmp_path, "generated-code")
+    Repo(bare_path).create_tag("generated-code-v1.0.0", ref=remote_tip_sha)
+    _use_origin(py_package_tmp, bare_path)
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/result.c"], remote_preflight=True)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+
+    mock_exec = MagicMock()
+    with patch.object(step, "execute_process", mock_exec), patch.object(PublishToOrphanBranch, "_fetch_remote_branch_tips") as fetch:
+        step.run()
+
+    fetch.assert_not_called()
+    mock_exec.assert_not_called()
+    assert "generated-code" not in [b.name for b in py_package_tmp.repo.branches]
+
+
+def test_preflight_reuses_locally_available_remote_tip(py_package_tmp: PyPackageRepo, tmp_path: Path) -> None:
+    bare_path, _ = _seed_orphan_branch_on_origin(tmp_path, "generated-code")
+    _use_origin(py_package_tmp, bare_path)
+    _write_file(py_package_tmp, "output/result.c", "v1")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/result.c"], remote_preflight=True)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"):
+        step.run()
+    repo = py_package_tmp.repo
+    repo.git.push("origin", "generated-code")
+    pushed_tip = repo.heads["generated-code"].commit
+
+    # The remote tip is the commit created by the previous run, no need to fetch it
+    _write_file(py_package_tmp, "output/result.c", "v2")
+    step = _create_step(_create_execution_context(py_package_tmp, "1.1.0"), config)
+    with patch.object(step, "execute_process"), patch.object(PublishToOrphanBranch, "_fetch_remote_branch_tips") as fetch:
+        step.run()
+
+    fetch.assert_not_called()
+    assert repo.heads["generated-code"].commit.parents == (pushed_tip,)
+    assert repo.remotes.origin.refs["generated-code"].commit == pushed_tip
+
+
+def test_publish_phases_are_traced(py_package_tmp: PyPackageRepo) -> None:
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    execution_context = _create_execution_context(py_package_tmp, "1.0.0")
+    step = _create_step(execution_context, PublishToOrphanBranchConfig(branch="generated-code", paths=["output/result.c"]))
+    with patch.object(step, "execute_process"):
+        step.run()
+
+    spans = Tracer.from_execution_context(execution_context, "test").spans
+    assert [span.name for span in spans] == ["preflight", "fetch", "build", "push", "run"]
+    assert spans[2].attributes == {"branch": "generated-code", "backend": "index"}
+
+
+def test_preflight_without_remote_branch_does_not_fetch(py_package_tmp: PyPackageRepo, tmp_path: Path) -> None:
+    bare_path, _ = _seed_orphan_branch_on_origin(tmp_path, "other-branch")
+    _use_origin(py_package_tmp, bare_path)
+    _write_file(py_package_tmp, "output/result.c", "int main() {}")
+    config = PublishToOrphanBranchConfig(branch="generated-code", paths=["output/result.c"], remote_preflight=True)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"), patch.object(PublishToOrphanBranch, "_fetch_remote_branch_tips") as fetch:
+        step.run()
+
+    fetch.assert_not_called()
+    assert len(py_package_tmp.repo.heads["generated-code"].commit.parents) == 0
+
+
+@pytest.mark.parametrize("backend", list(OrphanBranchBackend))
+def test_multiple_targets(py_package_tmp: PyPackageRepo, tmp_path: Path, backend: OrphanBranchBackend) -> None:
+    bare_path, remote_tip_sha = _seed_orphan_branch_on_origin(tmp_path, "docs")
+    _use_origin(py_package_tmp, bare_path)
+    _write_file(py_package_tmp, "build/html/index.html", "<html/>")
+    _write_file(py_package_tmp, "gen/api.c", "code")
+    _write_file(py_package_tmp, "schema/api.json", "{}")
+    config = PublishToOrphanBranchConfig(
+        branch="docs",
+        paths=["build/html"],
+        create_tag=False,
+        targets=[OrphanBranchTarget(branch="gen-code", paths=["gen"]), OrphanBranchTarget(branch="schemas", paths=["schema"])],
+        backend=backend,
+        remote_preflight=True,
+    )
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+
+    mock_exec = MagicMock()
+    fetch_tips = PublishToOrphanBranch._fetch_remote_branch_tips
+    with patch.object(step, "execute_process", mock_exec), patch.object(PublishToOrphanBranch, "_fetch_remote_branch_tips", side_effect=fetch_tips) as fetch:
+        step.run()
+
+    # Only the branch existing on the remote is fetched
+    fetch.assert_called_once()
+    assert fetch.call_args.args[1] == ["docs"]
+    repo = py_package_tmp.repo
+    assert [parent.hexsha for parent in repo.heads["docs"].commit.parents] == [remote_tip_sha]
+    for branch, path in [("docs", "build/html/index.html"), ("gen-code", "gen/api.c"), ("schemas", "schema/api.json")]:
+        assert [blob.path for blob in _blobs(repo.heads[branch].commit.tree)] == [path]
+    assert sorted(tag.name for tag in repo.tags) == ["gen-code-v1.0.0", "schemas-v1.0.0"]
+
+    # All branches and tags are pushed at once
+    command = mock_exec.call_args.args[0]
+    assert command == ["git", "push", "--atomic", "origin", "docs", "gen-code", "gen-code-v1.0.0", "schemas", "schemas-v1.0.0"]
+    repo.git.execute(command)
+    assert {head.name for head in Repo(bare_path).heads} == {"docs", "gen-code", "schemas"}
+
+
+def test_duplicate_branches_are_rejected(py_package_tmp: PyPackageRepo) -> None:
+    config = PublishToOrphanBranchConfig(
+        branch="docs", paths=["build/html"], targets=[OrphanBranchTarget(branch="gen-code", paths=["gen"]), OrphanBranchTarget(branch="docs", paths=["doc"])]
+    )
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+
+    with patch.object(step, "execute_process") as mock_exec, pytest.raises(UserNotificationException, match="Orphan branch 'docs' is configured more than once"):
+        step.run()
+
+    mock_exec.assert_not_called()
+    assert "docs" not in [head.name for head in py_package_tmp.repo.heads]
+
+
+def test_multiple_targets_without_preflight_fetch_once(py_package_tmp: PyPackageRepo, tmp_path: Path) -> None:
+    bare_path, _ = _seed_orphan_branch_on_origin(tmp_path, "docs")
+    seeder = Repo(tmp_path / "seeder")
+    seeder.git.push("origin", "docs:gen-code")
+    _use_origin(py_package_tmp, bare_path)
+    _write_file(py_package_tmp, "gen/api.c", "code")
+    config = PublishToOrphanBranchConfig(
+        targets=[OrphanBranchTarget(branch="docs", paths=["gen"]), OrphanBranchTarget(branch="gen-code", paths=["gen"])],
+        remote_preflight=False,
+    )
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    with patch.object(step, "execute_process"), patch.object(PublishToOrphanBranch, "_fetch_remote_branch_tip") as fetch_one:
+        step.run()
+
+    fetch_one.assert_not_called()
+    repo = py_package_tmp.repo
+    assert repo.heads["docs"].commit.parents == repo.heads["gen-code"].commit.parents == (repo.remotes.origin.refs["docs"].commit,)
+
+
+def test_multiple_targets_failure_pushes_nothing(py_package_tmp: PyPackageRepo) -> None:
+    _write_file(py_package_tmp, "gen/api.c", "code")
+    config = PublishToOrphanBranchConfig(targets=[OrphanBranchTarget(branch="ok", paths=["gen"]), OrphanBranchTarget(branch="broken", paths=["gen"])], remote_preflight=False)
+    step = _create_step(_create_execution_context(py_package_tmp, "1.0.0"), config)
+    original_create_commit = PublishToOrphanBranch._create_commit
+
+    def create_commit(self: PublishToOrphanBranch, repo: Repo, config: PublishToOrphanBranchConfig, publication, remote_tip):  # type: ignore[no-untyped-def]
+        if publication.target.branch == "broken":
+            raise UserNotificationException("broken")
+        return original_create_commit(self, repo, config, publication, remote_tip)
+
+    mock_exec = MagicMock()
+    with patch.object(step, "execute_process", mock_exec), patch.object(PublishToOrphanBranch, "_create_commit", create_commit):
+        with pytest.raises(UserNotificationException, match="broken"):
+            step.run()
+    mock_exec.assert_not_called()
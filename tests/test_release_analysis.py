@@ -0,0 +1,106 @@
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from git import Repo
+from semantic_release.cli.cli_context import CliContextObj
+from semantic_release.cli.config import GlobalCommandLineOptions, RuntimeContext
+from semantic_release.version.algorithm import next_version
+
+from pypeline_semantic_release.base import change_directory
+from pypeline_semantic_release.release_analysis import ReleaseAnalyzer
+from pypeline_semantic_release.tag_index import TagVersionIndex
+from tests.conftest import PyPackageRepo
+
+
+def _create_runtime(repo: Repo, prerelease_token: str | None = None) -> RuntimeContext:
+    with change_directory(Path(repo.working_dir)):
+        context = CliContextObj(Mock(), Mock(), GlobalCommandLineOptions())
+        if prerelease_token:
+            for branch in context.raw_config.branches.values():
+                branch.prerelease_token = prerelease_token
+        return RuntimeContext.from_raw_config(context.raw_config, global_cli_options=context.global_opts)
+
+
+def _assert_same_as_semantic_release(repo: Repo, prerelease_token: str | None = None) -> None:
+    runtime = _create_runtime(repo, prerelease_token)
+    analysis = ReleaseAnalyzer(repo, TagVersionIndex.load(repo, runtime.version_translator.tag_format)).analyze(runtime)
+    expected = next_version(
+        repo=repo,
+        translator=runtime.version_translator,
+        commit_parser=runtime.commit_parser,
+        prerelease=runtime.prerelease,
+        major_on_zero=runtime.major_on_zero,
+        allow_zero_version=runtime.allow_zero_version,
+    )
+    assert analysis.next_version and str(analysis.next_version) == str(expected)
+
+
+def test_same_next_version_as_semantic_release(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    # No tags at all
+    _assert_same_as_semantic_release(repo)
+    py_package_tmp.new_feature()
+    _assert_same_as_semantic_release(repo)
+    py_package_tmp.new_tag("v0.1.0")
+    # No commits since the last release
+    _assert_same_as_semantic_release(repo)
+    py_package_tmp.new_feature()
+    _assert_same_as_semantic_release(repo)
+    # Prereleases on a feature branch
+    py_package_tmp.checkout_branch("feature/one")
+    _assert_same_as_semantic_release(repo)
+    py_package_tmp.new_feature().new_tag("v0.2.0-rc.1").new_feature()
+    _assert_same_as_semantic_release(repo)
+    _assert_same_as_semantic_release(repo, prerelease_token="alpha")  # noqa: S106
+    # Tags created on the feature branch are not part of the develop branch history
+    repo.git.checkout("develop")
+    _assert_same_as_semantic_release(repo)
+    py_package_tmp.new_tag("v0.1.1").new_feature()
+    _assert_same_as_semantic_release(repo)
+
+
+def test_next_version_without_the_increment_function(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    py_package_tmp.new_feature().new_tag("v0.1.0").new_feature()
+    runtime = _create_runtime(repo)
+    with patch("pypeline_semantic_release.release_analysis.increment_version", None), patch("semantic_release.version.algorithm.next_version", wraps=next_version) as full:
+        analysis = ReleaseAnalyzer(repo, TagVersionIndex.load(repo, "v{version}")).analyze(runtime)
+    full.assert_called_once()
+    assert str(analysis.next_version) == "0.2.0"
+    assert analysis.commits_since_last_release == 1
+
+
+def test_analysis_result(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    py_package_tmp.new_feature().new_tag("v0.1.0")
+    py_package_tmp.checkout_branch("feature/one")
+    py_package_tmp.new_feature().new_tag("v0.2.0-rc.1")
+    repo.git.checkout("develop")
+    py_package_tmp.new_feature().new_feature()
+
+    runtime = _create_runtime(repo)
+    analysis = ReleaseAnalyzer(repo, TagVersionIndex.load(repo, "v{version}")).analyze(runtime)
+    assert str(analysis.last_release) == "0.2.0-rc.1"
+    assert str(analysis.base_version) == "0.1.0"
+    assert str(analysis.next_version) == "0.2.0"
+    assert analysis.commits_since_last_release == 2
+    assert analysis.base_version and analysis.version_exists(analysis.base_version)
+    assert analysis.next_version and not analysis.version_exists(analysis.next_version)
+
+    # Without runtime context only the existing versions are analyzed
+    analysis = ReleaseAnalyzer(repo, TagVersionIndex.load(repo, "v{version}")).analyze()
+    assert str(analysis.last_release) == "0.2.0-rc.1"
+    assert analysis.next_version is None
+
+
+def test_only_commits_since_last_release_are_walked(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    for _ in range(5):
+        py_package_tmp.new_feature()
+    py_package_tmp.new_tag("v1.0.0").new_feature()
+    runtime = _create_runtime(repo)
+    with patch.object(Repo, "iter_commits", autospec=True, side_effect=Repo.iter_commits) as iter_commits:
+        analysis = ReleaseAnalyzer(repo, TagVersionIndex.load(repo, "v{version}")).analyze(runtime)
+    assert str(analysis.next_version) == "1.1.0"
+    assert analysis.commits_since_last_release == 1
+    assert iter_commits.call_args.args[1].startswith(f"{repo.tags['v1.0.0'].commit.hexsha}..")
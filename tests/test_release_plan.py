@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.check_ci_context import CIContext, CISystem
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig, ReleaseCommit
+from pypeline_semantic_release.publish_to_orphan_branch import PublishToOrphanBranch, PublishToOrphanBranchConfig
+from pypeline_semantic_release.release_plan import RELEASE_PLAN_FILE, LoadReleasePlan, ReleasePlan
+from tests.conftest import PyPackageRepo
+from tests.utils import assert_element_of_type
+
+
+def _create_release_commit(py_package_tmp: PyPackageRepo, plan_only: bool = False, release_plan: bool = True) -> CreateReleaseCommit:
+    config = CreateReleaseCommitConfig(push=False, release_plan=release_plan)
+    step = CreateReleaseCommit(py_package_tmp.create_ci_execution_context({"plan_only": plan_only}), config=config.to_dict())
+    step.run()
+    step.update_execution_context()
+    return step
+
+
+def test_plan_only(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    head_sha = repo.head.commit.hexsha
+    (Path(repo.working_dir) / "docs").mkdir()
+    (Path(repo.working_dir) / "docs" / "index.html").write_text("<html/>")
+
+    step = _create_release_commit(py_package_tmp, plan_only=True, release_plan=False)
+    orphan_step = PublishToOrphanBranch(step.execution_context, config=PublishToOrphanBranchConfig(branch="gh-pages", paths=["docs"]).to_dict())
+    orphan_step.run()
+
+    # Neither release commit nor tag nor orphan branch
+    assert repo.head.commit.hexsha == head_sha
+    assert not repo.tags
+    assert "gh-pages" not in repo.heads
+    assert step.execution_context.data_registry.find_data(ReleaseCommit) == []
+    plan = ReleasePlan.load(Path(repo.working_dir) / RELEASE_PLAN_FILE)
+    assert plan.plan_only
+    assert (plan.version, plan.tag, plan.base_commit_sha) == ("0.0.0", "v0.0.0", head_sha)
+    assert plan.ci_context.ci_system == "jenkins"
+    assert plan.orphan_trees == orphan_step.published_trees
+    assert repo.git.ls_tree("-r", "--name-only", plan.orphan_trees["gh-pages"]).splitlines() == ["docs/index.html"]
+
+
+@pytest.mark.parametrize(
+    "ci_context",
+    [
+        CIContext(ci_system=CISystem.UNKNOWN, is_pull_request=False, target_branch=None, current_branch=None),
+        CIContext(ci_system=CISystem.JENKINS, is_pull_request=True, target_branch="develop", current_branch="feature/plan"),
+    ],
+    ids=["local", "pull_request"],
+)
+def test_plan_only_without_release_run(py_package_tmp: PyPackageRepo, ci_context: CIContext) -> None:
+    repo = py_package_tmp.repo
+    head_sha = repo.head.commit.hexsha
+    execution_context = ExecutionContext(project_root_dir=Path(repo.working_dir), inputs={"plan_only": True})
+    execution_context.data_registry.insert(ci_context, "ci_context")
+
+    step = CreateReleaseCommit(execution_context, config=CreateReleaseCommitConfig(push=False).to_dict())
+    step.run()
+
+    assert repo.head.commit.hexsha == head_sha
+    assert not repo.tags
+    plan = ReleasePlan.load(Path(repo.working_dir) / RELEASE_PLAN_FILE)
+    assert plan.plan_only
+    assert (plan.version, plan.base_commit_sha, plan.release_commit_sha) == ("0.0.0", head_sha, None)
+    assert plan.ci_context.to_ci_context() == ci_context
+
+
+def test_load_release_plan(py_package_tmp: PyPackageRepo) -> None:
+    _create_release_commit(py_package_tmp)
+    repo = py_package_tmp.repo
+    plan = ReleasePlan.load(Path(repo.working_dir) / RELEASE_PLAN_FILE)
+    assert plan.release_commit_sha == repo.head.commit.hexsha == repo.tags["v0.0.0"].commit.hexsha
+
+    # Next job, without CheckCIContext and CreateReleaseCommit
+    execution_context = py_package_tmp.create_local_execution_context()
+    step = LoadReleasePlan(execution_context)
+    step.run()
+    step.update_execution_context()
+
+    release_commit = assert_element_of_type(execution_context.data_registry.find_data(ReleaseCommit), ReleaseCommit)
+    assert release_commit.version.as_tag() == "v0.0.0"
+    assert release_commit.previous_version is None
+    ci_context = assert_element_of_type(execution_context.data_registry.find_data(CIContext), CIContext)
+    assert ci_context.ci_system == CISystem.JENKINS
+    assert ci_context.is_ci
+
+
+def test_release_plan_is_only_written_on_request(py_package_tmp: PyPackageRepo) -> None:
+    step = _create_release_commit(py_package_tmp, release_plan=False)
+
+    assert py_package_tmp.repo.tags["v0.0.0"]
+    assert not (Path(py_package_tmp.repo.working_dir) / RELEASE_PLAN_FILE).exists()
+    assert step.execution_context.data_registry.find_data(ReleasePlan) == []
+
+
+def test_release_plan_integrity(py_package_tmp: PyPackageRepo) -> None:
+    _create_release_commit(py_package_tmp)
+    plan_file = Path(py_package_tmp.repo.working_dir) / RELEASE_PLAN_FILE
+    content = json.loads(plan_file.read_text())
+
+    plan_file.write_text(json.dumps({**content, "version": "9.9.9"}))
+    with pytest.raises(UserNotificationException, match="checksum does not match"):
+        ReleasePlan.load(plan_file)
+    plan_file.write_text(json.dumps({**content, "file_version": 0}))
+    with pytest.raises(UserNotificationException, match="has version 0"):
+        ReleasePlan.load(plan_file)
+    plan_file.write_text(json.dumps(content)[:-10])
+    with pytest.raises(UserNotificationException, match="is invalid"):
+        ReleasePlan.load(plan_file)
+
+    # The checkout is not the release commit anymore
+    plan_file.write_text(json.dumps(content))
+    py_package_tmp.new_feature()
+    with pytest.raises(UserNotificationException, match=r"Check out the tag v0\.0\.0"):
+        LoadReleasePlan(py_package_tmp.create_local_execution_context()).run()
@@ -0,0 +1,105 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from semantic_release import VersionTranslator, tags_and_versions
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release.cache import CACHE_DIR_NAME
+from pypeline_semantic_release.tag_index import TagVersionIndex
+from tests.conftest import PyPackageRepo
+
+
+@pytest.fixture
+def tagged_repo(py_package_tmp: PyPackageRepo) -> PyPackageRepo:
+    for tag in ["v0.1.0", "v0.2.0-rc.1", "v0.2.0-rc.2", "v0.2.0-alpha.5", "v0.1.1", "v0.2.0-rc1.dev.1", "not-a-version", "v1.0.0-rc.1"]:
+        py_package_tmp.new_tag(tag)
+    return py_package_tmp
+
+
+@pytest.fixture
+def trust_new_refs():
+    """Refs just written by the test shall be trusted for the fingerprint."""
+    with patch("pypeline_semantic_release.tag_index.RACY_REFS_SECONDS", 0):
+        yield
+
+
+def test_same_order_as_semantic_release(tagged_repo: PyPackageRepo) -> None:
+    index = TagVersionIndex.load(tagged_repo.repo, "v{version}")
+    expected = [version for _, version in tags_and_versions(tagged_repo.repo.tags, VersionTranslator())]
+    assert [str(version) for version in index.versions()] == [str(version) for version in expected]
+
+
+def test_lookups(tagged_repo: PyPackageRepo) -> None:
+    index = TagVersionIndex.load(tagged_repo.repo, "v{version}")
+    assert index.contains(Version.parse("0.2.0-rc.2"))
+    assert index.contains(Version.parse("0.1.1+build.5"))
+    assert not index.contains(Version.parse("0.2.0-rc.3"))
+    assert not index.contains(Version.parse("0.2.0"))
+    latest_version = index.latest_version()
+    assert latest_version and latest_version[0] == "v1.0.0-rc.1"
+    latest_release = index.latest_release()
+    assert latest_release and latest_release[0] == "v0.1.1"
+    assert latest_release[1] == Version.parse("0.1.1")
+    latest_prerelease = index.latest_prerelease("rc")
+    assert latest_prerelease and latest_prerelease[0] == "v1.0.0-rc.1"
+    latest_prerelease = index.latest_prerelease("rc1.dev")
+    assert latest_prerelease and latest_prerelease[0] == "v0.2.0-rc1.dev.1"
+    assert index.latest_prerelease("beta") is None
+
+
+def test_index_is_persisted_and_updated_incrementally(tagged_repo: PyPackageRepo, trust_new_refs: None) -> None:
+    repo = tagged_repo.repo
+    TagVersionIndex.load(repo, "v{version}")
+    assert list((Path(repo.git_dir) / CACHE_DIR_NAME).glob("tag_index_*.json"))
+
+    # Unchanged refs: the tags are not listed again
+    with patch.object(TagVersionIndex, "list_tags") as list_tags:
+        index = TagVersionIndex.load(repo, "v{version}")
+    list_tags.assert_not_called()
+    assert len(index.versions()) == 7
+
+    # New tag: only the new tag is translated
+    tagged_repo.new_feature().new_tag("v1.0.0")
+    with patch.object(VersionTranslator, "from_tag", autospec=True, side_effect=VersionTranslator.from_tag) as from_tag:
+        index = TagVersionIndex.load(repo, "v{version}")
+    assert [call.args[1] for call in from_tag.call_args_list] == ["v1.0.0"]
+    latest_release = index.latest_release()
+    assert latest_release and latest_release[0] == "v1.0.0"
+
+    # Deleted tag
+    repo.delete_tag(repo.tags["v1.0.0"])
+    index = TagVersionIndex.load(repo, "v{version}")
+    assert not index.contains(Version.parse("1.0.0"))
+
+
+def test_index_per_tag_format(tagged_repo: PyPackageRepo) -> None:
+    tagged_repo.new_tag("pkg-3.0.0")
+    assert not TagVersionIndex.load(tagged_repo.repo, "v{version}").contains(Version.parse("3.0.0"))
+    index = TagVersionIndex.load(tagged_repo.repo, "pkg-{version}")
+    assert [str(version) for version in index.versions()] == ["3.0.0"]
+
+
+def test_invalid_index_file_is_rebuilt(tagged_repo: PyPackageRepo) -> None:
+    index = TagVersionIndex.load(tagged_repo.repo, "v{version}")
+    assert index.index_file
+    index.index_file.write_text("{not json")
+    index = TagVersionIndex.load(tagged_repo.repo, "v{version}")
+    assert len(index.versions()) == 7
+
+
+def test_tag_commits(tagged_repo: PyPackageRepo) -> None:
+    repo = tagged_repo.repo
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test").set_value("user", "email", "test@example.com")
+    repo.create_tag("v2.0.0", message="annotated tag")
+    index = TagVersionIndex.load(repo, "v{version}")
+    assert index.get_commit("v2.0.0") == repo.head.commit.hexsha
+    assert index.get_version("v2.0.0") == Version.parse("2.0.0")
+    assert index.get_commit("not-a-version") is None
+
+    # A moved tag points to the new commit
+    tagged_repo.new_feature()
+    repo.create_tag("v2.0.0", message="moved tag", force=True)
+    index = TagVersionIndex.load(repo, "v{version}")
+    assert index.get_commit("v2.0.0") == repo.head.commit.hexsha
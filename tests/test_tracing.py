@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from pypeline.domain.execution_context import ExecutionContext
+
+from pypeline_semantic_release.base import BaseStep
+from pypeline_semantic_release.tracing import OTLP_FILE_ENV, TRACE_FILE, Tracer
+
+
+def test_nested_spans_are_exported(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    otlp_file = tmp_path / "otlp" / "trace.json"
+    monkeypatch.setenv(OTLP_FILE_ENV, str(otlp_file))
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    step = BaseStep(execution_context)
+    with step.step_span() as run, step.span("outer", answer=42) as outer:
+        with step.span("inner"):
+            pass
+        step.execute_process([sys.executable, "-c", "pass"], "Failed.")
+
+    tracer = Tracer.from_execution_context(execution_context, "test")
+    assert [span.name for span in tracer.spans] == ["inner", "process", "outer", "run"]
+    assert all(span.parent_id == outer.span_id for span in tracer.spans[:2])
+    assert outer.parent_id == run.span_id
+    assert outer.duration_ns and outer.duration_ns >= sum(span.duration_ns or 0 for span in tracer.spans[:2])
+
+    events = json.loads((tmp_path / TRACE_FILE).read_text())["traceEvents"]
+    assert [(event["name"], event["cat"], event["ph"]) for event in events] == [
+        ("run", "BaseStep", "X"),
+        ("outer", "BaseStep", "X"),
+        ("inner", "BaseStep", "X"),
+        ("process", "BaseStep", "X"),
+    ]
+    assert events[1]["args"] == {"answer": "42"}
+    assert events[1]["ts"] <= events[2]["ts"] and events[1]["dur"] >= events[2]["dur"]
+
+    otlp_spans = json.loads(otlp_file.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in otlp_spans] == ["inner", "process", "outer", "run"]
+    assert {span["traceId"] for span in otlp_spans} == {tracer.trace_id}
+    assert otlp_spans[0]["parentSpanId"] == otlp_spans[2]["spanId"]
+    assert otlp_spans[2]["parentSpanId"] == otlp_spans[3]["spanId"]
+    assert "parentSpanId" not in otlp_spans[3]
+    assert int(otlp_spans[3]["endTimeUnixNano"]) >= int(otlp_spans[3]["startTimeUnixNano"])
+
+
+def test_trace_is_exported_once_per_step(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(OTLP_FILE_ENV, str(tmp_path / "otlp.json"))
+    written: list[set[str]] = []
+    monkeypatch.setattr(Tracer, "_write", staticmethod(lambda files: written.append({file.name for file in files})))
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    for _ in range(2):
+        step = BaseStep(execution_context)
+        with step.step_span():
+            for phase in range(10):
+                with step.span(f"phase {phase}"):
+                    pass
+
+    assert written == [{"trace.json", "otlp.json"}] * 2
+
+
+def test_failed_span_records_error(tmp_path: Path) -> None:
+    execution_context = ExecutionContext(project_root_dir=tmp_path)
+    step = BaseStep(execution_context)
+    with pytest.raises(ValueError), step.step_span(), step.span("failing"):
+        raise ValueError("boom")
+
+    events = json.loads((tmp_path / TRACE_FILE).read_text())["traceEvents"]
+    assert [event["args"] for event in events] == [{"error": "ValueError: boom"}] * 2
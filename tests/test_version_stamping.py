@@ -0,0 +1,142 @@
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from semantic_release.version.declarations.enum import VersionStampType
+from semantic_release.version.declarations.pattern import PatternVersionDeclaration
+from semantic_release.version.declarations.toml import TomlVersionDeclaration
+from semantic_release.version.version import Version
+
+from pypeline_semantic_release import version_stamping
+from pypeline_semantic_release.create_release_commit import CreateReleaseCommit, CreateReleaseCommitConfig
+from pypeline_semantic_release.tracing import Tracer
+from pypeline_semantic_release.version_stamping import VersionStamper
+from tests.conftest import PyPackageRepo
+
+VERSION = Version.parse("1.2.0")
+
+PYPROJECT = """[tool.poetry]
+name = "example-project"
+version = "0.1.0" # the package version
+
+[tool.other]
+version = "0.1.0"
+"""
+
+INIT = '__version__ = "0.1.0"\r\n__tag__ = "v0.1.0"\r\nVERSION = "0.1.0"\r\n'
+
+
+def _declarations(repo_dir: Path) -> list[PatternVersionDeclaration | TomlVersionDeclaration]:
+    (repo_dir / "pyproject.toml").write_text(PYPROJECT)
+    (repo_dir / "src").mkdir(exist_ok=True)
+    (repo_dir / "src" / "__init__.py").write_bytes(INIT.encode())
+    return [
+        PatternVersionDeclaration.from_string_definition(str(repo_dir / "src/__init__.py:__version__"), "v{version}"),
+        PatternVersionDeclaration.from_string_definition(str(repo_dir / "src/__init__.py:__tag__:tf"), "v{version}"),
+        PatternVersionDeclaration.from_string_definition(str(repo_dir / "pyproject.toml:version"), "v{version}"),
+        TomlVersionDeclaration.from_string_definition(str(repo_dir / "pyproject.toml:tool.poetry.version")),
+        TomlVersionDeclaration.from_string_definition(str(repo_dir / "pyproject.toml:tool.missing.version")),
+    ]
+
+
+@pytest.mark.parametrize("mmap_threshold", [version_stamping.MMAP_THRESHOLD, 0])
+def test_stamp_all_declarations_of_a_file_at_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mmap_threshold: int) -> None:
+    monkeypatch.setattr(version_stamping, "MMAP_THRESHOLD", mmap_threshold)
+    declarations = _declarations(tmp_path)
+    # Same content as applying the declarations one after another with semantic-release
+    expected = {}
+    for declaration in declarations:
+        expected[declaration._path] = declaration.replace(VERSION)
+        declaration._path.write_text(expected[declaration._path])
+        del declaration.content
+    _declarations(tmp_path)
+
+    stamper = VersionStamper.from_declarations(declarations)
+    assert [(target.path.name, len(target.patterns), len(target.toml_keys)) for target in stamper.targets] == [("__init__.py", 2, 0), ("pyproject.toml", 1, 2)]
+    stamped_files = [stamper.stamp(target, VERSION) for target in stamper.targets]
+
+    assert all(stamped_file.changed for stamped_file in stamped_files)
+    for path, content in expected.items():
+        assert path.read_text() == content
+    # The line endings are kept
+    assert (tmp_path / "src" / "__init__.py").read_bytes() == b'__version__ = "1.2.0"\r\n__tag__ = "v1.2.0"\r\nVERSION = "0.1.0"\r\n'
+    # Stamping the same version again does not change anything
+    assert not any(stamper.stamp(target, VERSION).changed for target in stamper.targets)
+
+
+def test_overlapping_patterns_are_applied_one_after_another(tmp_path: Path) -> None:
+    (tmp_path / "version.py").write_text('VERSION = "0.1.0"\n')
+    declarations = [
+        PatternVersionDeclaration.from_string_definition(str(tmp_path / "version.py:VERSION"), "v{version}"),
+        PatternVersionDeclaration(str(tmp_path / "version.py"), r'VERSION = "(?P<version>[^"]+)"', VersionStampType.TAG_FORMAT),
+    ]
+    stamper = VersionStamper.from_declarations(declarations)
+    assert stamper.stamp(stamper.targets[0], VERSION).changed
+    assert (tmp_path / "version.py").read_text() == 'VERSION = "v1.2.0"\n'
+
+
+def test_unknown_declarations_are_left_to_semantic_release(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    declarations = _declarations(tmp_path)
+    # The private attributes are read from the semantic-release declarations, they might change
+    pattern_declaration, toml_declaration = declarations[0], declarations[3]
+    assert isinstance(pattern_declaration, PatternVersionDeclaration) and isinstance(toml_declaration, TomlVersionDeclaration)
+    del pattern_declaration._search_pattern
+    del toml_declaration._search_text
+    other = Mock()
+    stamper = VersionStamper.from_declarations([*declarations, other])
+    assert [(target.path.name, len(target.patterns), len(target.toml_keys)) for target in stamper.targets] == [("__init__.py", 1, 0), ("pyproject.toml", 1, 1)]
+    assert stamper.other_declarations == [declarations[0], declarations[3], other]
+
+    # semantic-release without the declaration classes
+    monkeypatch.setitem(sys.modules, "semantic_release.version.declarations.pattern", None)
+    stamper = VersionStamper.from_declarations(declarations)
+    assert stamper.targets == []
+    assert stamper.other_declarations == declarations
+
+
+def test_release_with_single_pass_stamping(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    repo_dir = Path(repo.working_dir)
+    pyproject = repo_dir / "pyproject.toml"
+    pyproject.write_text(
+        pyproject.read_text()
+        .replace('version = "0.1.0"', 'version = "0.0.1"')
+        .replace(
+            "[tool.semantic_release.branches.main]",
+            '[tool.semantic_release]\n    version_toml = ["pyproject.toml:tool.poetry.version"]\n'
+            '    version_variables = ["src/example/__init__.py:__version__"]\n\n    [tool.semantic_release.branches.main]',
+        )
+    )
+    (repo_dir / "src" / "example").mkdir(parents=True)
+    (repo_dir / "src" / "example" / "__init__.py").write_text('__version__ = "0.0.1"\n')
+    repo.index.add(["pyproject.toml", "src/example/__init__.py"])
+    repo.index.commit("feat: add package")
+
+    execution_context = py_package_tmp.create_ci_execution_context()
+    config = CreateReleaseCommitConfig(push=False, in_process=True, single_pass_stamping=True).to_dict()
+    CreateReleaseCommit(execution_context, config=config).run()
+
+    assert repo.tags["v0.1.0"].commit == repo.head.commit
+    assert repo.git.show("HEAD:src/example/__init__.py") == '__version__ = "0.1.0"'
+    assert 'version = "0.1.0"' in repo.git.show("HEAD:pyproject.toml")
+    assert not repo.is_dirty()
+    spans = [span for span in Tracer.from_execution_context(execution_context, "test").spans if span.name == "stamp"]
+    assert sorted(Path(span.attributes["file"]).name for span in spans) == ["__init__.py", "pyproject.toml"]
+
+
+def test_stage_keeps_the_file_mode_of_non_ascii_paths(py_package_tmp: PyPackageRepo) -> None:
+    repo = py_package_tmp.repo
+    repo_dir = Path(repo.working_dir)
+    (repo_dir / "skripte").mkdir()
+    script = repo_dir / "skripte" / "größe.sh"
+    script.write_text("echo 0.1.0\n")
+    repo.git.add("--", "skripte/größe.sh")
+    repo.git.update_index("--chmod=+x", "--", "skripte/größe.sh")
+    repo.index.commit("feat: add script")
+
+    script.write_text("echo 1.2.0\n")
+    VersionStamper.stage(repo, [script])
+
+    assert repo.git.ls_files("-z", "--stage", "--", "skripte/größe.sh").split()[0] == "100755"
+    assert repo.git.show(":skripte/größe.sh") == "echo 1.2.0"